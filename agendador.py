@@ -0,0 +1,340 @@
+"""
+Agendador central dos trabalhos demorados (comprimir, converter, juntar,
+exportar...), no lugar de uma thread e uma fila por ação.
+
+Os trabalhos rodam em um número fixo de threads, por ordem de prioridade e
+respeitando um limite de execuções simultâneas por tipo. O trabalho pesado de
+CPU vai para um único pool de processos compartilhado (`processos`), então
+várias operações podem rodar ao mesmo tempo sem abrir mais processos do que
+há núcleos. O andamento chega a quem enviou o trabalho por callbacks, chamados
+em `processar_eventos`, que a interface executa na sua própria thread.
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from cancelamento import OperacaoCancelada, TokenCancelamento
+from operacoes_lote import TAREFAS_POR_PROCESSO
+
+PRIORIDADE_ALTA = 0
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_BAIXA = 2
+TRABALHOS_SIMULTANEOS = 4  # Threads do agendador; o pesado vai para os processos
+INTERVALO_DESPACHO_MS = 100  # Intervalo com que a UI recolhe os eventos
+
+# Operações que já ocupam todos os processos sozinhas, ou que têm um pool
+# próprio, rodam uma por vez; as demais dividem as threads livres.
+LIMITES_POR_TIPO = {"comprimir": 1, "converter": 1, "juntar": 2, "dividir": 1}
+
+
+class Trabalho:
+    """
+    Um trabalho enviado ao agendador. A função do trabalho o recebe como
+    primeiro argumento, para informar o andamento com `progresso` e repassar
+    `cancelamento` às funções que fizer; o resultado (ou a exceção) fica em
+    `futuro`. `cancelamento` só vale neste processo: para as tarefas enviadas
+    ao pool de processos, use `cancelamento_entre_processos()`.
+    """
+
+    def __init__(
+        self,
+        agendador: "Agendador",
+        tipo: str,
+        descricao: str,
+        prioridade: int,
+        funcao: Callable,
+        args: tuple,
+        kwargs: dict,
+        callbacks: dict[str, Callable | None],
+    ):
+        self.agendador = agendador
+        self.tipo = tipo
+        self.descricao = descricao
+        self.prioridade = prioridade
+        self.futuro: Future = Future()
+        self.cancelamento = TokenCancelamento()
+        self._token_processos: TokenCancelamento | None = None
+        self._trava = threading.Lock()
+        self._funcao = funcao
+        self._args = args
+        self._kwargs = kwargs
+        self._callbacks = callbacks
+
+    def progresso(self, atual: int, total: int, texto: str = ""):
+        self.agendador._eventos.put(("progresso", self, (atual, total, texto)))
+
+    def cancelamento_entre_processos(self) -> TokenCancelamento:
+        """
+        Token que acompanha `cancelamento` e pode ser enviado ao pool de
+        processos. Chame-o de dentro do trabalho: o multiprocessing.Manager
+        que o sustenta só sobe no primeiro uso, fora da thread da interface, e
+        cada verificação dele é uma ida e volta ao Manager.
+        """
+        with self._trava:
+            if self._token_processos is None:
+                token = self.agendador._novo_token_entre_processos()
+                if self.cancelamento.cancelado:
+                    token.cancelar()
+                elif self.cancelamento.pausado:
+                    token.pausar()
+                self._token_processos = token
+            return self._token_processos
+
+    def _tokens(self) -> list[TokenCancelamento]:
+        return [self.cancelamento, *filter(None, [self._token_processos])]
+
+    def cancelar(self):
+        """
+        Se o trabalho ainda não começou, ele não vai rodar; se já está rodando,
+        para no próximo ponto de verificação do token.
+        """
+        if self.futuro.cancel():
+            self.agendador._eventos.put(("cancelado", self, ()))
+        else:
+            self._cancelar_tokens()
+
+    def _cancelar_tokens(self):
+        with self._trava:
+            for token in self._tokens():
+                token.cancelar()
+
+    def pausar(self):
+        with self._trava:
+            for token in self._tokens():
+                token.pausar()
+
+    def retomar(self):
+        with self._trava:
+            for token in self._tokens():
+                token.retomar()
+
+    def _executar(self):
+        if not self.futuro.set_running_or_notify_cancel():
+            return
+        self.agendador._eventos.put(("iniciado", self, ()))
+        try:
+            resultado = self._funcao(self, *self._args, **self._kwargs)
+        except OperacaoCancelada as e:
+            self.futuro.set_exception(e)
+            self.agendador._eventos.put(("cancelado", self, ()))
+        except Exception as e:
+            self.futuro.set_exception(e)
+            self.agendador._eventos.put(("erro", self, (str(e),)))
+        else:
+            self.futuro.set_result(resultado)
+            self.agendador._eventos.put(("sucesso", self, (resultado,)))
+
+
+class Agendador:
+    """
+    Executa trabalhos em `workers` threads, sempre o de maior prioridade
+    (menor número) cujo tipo ainda não atingiu o seu limite em `limites`;
+    tipos sem limite só dependem das threads livres. Entre trabalhos de mesma
+    prioridade, vale a ordem de envio.
+    """
+
+    def __init__(
+        self,
+        workers: int = TRABALHOS_SIMULTANEOS,
+        limites: dict[str, int] | None = None,
+        processos: int | None = None,
+    ):
+        self.limites = dict(limites or {})
+        self.max_processos = processos or os.cpu_count() or 1
+        self._condicao = threading.Condition()
+        self._pendentes: list[tuple[int, int, Trabalho]] = []
+        self._sequencia = itertools.count()
+        self._em_execucao: Counter[str] = Counter()
+        self._rodando: set[Trabalho] = set()
+        self._eventos: queue.Queue = queue.Queue()
+        self._encerrado = False
+        self._pool: ProcessPoolExecutor | None = None
+        self._gerenciador = None
+        self._trava_pool = threading.Lock()
+        for i in range(workers):
+            threading.Thread(
+                target=self._trabalhar, name=f"agendador-{i}", daemon=True
+            ).start()
+
+    @property
+    def processos(self) -> ProcessPoolExecutor:
+        """Pool de processos compartilhado, criado no primeiro uso."""
+        with self._trava_pool:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_processos,
+                    max_tasks_per_child=TAREFAS_POR_PROCESSO,
+                )
+            return self._pool
+
+    def enviar(
+        self,
+        tipo: str,
+        funcao: Callable,
+        *args,
+        prioridade: int = PRIORIDADE_NORMAL,
+        descricao: str = "",
+        ao_iniciar: Callable[[], None] | None = None,
+        ao_progresso: Callable[[int, int, str], None] | None = None,
+        ao_concluir: Callable[[object], None] | None = None,
+        ao_falhar: Callable[[str], None] | None = None,
+        ao_cancelar: Callable[[], None] | None = None,
+        **kwargs,
+    ) -> Trabalho:
+        """
+        Enfileira `funcao(trabalho, *args, **kwargs)`. Os callbacks são
+        chamados por `processar_eventos`, nunca pela thread do trabalho.
+
+        Raises:
+            RuntimeError: Se o agendador já foi encerrado.
+        """
+        trabalho = Trabalho(
+            self,
+            tipo,
+            descricao,
+            prioridade,
+            funcao,
+            args,
+            kwargs,
+            {
+                "iniciado": ao_iniciar,
+                "progresso": ao_progresso,
+                "sucesso": ao_concluir,
+                "erro": ao_falhar,
+                "cancelado": ao_cancelar,
+            },
+        )
+        with self._condicao:
+            if self._encerrado:
+                raise RuntimeError("O agendador já foi encerrado.")
+            heapq.heappush(
+                self._pendentes, (prioridade, next(self._sequencia), trabalho)
+            )
+            self._condicao.notify()
+        return trabalho
+
+    def processar_eventos(self):
+        """
+        Entrega os eventos acumulados aos callbacks, na thread de quem chama.
+        De vários avisos de progresso de um mesmo trabalho, só o último conta.
+        """
+        eventos = []
+        while True:
+            try:
+                eventos.append(self._eventos.get_nowait())
+            except queue.Empty:
+                break
+        ultimo_progresso = {
+            id(trabalho): i
+            for i, (tipo, trabalho, _) in enumerate(eventos)
+            if tipo == "progresso"
+        }
+        for i, (tipo, trabalho, dados) in enumerate(eventos):
+            if tipo == "progresso" and ultimo_progresso[id(trabalho)] != i:
+                continue
+            callback = trabalho._callbacks[tipo]
+            if callback is None:
+                continue
+            try:
+                callback(*dados)
+            except Exception:
+                # Uma janela fechada no meio do trabalho não pode parar o despacho.
+                traceback.print_exc()
+
+    def encerrar(self):
+        """
+        Descarta os trabalhos pendentes, cancela os que estão rodando e libera
+        as threads e os processos.
+        """
+        with self._condicao:
+            self._encerrado = True
+            pendentes, self._pendentes = self._pendentes, []
+            rodando = list(self._rodando)
+            self._condicao.notify_all()
+        for _, _, trabalho in pendentes:
+            trabalho.futuro.cancel()
+        for trabalho in rodando:
+            trabalho._cancelar_tokens()
+        with self._trava_pool:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            if self._gerenciador is not None:
+                self._gerenciador.shutdown()
+
+    def _novo_token_entre_processos(self) -> TokenCancelamento:
+        """Token que atravessa processos; o Manager só sobe no primeiro uso."""
+        with self._trava_pool:
+            if self._gerenciador is None:
+                self._gerenciador = multiprocessing.Manager()
+            return TokenCancelamento.entre_processos(self._gerenciador)
+
+    def _proximo(self) -> Trabalho | None:
+        """O primeiro pendente, por prioridade, cujo tipo tem vaga (com a trava)."""
+        adiados = []
+        escolhido = None
+        while self._pendentes:
+            item = heapq.heappop(self._pendentes)
+            trabalho = item[2]
+            if trabalho.futuro.cancelled():
+                continue
+            limite = self.limites.get(trabalho.tipo)
+            if limite is not None and self._em_execucao[trabalho.tipo] >= limite:
+                adiados.append(item)
+                continue
+            escolhido = trabalho
+            break
+        for item in adiados:
+            heapq.heappush(self._pendentes, item)
+        return escolhido
+
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                while not self._encerrado and (trabalho := self._proximo()) is None:
+                    self._condicao.wait()
+                if self._encerrado:
+                    return
+                self._em_execucao[trabalho.tipo] += 1
+                self._rodando.add(trabalho)
+            try:
+                trabalho._executar()
+            finally:
+                with self._condicao:
+                    self._em_execucao[trabalho.tipo] -= 1
+                    self._rodando.discard(trabalho)
+                    # Um trabalho adiado pelo limite do tipo pode rodar agora.
+                    self._condicao.notify_all()
+
+
+def despachar_no_tk(raiz, agendador: Agendador):
+    """
+    Mantém, na thread do Tk, o laço que entrega os eventos do agendador: um
+    único `after` para todas as janelas, em vez de um por operação.
+    """
+
+    def despachar():
+        agendador.processar_eventos()
+        raiz.after(INTERVALO_DESPACHO_MS, despachar)
+
+    raiz.after(INTERVALO_DESPACHO_MS, despachar)
+
+
+_agendador_compartilhado: Agendador | None = None
+_trava_compartilhado = threading.Lock()
+
+
+def obter_agendador() -> Agendador:
+    """Instância única do agendador, usada por todas as janelas do processo."""
+    global _agendador_compartilhado
+    with _trava_compartilhado:
+        if _agendador_compartilhado is None:
+            _agendador_compartilhado = Agendador(limites=LIMITES_POR_TIPO)
+        return _agendador_compartilhado
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from PIL import Image
+
+# --- Constantes do cache em disco ---
+TAMANHO_MAXIMO_BYTES = 512 * 1024**2  # 512 MB
+FRACAO_APOS_DESPEJO = 0.9  # Ao estourar o limite, libera espaço até 90% dele
+NIVEL_ZLIB = 1  # Compressão rápida; as imagens já são pequenas
+NOME_BANCO = "miniaturas.sqlite3"
+
+
+def pasta_cache_padrao() -> Path:
+    """Pasta de cache do usuário (LOCALAPPDATA no Windows, XDG nos demais)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ManipuladorPDF"
+
+
+def chave_documento(caminho: str) -> str:
+    """
+    Identifica uma versão de um arquivo pelo caminho, data de modificação e
+    tamanho, sem precisar ler o conteúdo. Qualquer gravação gera outra chave.
+    """
+    info = os.stat(caminho)
+    texto = f"{os.path.abspath(caminho)}|{info.st_mtime_ns}|{info.st_size}"
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class CacheMiniaturas:
+    """
+    Cache persistente (SQLite) das miniaturas e pré-visualizações do
+    organizador.
+
+    Cada entrada é identificada por (documento, pagina, largura, altura, variante):
+    `largura` x `altura` é a caixa pedida na renderização (0 x 0 quando a página
+    foi renderizada no tamanho natural) e `variante` distingue renderizações da
+    mesma caixa, como a rotação aplicada. Quando o total armazenado passa de
+    `tamanho_maximo`, as entradas acessadas há mais tempo são descartadas.
+
+    O cache é apenas uma otimização: se o banco não puder ser aberto ou gravado,
+    os métodos simplesmente não encontram nada.
+    """
+
+    def __init__(
+        self,
+        caminho_banco: str | Path | None = None,
+        tamanho_maximo: int = TAMANHO_MAXIMO_BYTES,
+    ):
+        self.tamanho_maximo = tamanho_maximo
+        self._trava = threading.Lock()
+        self._conexao = None
+        self._total_bytes = 0
+        if caminho_banco is None:
+            caminho_banco = pasta_cache_padrao() / NOME_BANCO
+        try:
+            Path(caminho_banco).parent.mkdir(parents=True, exist_ok=True)
+            conexao = sqlite3.connect(caminho_banco, timeout=5, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS imagens (
+                    documento TEXT NOT NULL,
+                    pagina INTEGER NOT NULL,
+                    largura INTEGER NOT NULL,
+                    altura INTEGER NOT NULL,
+                    variante TEXT NOT NULL,
+                    modo TEXT NOT NULL,
+                    img_largura INTEGER NOT NULL,
+                    img_altura INTEGER NOT NULL,
+                    dados BLOB NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    acesso REAL NOT NULL,
+                    PRIMARY KEY (documento, pagina, largura, altura, variante)
+                ) WITHOUT ROWID
+                """
+            )
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_imagens_acesso ON imagens (acesso)"
+            )
+            conexao.commit()
+            (self._total_bytes,) = conexao.execute(
+                "SELECT COALESCE(SUM(bytes), 0) FROM imagens"
+            ).fetchone()
+            self._conexao = conexao
+        except sqlite3.Error as e:
+            print(f"Cache de miniaturas desativado: {e}")
+
+    def obter(
+        self, documento: str, pagina: int, largura: int, altura: int, variante=""
+    ) -> Image.Image | None:
+        encontradas = self._buscar(
+            "documento = ? AND pagina = ? AND largura = ? AND altura = ?"
+            " AND variante = ?",
+            (documento, pagina, largura, altura, variante),
+        )
+        return encontradas.get(pagina)
+
+    def obter_documento(
+        self, documento: str, largura: int, altura: int, variante=""
+    ) -> dict[int, Image.Image]:
+        """Todas as páginas já guardadas de um documento, em uma única consulta."""
+        return self._buscar(
+            "documento = ? AND largura = ? AND altura = ? AND variante = ?",
+            (documento, largura, altura, variante),
+        )
+
+    def guardar(
+        self,
+        documento: str,
+        pagina: int,
+        largura: int,
+        altura: int,
+        imagem: Image.Image,
+        variante="",
+    ):
+        self.guardar_varios(documento, largura, altura, [(pagina, imagem)], variante)
+
+    def guardar_varios(
+        self,
+        documento: str,
+        largura: int,
+        altura: int,
+        itens: list[tuple[int, Image.Image]],
+        variante="",
+    ):
+        """Grava várias páginas de uma vez, em uma só transação."""
+        if self._conexao is None or not itens:
+            return
+        agora = time.time()
+        linhas = []
+        for pagina, imagem in itens:
+            dados = zlib.compress(imagem.tobytes(), NIVEL_ZLIB)
+            linhas.append(
+                (
+                    documento,
+                    pagina,
+                    largura,
+                    altura,
+                    variante,
+                    imagem.mode,
+                    imagem.width,
+                    imagem.height,
+                    dados,
+                    len(dados),
+                    agora,
+                )
+            )
+        with self._trava:
+            try:
+                with self._conexao:
+                    # Substituir uma entrada não pode inflar o total contabilizado.
+                    for linha in linhas:
+                        substituida = self._conexao.execute(
+                            "SELECT bytes FROM imagens WHERE documento = ?"
+                            " AND pagina = ? AND largura = ? AND altura = ?"
+                            " AND variante = ?",
+                            linha[:5],
+                        ).fetchone()
+                        if substituida:
+                            self._total_bytes -= substituida[0]
+                    self._conexao.executemany(
+                        "INSERT OR REPLACE INTO imagens VALUES"
+                        " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        linhas,
+                    )
+                self._total_bytes += sum(linha[9] for linha in linhas)
+                if self._total_bytes > self.tamanho_maximo:
+                    self._despejar()
+            except sqlite3.Error as e:
+                print(f"Não foi possível gravar no cache de miniaturas: {e}")
+
+    def fechar(self):
+        with self._trava:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    def _buscar(self, condicao: str, parametros: tuple) -> dict[int, Image.Image]:
+        if self._conexao is None:
+            return {}
+        with self._trava:
+            try:
+                linhas = self._conexao.execute(
+                    "SELECT pagina, modo, img_largura, img_altura, dados"
+                    f" FROM imagens WHERE {condicao}",
+                    parametros,
+                ).fetchall()
+                if linhas:
+                    with self._conexao:
+                        self._conexao.execute(
+                            f"UPDATE imagens SET acesso = ? WHERE {condicao}",
+                            (time.time(), *parametros),
+                        )
+            except sqlite3.Error as e:
+                print(f"Não foi possível ler o cache de miniaturas: {e}")
+                return {}
+        return {
+            pagina: Image.frombytes(modo, (largura, altura), zlib.decompress(dados))
+            for pagina, modo, largura, altura, dados in linhas
+        }
+
+    def _despejar(self):
+        """Remove as entradas menos usadas recentemente até caber no limite."""
+        alvo = int(self.tamanho_maximo * FRACAO_APOS_DESPEJO)
+        linhas = self._conexao.execute(
+            "SELECT documento, pagina, largura, altura, variante, bytes"
+            " FROM imagens ORDER BY acesso"
+        )
+        remover = []
+        excesso = self._total_bytes - alvo
+        for *chave, tamanho in linhas:
+            if excesso <= 0:
+                break
+            remover.append(chave)
+            excesso -= tamanho
+        with self._conexao:
+            self._conexao.executemany(
+                "DELETE FROM imagens WHERE documento = ? AND pagina = ?"
+                " AND largura = ? AND altura = ? AND variante = ?",
+                remover,
+            )
+        self._total_bytes = excesso + alvo
+
+
+_cache_compartilhado: CacheMiniaturas | None = None
+_trava_compartilhado = threading.Lock()
+
+
+def obter_cache() -> CacheMiniaturas:
+    """Instância única do cache, usada por todas as janelas do processo."""
+    global _cache_compartilhado
+    with _trava_compartilhado:
+        if _cache_compartilhado is None:
+            _cache_compartilhado = CacheMiniaturas()
+        return _cache_compartilhado
@@ -0,0 +1,67 @@
+"""
+Cancelamento e pausa cooperativos das operações demoradas.
+
+As funções longas recebem um `TokenCancelamento` opcional e chamam
+`verificar()` entre páginas ou imagens: enquanto o token estiver pausado a
+chamada espera, e depois de cancelado ela levanta `OperacaoCancelada`, que a
+função deixa subir depois de apagar o que já tinha gravado.
+"""
+
+import threading
+
+
+class OperacaoCancelada(Exception):
+    """A operação foi interrompida a pedido do usuário."""
+
+    def __init__(self, mensagem="Operação cancelada."):
+        super().__init__(mensagem)
+
+
+class TokenCancelamento:
+    """
+    Par de sinais (cancelado, liberado). Por padrão usa eventos de threading;
+    para atravessar processos (um pool de processos, por exemplo), crie-o com
+    `entre_processos`, que usa eventos de um multiprocessing.Manager e pode
+    ser enviado junto com a tarefa.
+    """
+
+    def __init__(self, cancelado=None, liberado=None):
+        self._cancelado = cancelado if cancelado is not None else threading.Event()
+        self._liberado = liberado if liberado is not None else threading.Event()
+        self._liberado.set()
+
+    @classmethod
+    def entre_processos(cls, gerenciador) -> "TokenCancelamento":
+        return cls(gerenciador.Event(), gerenciador.Event())
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    @property
+    def pausado(self) -> bool:
+        return not self._liberado.is_set()
+
+    def cancelar(self):
+        self._cancelado.set()
+        # Acorda quem estiver esperando numa pausa, para que veja o cancelamento.
+        self._liberado.set()
+
+    def pausar(self):
+        if not self.cancelado:
+            self._liberado.clear()
+
+    def retomar(self):
+        self._liberado.set()
+
+    def verificar(self):
+        """
+        Ponto de verificação: espera enquanto o token estiver pausado.
+
+        Raises:
+            OperacaoCancelada: Se o token foi cancelado.
+        """
+        if not self._liberado.is_set():
+            self._liberado.wait()
+        if self._cancelado.is_set():
+            raise OperacaoCancelada()
@@ -0,0 +1,162 @@
+"""
+Linha de comando do Manipulador PDF, para processar arquivos em lote sem
+interface gráfica (não usa Tk nem precisa de tela).
+
+O progresso e os resultados saem em stdout, um objeto JSON por linha:
+
+    {"evento": "inicio", "total": 3, "workers": 3}
+    {"evento": "tarefa", "indice": 1, "ok": true, "saidas": [...], ...}
+    {"evento": "fim", "total": 3, "ok": 3, "falhas": 0, "segundos": 4.2}
+
+O código de saída é 0 se todas as tarefas deram certo, 1 se alguma falhou
+e 2 se os argumentos ou o manifesto forem inválidos.
+
+Exemplos:
+    python cli.py comprimir "digitalizados/**/*.pdf" --saida comprimidos -j 16
+    python cli.py juntar capa.pdf "anexos/*.pdf" -o dossie.pdf --remover-duplicadas
+    python cli.py selecionar @lista.txt --paginas "1-3, 5"
+    python cli.py manifesto tarefas.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from operacoes_lote import (
+    executar_lote,
+    expandir_entradas,
+    ler_manifesto,
+    preparar_tarefas,
+)
+
+
+def emitir(evento: str, **dados):
+    print(json.dumps({"evento": evento, **dados}, ensure_ascii=False), flush=True)
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Processa PDFs e imagens em lote, com saída em JSON Lines.",
+    )
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processos em paralelo (padrão: um por núcleo)",
+    )
+    arquivos = argparse.ArgumentParser(add_help=False, parents=[comum])
+    arquivos.add_argument(
+        "entradas",
+        nargs="+",
+        help='arquivos ou padrões glob ("**" é recursivo); @lista.txt lê um por linha',
+    )
+    pasta = argparse.ArgumentParser(add_help=False, parents=[arquivos])
+    pasta.add_argument(
+        "-s",
+        "--saida",
+        help="pasta de saída (padrão: ao lado de cada arquivo de entrada)",
+    )
+
+    operacoes = parser.add_subparsers(dest="operacao", required=True)
+
+    comprimir = operacoes.add_parser(
+        "comprimir", parents=[pasta], help="comprime cada PDF"
+    )
+    comprimir.add_argument(
+        "--qualidade", type=int, default=40, help="qualidade JPEG (1-100)"
+    )
+
+    juntar = operacoes.add_parser(
+        "juntar", parents=[arquivos], help="junta as entradas em um único PDF"
+    )
+    juntar.add_argument("-o", "--saida", required=True, help="PDF resultante")
+    juntar.add_argument(
+        "--remover-duplicadas",
+        action="store_true",
+        help="descarta as páginas que se repetem entre os arquivos",
+    )
+
+    operacoes.add_parser(
+        "imagens-para-pdf", parents=[pasta], help="converte cada imagem em um PDF"
+    )
+    operacoes.add_parser(
+        "pdf-para-imagens", parents=[pasta], help="salva cada página como PNG"
+    )
+
+    rodar = operacoes.add_parser(
+        "rodar", parents=[pasta], help="gira todas as páginas de cada PDF"
+    )
+    rodar.add_argument("--angulo", type=int, required=True, choices=(90, 180, 270))
+
+    selecionar = operacoes.add_parser(
+        "selecionar", parents=[pasta], help="extrai páginas de cada PDF"
+    )
+    selecionar.add_argument(
+        "--paginas", required=True, help='intervalos, como "1-3, 5, 10-8"'
+    )
+
+    manifesto = operacoes.add_parser(
+        "manifesto",
+        parents=[comum],
+        help="executa as tarefas de um arquivo JSON Lines",
+    )
+    manifesto.add_argument("arquivo", help="uma tarefa JSON por linha")
+    manifesto.add_argument(
+        "-s", "--saida", help="pasta de saída das tarefas que não indicam uma"
+    )
+    return parser
+
+
+def montar_tarefas(args: argparse.Namespace) -> list[dict]:
+    if args.operacao == "manifesto":
+        return ler_manifesto(args.arquivo, args.saida)
+    parametros = {}
+    if args.operacao == "comprimir":
+        parametros["qualidade"] = args.qualidade
+    elif args.operacao == "juntar":
+        parametros["remover_duplicadas"] = args.remover_duplicadas
+    elif args.operacao == "rodar":
+        parametros["angulo"] = args.angulo
+    elif args.operacao == "selecionar":
+        parametros["paginas"] = args.paginas
+    entradas = expandir_entradas(args.entradas)
+    if args.saida and args.operacao != "juntar":
+        os.makedirs(args.saida, exist_ok=True)
+    return preparar_tarefas(args.operacao, entradas, args.saida, **parametros)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = criar_parser().parse_args(argv)
+    try:
+        tarefas = montar_tarefas(args)
+    except (OSError, ValueError) as e:
+        emitir("erro", erro=str(e))
+        return 2
+
+    inicio = time.perf_counter()
+    total = len(tarefas)
+    workers = max(1, min(args.workers or 1, total))
+    emitir("inicio", total=total, workers=workers)
+    falhas = 0
+    for concluidas, resultado in enumerate(executar_lote(tarefas, workers), start=1):
+        falhas += not resultado["ok"]
+        emitir("tarefa", concluidas=concluidas, total=total, **resultado)
+    emitir(
+        "fim",
+        total=total,
+        ok=total - falhas,
+        falhas=falhas,
+        segundos=round(time.perf_counter() - inicio, 3),
+    )
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
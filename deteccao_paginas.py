@@ -0,0 +1,357 @@
+import hashlib
+import re
+from collections.abc import Callable
+
+import numpy as np
+import pymupdf
+from PIL import Image, ImageColor
+
+from renderizacao import matriz_para_caber, pixmap_para_pil, renderizar_miniatura
+
+# --- Limiares da detecção (em escala de cinza 0-255, sobre as miniaturas) ---
+LIMIAR_TINTA = 160  # Pixels mais escuros que isso contam como tinta
+MARGEM_IGNORADA = 0.06  # Fração de cada borda descartada (sombras do scanner)
+COBERTURA_MAXIMA_BRANCA = 0.004  # Até 0,4% de tinta a página é considerada branca
+DESVIO_MAXIMO_BRANCA = 8.0  # Desvio padrão máximo do cinza numa página branca
+COBERTURA_MAXIMA_SEPARADOR = 0.12  # Acima disso a página tem conteúdo de verdade
+ALTURA_MAXIMA_SEPARADOR = 0.3  # A tinta de um separador ocupa uma faixa estreita
+TRANSICOES_MINIMAS_SEPARADOR = 6.0  # Listras por linha típicas de código de barras
+COERENCIA_MINIMA_SEPARADOR = 0.8  # Barras verticais: a tinta continua na linha abaixo
+PAGINAS_POR_LOTE = 256  # Miniaturas analisadas por vez; limita a memória usada
+
+BRANCA = "branca"
+SEPARADOR = "separador"
+
+
+def completar_miniaturas(
+    caminho_pdf: str,
+    imagens: list[Image.Image | None],
+    largura: int,
+    altura: int,
+    cor_fundo: str,
+    progresso: Callable[[int, int], None] | None = None,
+) -> list[Image.Image]:
+    """
+    Devolve as miniaturas de todas as páginas, renderizando (com um handle
+    próprio do documento) só as que ainda não existem em `imagens`.
+    `progresso` recebe (renderizadas, faltando).
+    """
+    faltando = [indice for indice, imagem in enumerate(imagens) if imagem is None]
+    if not faltando:
+        return list(imagens)
+    completas = list(imagens)
+    with pymupdf.open(caminho_pdf) as doc:
+        for feitas, indice in enumerate(faltando, 1):
+            completas[indice] = renderizar_miniatura(
+                doc.load_page(indice), largura, altura, cor_fundo
+            )
+            if progresso:
+                progresso(feitas, len(faltando))
+    return completas
+
+
+def estatisticas_paginas(
+    imagens: list[Image.Image], cor_fundo: str
+) -> dict[str, np.ndarray]:
+    """
+    Calcula, de uma vez para todas as miniaturas, a cobertura de tinta, o
+    desvio padrão do cinza, a altura relativa da faixa com tinta, o número
+    médio de transições claro/escuro por linha com tinta e a fração da tinta
+    que continua na linha de baixo (alta em barras verticais, baixa em texto).
+
+    As miniaturas têm a página centralizada numa moldura `cor_fundo`; linhas e
+    colunas inteiramente da cor da moldura ficam fora da análise, assim como
+    uma margem de MARGEM_IGNORADA em cada borda da página.
+    """
+    fundo = Image.new("RGB", (1, 1), ImageColor.getrgb(cor_fundo)).convert("L")
+    valor_fundo = fundo.getpixel((0, 0))
+    lotes = [
+        _estatisticas_lote(imagens[i : i + PAGINAS_POR_LOTE], valor_fundo)
+        for i in range(0, len(imagens), PAGINAS_POR_LOTE)
+    ]
+    return {
+        chave: np.concatenate([lote[chave] for lote in lotes]) for chave in lotes[0]
+    }
+
+
+def _estatisticas_lote(
+    imagens: list[Image.Image], valor_fundo: int
+) -> dict[str, np.ndarray]:
+    cinza = np.stack([np.asarray(imagem.convert("L")) for imagem in imagens])
+    _, altura, largura = cinza.shape
+
+    # Extensão da página dentro da moldura, por miniatura.
+    eh_moldura = cinza == valor_fundo
+    linhas_pagina = ~eh_moldura.all(axis=2)
+    colunas_pagina = ~eh_moldura.all(axis=1)
+    mascara_linhas = _sem_margens(linhas_pagina, altura)
+    mascara_colunas = _sem_margens(colunas_pagina, largura)
+    mascara = mascara_linhas[:, :, None] & mascara_colunas[:, None, :]
+    area = np.maximum(mascara.sum(axis=(1, 2)), 1)
+
+    tinta = (cinza < LIMIAR_TINTA) & mascara
+    pixels_tinta = tinta.sum(axis=(1, 2))
+    cobertura = pixels_tinta / area
+
+    valores = np.where(mascara, cinza, 0).astype(np.float32)
+    media = valores.sum(axis=(1, 2)) / area
+    quadrados = np.where(mascara, np.square(valores - media[:, None, None]), 0)
+    desvio = np.sqrt(quadrados.sum(axis=(1, 2)) / area)
+
+    linhas_com_tinta = tinta.any(axis=2)
+    altura_tinta = linhas_com_tinta.sum(axis=1) / np.maximum(
+        mascara_linhas.sum(axis=1), 1
+    )
+    transicoes = np.count_nonzero(np.diff(tinta, axis=2), axis=(1, 2))
+    transicoes_por_linha = transicoes / np.maximum(linhas_com_tinta.sum(axis=1), 1)
+    continua_abaixo = np.count_nonzero(tinta[:, 1:, :] & tinta[:, :-1, :], axis=(1, 2))
+    coerencia_vertical = continua_abaixo / np.maximum(pixels_tinta, 1)
+
+    return {
+        "cobertura": cobertura,
+        "desvio": desvio,
+        "altura_tinta": altura_tinta,
+        "transicoes_por_linha": transicoes_por_linha,
+        "coerencia_vertical": coerencia_vertical,
+    }
+
+
+def _sem_margens(validas: np.ndarray, tamanho: int) -> np.ndarray:
+    """Reduz cada faixa válida (por linha de `validas`) descartando as margens."""
+    indices = np.arange(tamanho)
+    tem_pagina = validas.any(axis=1)
+    primeira = np.argmax(validas, axis=1)
+    ultima = tamanho - 1 - np.argmax(validas[:, ::-1], axis=1)
+    margem = ((ultima - primeira + 1) * MARGEM_IGNORADA).astype(int)
+    inicio = (primeira + margem)[:, None]
+    fim = (ultima - margem)[:, None]
+    return (indices >= inicio) & (indices <= fim) & tem_pagina[:, None]
+
+
+def classificar_paginas(imagens: list[Image.Image], cor_fundo: str) -> list[str | None]:
+    """
+    Classifica cada miniatura como BRANCA, SEPARADOR (folha quase vazia com um
+    código de barras ou marca em faixa estreita) ou None (página comum).
+    """
+    if not imagens:
+        return []
+    est = estatisticas_paginas(imagens, cor_fundo)
+    branca = (est["cobertura"] <= COBERTURA_MAXIMA_BRANCA) & (
+        est["desvio"] <= DESVIO_MAXIMO_BRANCA
+    )
+    separador = (
+        ~branca
+        & (est["cobertura"] <= COBERTURA_MAXIMA_SEPARADOR)
+        & (est["altura_tinta"] <= ALTURA_MAXIMA_SEPARADOR)
+        & (est["transicoes_por_linha"] >= TRANSICOES_MINIMAS_SEPARADOR)
+        & (est["coerencia_vertical"] >= COERENCIA_MINIMA_SEPARADOR)
+    )
+    return [
+        BRANCA if b else SEPARADOR if s else None
+        for b, s in zip(branca.tolist(), separador.tolist())
+    ]
+
+
+# --- Páginas duplicadas e quase duplicadas ---
+LADO_HASH = 16  # dHash de 16x16 diferenças: 256 bits por página
+BITS_POR_FAIXA = 16  # O índice agrupa os hashes por faixas de 16 bits
+DISTANCIA_QUASE_DUPLICADA = 8  # Bits diferentes (de 256) ainda tidos como iguais
+TAMANHO_RENDER_HASH = 64  # Lado da caixa em que a página é renderizada para o hash
+MAXIMO_POR_FAIXA = 64  # Faixas mais comuns que isso não servem para achar pares
+
+_REFERENCIA = re.compile(rb"(\d+) (\d+) R")
+
+
+def _hash_objeto(
+    doc: pymupdf.Document, xref: int, cache: dict[int, bytes], visitados: set[int]
+) -> bytes:
+    """
+    Hash de um objeto do PDF e de tudo o que ele referencia: o dicionário,
+    com cada referência "N 0 R" trocada pelo hash do objeto apontado (assim o
+    número do xref, que muda de um arquivo para outro, não conta), e o fluxo
+    bruto, se houver.
+    """
+    if xref in cache:
+        return cache[xref]
+    if xref in visitados:  # Referência circular
+        return b"ciclo"
+    visitados.add(xref)
+    texto = doc.xref_object(xref, compressed=True).encode()
+    h = hashlib.sha1(
+        _REFERENCIA.sub(
+            lambda ref: _hash_objeto(doc, int(ref[1]), cache, visitados).hex().encode(),
+            texto,
+        )
+    )
+    if doc.xref_is_stream(xref):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    cache[xref] = h.digest()
+    return cache[xref]
+
+
+def hash_conteudo(pagina: pymupdf.Page, cache: dict[int, bytes] | None = None) -> bytes:
+    """
+    Hash exato da página: fluxo de conteúdo, tamanho, rotação e, recursivamente,
+    todos os recursos (Form XObjects e os seus recursos, imagens, fontes...).
+    Cópias da mesma página vindas de arquivos diferentes coincidem. `cache`
+    guarda o hash dos objetos já vistos, compartilhados entre as páginas.
+    """
+    doc = pagina.parent
+    if cache is None:
+        cache = {}
+    h = hashlib.sha1()
+    h.update(f"{pagina.rect}|{pagina.rotation}".encode())
+    h.update(pagina.read_contents())
+    # Os recursos podem ser herdados da árvore de páginas.
+    xref = pagina.xref
+    tipo, valor = doc.xref_get_key(xref, "Resources")
+    while tipo == "null":
+        tipo, pai = doc.xref_get_key(xref, "Parent")
+        if tipo != "xref":
+            break
+        xref = int(pai.split()[0])
+        tipo, valor = doc.xref_get_key(xref, "Resources")
+    h.update(
+        _REFERENCIA.sub(
+            lambda ref: _hash_objeto(doc, int(ref[1]), cache, set()).hex().encode(),
+            valor.encode(),
+        )
+    )
+    return h.digest()
+
+
+def hash_texto(pagina: pymupdf.Page) -> bytes:
+    """Hash do texto da página sem espaços repetidos; b"" se não houver texto."""
+    texto = " ".join(pagina.get_text().split())
+    return hashlib.sha1(texto.encode()).digest() if texto else b""
+
+
+def hashes_perceptuais(imagens: list[Image.Image]) -> list[int]:
+    """
+    dHash de cada imagem (diferença entre pixels vizinhos de uma versão
+    reduzida em cinza), calculado com NumPy para todas de uma vez.
+    """
+    reduzidas = np.stack(
+        [
+            np.asarray(
+                imagem.convert("L").resize(
+                    (LADO_HASH + 1, LADO_HASH), Image.Resampling.BILINEAR
+                ),
+                dtype=np.int16,
+            )
+            for imagem in imagens
+        ]
+    )
+    bits = np.packbits(reduzidas[:, :, 1:] > reduzidas[:, :, :-1], axis=None)
+    tamanho = LADO_HASH * LADO_HASH // 8
+    return [
+        int.from_bytes(bits[i * tamanho : (i + 1) * tamanho].tobytes(), "big")
+        for i in range(len(imagens))
+    ]
+
+
+class ImpressoesPaginas:
+    """Hash exato, hash do texto e hash perceptual de cada página de um documento."""
+
+    def __init__(
+        self,
+        doc: pymupdf.Document,
+        progresso: Callable[[int, int], None] | None = None,
+    ):
+        self.exatos: list[bytes] = []
+        self.textos: list[bytes] = []
+        imagens = []
+        cache = {}
+        for indice in range(doc.page_count):
+            pagina = doc.load_page(indice)
+            self.exatos.append(hash_conteudo(pagina, cache))
+            self.textos.append(hash_texto(pagina))
+            pix = pagina.get_pixmap(
+                matrix=matriz_para_caber(
+                    pagina.rect, TAMANHO_RENDER_HASH, TAMANHO_RENDER_HASH
+                ),
+                colorspace=pymupdf.csGRAY,
+                alpha=False,
+            )
+            imagens.append(pixmap_para_pil(pix).copy())
+            if progresso:
+                progresso(indice + 1, doc.page_count)
+        self.perceptuais = hashes_perceptuais(imagens) if imagens else []
+
+    def agrupar(
+        self,
+        distancia_maxima: int = DISTANCIA_QUASE_DUPLICADA,
+        exigir_texto: bool = False,
+    ) -> list[list[int]]:
+        """
+        Grupos (com duas páginas ou mais, em ordem crescente) de páginas com o
+        mesmo hash exato ou quase duplicadas: hashes perceptuais a até
+        `distancia_maxima` bits e o mesmo texto. Renderizações tão pequenas não
+        distinguem páginas de texto que mudam numa palavra, por isso o texto
+        precisa bater; páginas sem texto (digitalizadas) só entram pela imagem,
+        a menos que `exigir_texto` seja verdadeiro. Por segurança, o mesmo hash
+        exato só une páginas cujo texto e hash perceptual também concordam.
+
+        Sem comparar todos os pares: os hashes perceptuais são indexados por
+        faixas de BITS_POR_FAIXA bits e, como duas páginas a essa distância têm
+        ao menos uma faixa idêntica (desde que haja mais faixas que bits de
+        diferença), só são comparadas as que compartilham alguma faixa. Faixas
+        com mais de MAXIMO_POR_FAIXA páginas (as faixas lisas de digitalizações
+        quase brancas, por exemplo) deixam de ser usadas, para que o índice não
+        vire uma comparação de todos com todos; os pares ainda se encontram
+        pelas outras faixas.
+        """
+        pais = list(range(len(self.exatos)))
+
+        def raiz(i):
+            while pais[i] != i:
+                pais[i] = pais[pais[i]]
+                i = pais[i]
+            return i
+
+        def unir(a, b):
+            ra, rb = raiz(a), raiz(b)
+            if ra != rb:
+                pais[max(ra, rb)] = min(ra, rb)
+
+        primeiro_com_hash = {}
+        for indice, h in enumerate(self.exatos):
+            primeiro = primeiro_com_hash.setdefault(h, indice)
+            if (
+                self.textos[primeiro] == self.textos[indice]
+                and (self.perceptuais[primeiro] ^ self.perceptuais[indice]).bit_count()
+                <= distancia_maxima
+            ):
+                unir(primeiro, indice)
+
+        faixas = LADO_HASH * LADO_HASH // BITS_POR_FAIXA
+        if distancia_maxima < faixas:
+            mascara = (1 << BITS_POR_FAIXA) - 1
+            indice_faixas = {}
+            for indice, h in enumerate(self.perceptuais):
+                texto = self.textos[indice]
+                if exigir_texto and not texto:
+                    continue
+                for faixa in range(faixas):
+                    chave = (faixa, (h >> (faixa * BITS_POR_FAIXA)) & mascara)
+                    candidatos = indice_faixas.setdefault(chave, [])
+                    if len(candidatos) >= MAXIMO_POR_FAIXA:
+                        continue
+                    for outro in candidatos:
+                        if (
+                            self.textos[outro] == texto
+                            and raiz(outro) != raiz(indice)
+                            and (h ^ self.perceptuais[outro]).bit_count()
+                            <= distancia_maxima
+                        ):
+                            unir(outro, indice)
+                    candidatos.append(indice)
+
+        grupos = {}
+        for indice in range(len(self.exatos)):
+            grupos.setdefault(raiz(indice), []).append(indice)
+        return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+    def repetidas(self, **opcoes) -> list[int]:
+        """Páginas que repetem uma anterior (a primeira de cada grupo fica)."""
+        return sorted(i for grupo in self.agrupar(**opcoes) for i in grupo[1:])
@@ -1,18 +1,26 @@
 import io
 import math
 import os
+import shutil
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Literal
 
 import pymupdf
 from PIL import Image
 from pathlib import Path
 
+from cancelamento import OperacaoCancelada, TokenCancelamento
+from deteccao_paginas import ImpressoesPaginas
+from modelo_paginas import compactar_intervalos
+
 
 # Definindo constantes
 LIMITE_INFERIOR_BYTES = 102400  # 100 KB
 LIMITE_SUPERIOR_BYTES = 4194304 # 4 MB
 FATOR_AJUSTE_PERCENTUAL = 0.05 # 5% de ajuste nas dimensões por iteração
 MAX_ITERACOES = 100 # Limite para evitar loop infinito
+PAGINAS_POR_COPIA = 50 # Páginas copiadas entre dois avisos de progresso
 
 
 def func_converter_imagem_para_pdf(
@@ -81,7 +89,9 @@ def func_juntar_pdfs(
     arquivo_saida: str,
     conversoes_de_imagem: dict[str, bytes] | None = None,
     tamanho_arquivo_limite: int = 15,
-):
+    remover_duplicadas: bool = False,
+    cancelamento: TokenCancelamento | None = None,
+) -> int:
     """
     Junta múltiplos arquivos PDF em um único documento.
 
@@ -92,10 +102,20 @@ def func_juntar_pdfs(
         do arquivo de imagem origianal e seu pdf equivalente em bytes.
         tamanho_arquivo_limite (int): A partir desse tamanho (em Mb), a função de compressão
         será executada automaticamente.
+        remover_duplicadas (bool): Descarta as páginas que repetem uma anterior, seja
+        com o mesmo conteúdo, seja visualmente igual e com o mesmo texto.
+        cancelamento (TokenCancelamento): Verificado a cada arquivo e página; se
+        cancelado, nada é gravado.
+
+    Returns:
+        int: A quantidade de páginas duplicadas removidas.
     """
+    removidas = 0
     try:
         resultado = pymupdf.open()
         for pdf_path in lista_pdfs:
+            if cancelamento:
+                cancelamento.verificar()
             if conversoes_de_imagem:
                 if pdf_path in conversoes_de_imagem:
                     with pymupdf.open(
@@ -108,33 +128,258 @@ def func_juntar_pdfs(
             else:
                 with pymupdf.open(pdf_path) as mfile:
                     resultado.insert_pdf(mfile)
-        resultado_bytes = resultado.tobytes()
+        if remover_duplicadas:
+            repetidas = ImpressoesPaginas(
+                resultado,
+                progresso=(lambda *_: cancelamento.verificar()) if cancelamento else None,
+            ).repetidas(exigir_texto=True)
+            if repetidas:
+                resultado.delete_pages(repetidas)
+                removidas = len(repetidas)
+        # Sem as páginas repetidas, os objetos que só elas usavam ficam órfãos.
+        coleta = 1 if removidas else 0
+        resultado_bytes = resultado.tobytes(garbage=coleta)
         tamanho = len(resultado_bytes)
         limite = tamanho_arquivo_limite * 1024**2
         if tamanho > limite:
             func_comprimir_pdf(
-                arquivo_entrada=resultado_bytes, arquivo_saida=arquivo_saida
+                arquivo_entrada=resultado_bytes,
+                arquivo_saida=arquivo_saida,
+                cancelamento=cancelamento,
             )
         else:
-            resultado.save(arquivo_saida)
+            if cancelamento:
+                cancelamento.verificar()
+            resultado.save(arquivo_saida, garbage=coleta)
     finally:
         resultado.close()
+    return removidas
 
 
-def func_rodar_pdf(arquivo_entrada, arquivo_saida, angulo):
+def _sumario_remapeado(sumario: list, nova_posicao: dict[int, int]) -> list:
+    """
+    Entradas do sumário (de get_toc(simple=False)) apontando para as novas
+    posições das páginas. As que apontam para páginas que ficaram de fora são
+    descartadas e seus filhos sobem de nível, para o sumário continuar válido.
+    """
+    remapeado = []
+    ancestrais = []  # (nível original, mantido) de cada entrada acima da atual
+    for nivel, titulo, pagina, *detalhes in sumario:
+        while ancestrais and ancestrais[-1][0] >= nivel:
+            ancestrais.pop()
+        mantida = pagina < 1 or pagina - 1 in nova_posicao
+        novo_nivel = 1 + sum(1 for _, acima in ancestrais if acima)
+        ancestrais.append((nivel, mantida))
+        if not mantida:
+            continue
+        if pagina >= 1:
+            pagina = nova_posicao[pagina - 1] + 1
+        destino = {
+            chave: valor
+            for chave, valor in (detalhes[0] if detalhes else {}).items()
+            if chave not in ("xref", "page")
+        }
+        remapeado.append([novo_nivel, titulo, pagina, destino])
+    return remapeado
+
+
+def func_exportar_paginas(
+    documento_origem: pymupdf.Document,
+    paginas: list[int],
+    arquivo_saida: str,
+    progresso: Callable[[int, int], None] | None = None,
+):
+    """
+    Grava um novo PDF com as páginas indicadas, na ordem dada, copiadas de um
+    documento que já está aberto, sem abrir e analisar o arquivo de novo.
+
+    Só os objetos usados pelas páginas copiadas vão para a saída, então o custo
+    é proporcional às páginas mantidas. Por isso basta uma coleta de lixo leve
+    (garbage=1) quando páginas foram descartadas e nenhuma quando a saída tem
+    todas as páginas; se nem a ordem mudou, o arquivo original é copiado.
+    Os metadados e o sumário vão junto, com os marcadores renumerados para a
+    nova ordem e sem os que apontavam para páginas descartadas.
+
+    Args:
+        documento_origem (pymupdf.Document): O documento aberto de onde copiar.
+        paginas (list[int]): Índices (base 0) das páginas, na ordem de saída.
+        arquivo_saida (str): O caminho para o arquivo PDF resultante.
+        progresso (Callable[[int, int], None]): Chamada com (páginas copiadas, total).
+    """
+    if paginas == list(range(documento_origem.page_count)) and documento_origem.name:
+        shutil.copyfile(documento_origem.name, arquivo_saida)
+        if progresso:
+            progresso(len(paginas), len(paginas))
+        return
+
+    # As páginas são copiadas em ordem crescente, em poucas chamadas a insert_pdf
+    # (uma por corrida de páginas consecutivas), e só depois reordenadas no
+    # documento novo, que já está em memória.
+    unicas = sorted(set(paginas))
+    with pymupdf.open() as destino:
+        copiadas = 0
+        for inicio, quantidade in compactar_intervalos(unicas):
+            for bloco in range(inicio, inicio + quantidade, PAGINAS_POR_COPIA):
+                fim = min(bloco + PAGINAS_POR_COPIA, inicio + quantidade) - 1
+                # O PyMuPDF reaproveita o mapa de objetos entre chamadas com a
+                # mesma origem, então recursos compartilhados não são duplicados.
+                destino.insert_pdf(documento_origem, from_page=bloco, to_page=fim)
+                copiadas += fim - bloco + 1
+                if progresso:
+                    progresso(copiadas, len(unicas))
+        if paginas != unicas:
+            posicao_copiada = {pagina: i for i, pagina in enumerate(unicas)}
+            destino.select([posicao_copiada[pagina] for pagina in paginas])
+        # insert_pdf não leva os metadados nem o sumário (marcadores) da origem.
+        destino.set_metadata(documento_origem.metadata)
+        nova_posicao = {pagina: i for i, pagina in reversed(list(enumerate(paginas)))}
+        destino.set_toc(
+            _sumario_remapeado(documento_origem.get_toc(simple=False), nova_posicao)
+        )
+        paginas_descartadas = len(unicas) < documento_origem.page_count
+        destino.save(
+            arquivo_saida, garbage=1 if paginas_descartadas else 0, deflate=True
+        )
+
+
+# Documento de origem aberto uma única vez em cada processo da divisão.
+_documento_divisao: pymupdf.Document | None = None
+
+
+def _inicializar_divisao(caminho_pdf: str):
+    global _documento_divisao
+    _documento_divisao = pymupdf.open(caminho_pdf)
+
+
+def _gravar_parte(paginas: list[int], arquivo_saida: str) -> str:
+    func_exportar_paginas(_documento_divisao, paginas, arquivo_saida)
+    return arquivo_saida
+
+
+def func_dividir_pdf(
+    caminho_pdf: str,
+    grupos: list[list[int]],
+    arquivos_saida: list[str],
+    workers: int | None = None,
+    progresso: Callable[[int, int], None] | None = None,
+    cancelamento: TokenCancelamento | None = None,
+) -> list[str]:
+    """
+    Divide um PDF em vários arquivos de uma só vez: cada processo do pool abre
+    a origem uma única vez e grava as partes que lhe couberem, em paralelo.
+
+    Args:
+        caminho_pdf (str): O caminho para o arquivo PDF de origem.
+        grupos (list[list[int]]): As páginas (base 0) de cada parte, na ordem de saída.
+        arquivos_saida (list[str]): O caminho de cada parte, alinhado a `grupos`.
+        workers (int): Número de processos; por padrão, um por núcleo.
+        progresso (Callable[[int, int], None]): Chamada com (partes gravadas, total).
+        cancelamento (TokenCancelamento): Verificado a cada parte; se cancelado,
+        as partes já gravadas são apagadas.
+
+    Returns:
+        list[str]: Os arquivos gravados.
+    """
+    total = len(grupos)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, total))
+    gravados = []
+    futuros = []
+
+    try:
+        if workers == 1:
+            with pymupdf.open(caminho_pdf) as doc:
+                for paginas, arquivo_saida in zip(grupos, arquivos_saida):
+                    if cancelamento:
+                        cancelamento.verificar()
+                    func_exportar_paginas(doc, paginas, arquivo_saida)
+                    gravados.append(arquivo_saida)
+                    if progresso:
+                        progresso(len(gravados), total)
+            return gravados
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_inicializar_divisao,
+            initargs=(caminho_pdf,),
+        ) as executor:
+            futuros.extend(
+                executor.submit(_gravar_parte, paginas, arquivo_saida)
+                for paginas, arquivo_saida in zip(grupos, arquivos_saida)
+            )
+            try:
+                for futuro in as_completed(futuros):
+                    gravados.append(futuro.result())
+                    if progresso:
+                        progresso(len(gravados), total)
+                    if cancelamento:
+                        cancelamento.verificar()
+            except OperacaoCancelada:
+                # Ao sair do bloco, o pool só espera as partes já em gravação.
+                for futuro in futuros:
+                    futuro.cancel()
+                raise
+    except OperacaoCancelada:
+        # Inclui as partes que terminaram depois do cancelamento.
+        terminados = [
+            futuro.result()
+            for futuro in futuros
+            if futuro.done() and not futuro.cancelled() and not futuro.exception()
+        ]
+        for arquivo_saida in set(gravados) | set(terminados):
+            if os.path.exists(arquivo_saida):
+                os.remove(arquivo_saida)
+        raise
+    return gravados
+
+
+def func_salvar_no_arquivo(doc: pymupdf.Document, reescrever: bool = False) -> bool:
+    """
+    Grava as alterações de um documento no próprio arquivo de onde ele foi aberto
+    e o fecha.
+
+    Quando possível, a gravação é incremental: só os objetos alterados (como o
+    dicionário das páginas giradas ou cortadas) são acrescentados ao fim do
+    arquivo, em tempo proporcional ao que foi editado. O arquivo é reescrito por
+    inteiro, com limpeza e compressão, quando `reescrever` for verdadeiro ou
+    quando o documento não permitir gravação incremental (por exemplo, se foi
+    reparado ao abrir).
+
+    Returns:
+        bool: True se a gravação foi incremental.
+    """
+    caminho = doc.name
+    if not reescrever and doc.can_save_incrementally():
+        doc.save(caminho, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+        doc.close()
+        return True
+    caminho_temporario = caminho + ".tmp"
+    doc.save(caminho_temporario, garbage=4, deflate=True)
+    doc.close()
+    os.replace(caminho_temporario, caminho)
+    return False
+
+
+def func_rodar_pdf(arquivo_entrada, arquivo_saida, angulo, reescrever=False):
     """
     Rotaciona todas as páginas de um arquivo PDF.
 
+    Só o /Rotate de cada página muda, então a saída é uma cópia do arquivo com
+    as páginas alteradas acrescentadas ao fim (ver func_salvar_no_arquivo).
+
     Args:
         arquivo_entrada (str): O caminho para o arquivo PDF de entrada.
-        arquivo_saida (str): O caminho para o arquivo PDF de saída.
+        arquivo_saida (str): O caminho para o arquivo PDF de saída (pode ser o mesmo).
         angulo (int): O ângulo de rotação (90, 180, 270).
+        reescrever (bool): Reescreve o arquivo inteiro em vez de gravar incrementalmente.
     """
-    doc = pymupdf.open(arquivo_entrada)
+    if os.path.abspath(arquivo_entrada) != os.path.abspath(arquivo_saida):
+        shutil.copyfile(arquivo_entrada, arquivo_saida)
+    doc = pymupdf.open(arquivo_saida)
     for pagina in doc:
-        pagina.set_rotation(pagina.rotation + angulo)
-    doc.save(arquivo_saida)
-    doc.close()
+        pagina.set_rotation((pagina.rotation + angulo) % 360)
+    func_salvar_no_arquivo(doc, reescrever)
 
 
 def func_comprimir_pdf(
@@ -142,6 +387,7 @@ def func_comprimir_pdf(
     arquivo_saida: str,
     qualidade_imagem: int = 40,  # Padrão mais comum para um bom equilíbrio
     nivel_compresao_png: int = 8,
+    cancelamento: TokenCancelamento | None = None,
 ):
     """
     Comprime um arquivo PDF, padronizando as páginas para o formato A4 e
@@ -152,6 +398,8 @@ def func_comprimir_pdf(
         arquivo_saida (str): O caminho para salvar o PDF comprimido.
         qualidade_imagem (int): Qualidade para imagens JPEG (1-100).
         nivel_compresao_png (int): Nível de compressão para imagens PNG (0-9).
+        cancelamento (TokenCancelamento): Verificado a cada página e imagem; se
+        cancelado, nada é gravado.
     """
     try:
         # Abre o documento original a partir do caminho ou de bytes
@@ -167,108 +415,114 @@ def func_comprimir_pdf(
     doc_final = pymupdf.open()
     A4_RECT = pymupdf.paper_rect("a4")
 
-    # Itera por cada página do documento original
-    for n, page_original in enumerate(doc_original):
-        print(f"Página {n + 1} de {len(doc_original)}")
-        # Cria uma nova página A4 no documento final
-        page_final = doc_final.new_page(width=A4_RECT.width, height=A4_RECT.height)
-
-        # --- Etapa 1: Redimensionar e transferir conteúdo vetorialmente ---
-        # Calcula o retângulo de destino para manter a proporção
-        w0, h0 = page_original.rect.width, page_original.rect.height
-
-        # Pega as dimensões da página de destino (A4)
-        w1, h1 = A4_RECT.width, A4_RECT.height
-
-        # Calcula os fatores de escala
-        scale_x = w1 / w0
-        scale_y = h1 / h0
-
-        # Usa o menor fator para não distorcer a imagem
-        scale = min(scale_x, scale_y)
-
-        # Calcula as novas dimensões
-        new_w = w0 * scale
-        new_h = h0 * scale
-
-        # Calcula o ponto de partida (x, y) para centralizar o conteúdo
-        x_offset = (w1 - new_w) / 2
-        y_offset = (h1 - new_h) / 2
-
-        # Cria o retângulo de destino final
-        target_rect = pymupdf.Rect(
-            x_offset, y_offset, x_offset + new_w, y_offset + new_h
-        )
+    try:
+        # Itera por cada página do documento original
+        for n, page_original in enumerate(doc_original):
+            if cancelamento:
+                cancelamento.verificar()
+            print(f"Página {n + 1} de {len(doc_original)}")
+            # Cria uma nova página A4 no documento final
+            page_final = doc_final.new_page(width=A4_RECT.width, height=A4_RECT.height)
+
+            # --- Etapa 1: Redimensionar e transferir conteúdo vetorialmente ---
+            # Calcula o retângulo de destino para manter a proporção
+            w0, h0 = page_original.rect.width, page_original.rect.height
+
+            # Pega as dimensões da página de destino (A4)
+            w1, h1 = A4_RECT.width, A4_RECT.height
+
+            # Calcula os fatores de escala
+            scale_x = w1 / w0
+            scale_y = h1 / h0
+
+            # Usa o menor fator para não distorcer a imagem
+            scale = min(scale_x, scale_y)
 
-        # Mostra a página original na nova página A4, redimensionando o conteúdo
-        # sem rasterizar. Textos e vetores continuam sendo textos e vetores.
-        page_final.show_pdf_page(
-            target_rect,  # Onde desenhar na nova página
-            doc_original,  # Documento de origem
-            page_original.number,  # Número da página de origem
-        )
+            # Calcula as novas dimensões
+            new_w = w0 * scale
+            new_h = h0 * scale
 
-        # --- Etapa 2: Comprimir as imagens na nova página ---
-        images = page_final.get_images(full=True)
-        for img_info in images:
-            # Pula imagens "inline" que são geralmente pequenas
-            if img_info[1] > 0:
-                continue
+            # Calcula o ponto de partida (x, y) para centralizar o conteúdo
+            x_offset = (w1 - new_w) / 2
+            y_offset = (h1 - new_h) / 2
 
-            xref = img_info[0]
-            try:
-                base_image = doc_final.extract_image(xref)
-                image_bytes = base_image["image"]
+            # Cria o retângulo de destino final
+            target_rect = pymupdf.Rect(
+                x_offset, y_offset, x_offset + new_w, y_offset + new_h
+            )
 
-                # Usa Pillow para reprocessar a imagem
-                image = Image.open(io.BytesIO(image_bytes))
-                img_buffer = io.BytesIO()
+            # Mostra a página original na nova página A4, redimensionando o conteúdo
+            # sem rasterizar. Textos e vetores continuam sendo textos e vetores.
+            page_final.show_pdf_page(
+                target_rect,  # Onde desenhar na nova página
+                doc_original,  # Documento de origem
+                page_original.number,  # Número da página de origem
+            )
 
-                # Se a imagem tem transparência, usa PNG para preservá-la
-                if image.mode in ("RGBA", "LA") or (
-                    image.mode == "P" and "transparency" in image.info
-                ):
-                    image.save(
-                        img_buffer,
-                        format="PNG",
-                        optimize=True,
-                        compress_level=nivel_compresao_png,
-                    )
-                # Caso contrário, converte para RGB e usa JPEG
-                else:
-                    if image.mode != "RGB":
-                        image = image.convert("RGB")
-                    image.save(
-                        img_buffer,
-                        format="JPEG",
-                        quality=qualidade_imagem,
-                        optimize=True,
-                    )
-
-                compressed_bytes = img_buffer.getvalue()
-
-                # Substitui a imagem original pela versão comprimida
-                # O PyMuPDF v1.24+ tem um método direto para isso
-                if hasattr(page_final, "replace_image"):
-                    page_final.replace_image(xref, stream=compressed_bytes)
-                else:  # Fallback para versões mais antigas
-                    img_rect = page_final.get_image_rects(xref)[0]
-                    page_final.delete_image(
-                        xref
-                    )  # Método mais seguro que _deleteObject
-                    page_final.insert_image(img_rect, stream=compressed_bytes)
-
-            except Exception as e:
-                print(f"Não foi possível processar a imagem com xref {xref}: {e}")
-                continue
-
-    # Salva o arquivo final com otimizações
-    try:
-        doc_final.save(arquivo_saida, garbage=4, deflate=True, clean=True)
-        print(f"🎉 Arquivo salvo com sucesso em: {arquivo_saida}")
-    except Exception as e:
-        print(f"Erro ao salvar o PDF final: {e}")
+            # --- Etapa 2: Comprimir as imagens na nova página ---
+            images = page_final.get_images(full=True)
+            for img_info in images:
+                if cancelamento:
+                    cancelamento.verificar()
+                # Pula imagens "inline" que são geralmente pequenas
+                if img_info[1] > 0:
+                    continue
+
+                xref = img_info[0]
+                try:
+                    base_image = doc_final.extract_image(xref)
+                    image_bytes = base_image["image"]
+
+                    # Usa Pillow para reprocessar a imagem
+                    image = Image.open(io.BytesIO(image_bytes))
+                    img_buffer = io.BytesIO()
+
+                    # Se a imagem tem transparência, usa PNG para preservá-la
+                    if image.mode in ("RGBA", "LA") or (
+                        image.mode == "P" and "transparency" in image.info
+                    ):
+                        image.save(
+                            img_buffer,
+                            format="PNG",
+                            optimize=True,
+                            compress_level=nivel_compresao_png,
+                        )
+                    # Caso contrário, converte para RGB e usa JPEG
+                    else:
+                        if image.mode != "RGB":
+                            image = image.convert("RGB")
+                        image.save(
+                            img_buffer,
+                            format="JPEG",
+                            quality=qualidade_imagem,
+                            optimize=True,
+                        )
+
+                    compressed_bytes = img_buffer.getvalue()
+
+                    # Substitui a imagem original pela versão comprimida
+                    # O PyMuPDF v1.24+ tem um método direto para isso
+                    if hasattr(page_final, "replace_image"):
+                        page_final.replace_image(xref, stream=compressed_bytes)
+                    else:  # Fallback para versões mais antigas
+                        img_rect = page_final.get_image_rects(xref)[0]
+                        page_final.delete_image(
+                            xref
+                        )  # Método mais seguro que _deleteObject
+                        page_final.insert_image(img_rect, stream=compressed_bytes)
+
+                except Exception as e:
+                    print(f"Não foi possível processar a imagem com xref {xref}: {e}")
+                    continue
+
+        # Salva o arquivo final com otimizações
+        try:
+            doc_final.save(arquivo_saida, garbage=4, deflate=True, clean=True)
+            print(f"🎉 Arquivo salvo com sucesso em: {arquivo_saida}")
+        except Exception as e:
+            print(f"Erro ao salvar o PDF final: {e}")
     finally:
+        # Fecha os dois documentos também quando a operação é cancelada
         doc_original.close()
         doc_final.close()
 
@@ -286,9 +540,10 @@ def obter_tamanho_bytes(image_obj: Image.Image | str, format_str: Literal["PNG",
         print(f"Erro ao obter tamanho da imagem: {e}")
         return 0
 
-def ajusta_tamanho_imagem(caminho: str | io.BytesIO, nome_salvamento: str | Path, extensao: Literal["PNG", "JPEG"] = "PNG"):
+def ajusta_tamanho_imagem(caminho: str | io.BytesIO, nome_salvamento: str | Path, extensao: Literal["PNG", "JPEG"] = "PNG", cancelamento: TokenCancelamento | None = None):
     """
     Ajusta o tamanho de uma imagem para que fique entre LIMITE_INFERIOR_BYTES e LIMITE_SUPERIOR_BYTES.
+    O `cancelamento` é verificado a cada iteração, que recodifica a imagem inteira.
     """
     if isinstance(caminho, str):
         img = Image.open(caminho)
@@ -297,6 +552,8 @@ def ajusta_tamanho_imagem(caminho: str | io.BytesIO, nome_salvamento: str | Path
         img = Image.open(caminho)
 
     for i in range(MAX_ITERACOES):
+        if cancelamento:
+            cancelamento.verificar()
         # Sempre obtenha o tamanho atualizado da imagem no buffer
         if i == 0 and isinstance(caminho, str):
             tamanho_atual_bytes = obter_tamanho_bytes(caminho)
@@ -332,17 +589,36 @@ def ajusta_tamanho_imagem(caminho: str | io.BytesIO, nome_salvamento: str | Path
 
 
 def func_converter_pdf_imagem(
-    caminho_pdf: str
-) -> None:
+    caminho_pdf: str,
+    pasta_saida: str | Path | None = None,
+    cancelamento: TokenCancelamento | None = None,
+) -> list[Path]:
+    """
+    Salva cada página do PDF como PNG ({nome}_{página}.png), na pasta do
+    arquivo ou em `pasta_saida`, e devolve as imagens gravadas. Se o
+    `cancelamento` for acionado, as imagens já gravadas são apagadas.
+    """
+    gravadas = []
     with pymupdf.open(caminho_pdf) as pdf:
-        origem = Path(caminho_pdf).parent
+        origem = Path(pasta_saida) if pasta_saida else Path(caminho_pdf).parent
         nome = Path(caminho_pdf).stem
-        for i, pagina in enumerate(pdf):
-            matriz_de_transformacao = pymupdf.Matrix(1.0, 1.0)
-            pix = pagina.get_pixmap(matrix=matriz_de_transformacao)
-            pix_pil = pix.pil_image()
-            buffer = io.BytesIO()
-            pix_pil.save(buffer, format='PNG')
-            caminho_salvamento = origem / f"{nome}_{i+1}.png"
-            ajusta_tamanho_imagem(buffer, nome_salvamento=caminho_salvamento)
+        try:
+            for i, pagina in enumerate(pdf):
+                if cancelamento:
+                    cancelamento.verificar()
+                matriz_de_transformacao = pymupdf.Matrix(1.0, 1.0)
+                pix = pagina.get_pixmap(matrix=matriz_de_transformacao)
+                pix_pil = pix.pil_image()
+                buffer = io.BytesIO()
+                pix_pil.save(buffer, format='PNG')
+                caminho_salvamento = origem / f"{nome}_{i+1}.png"
+                if ajusta_tamanho_imagem(
+                    buffer, nome_salvamento=caminho_salvamento, cancelamento=cancelamento
+                ):
+                    gravadas.append(caminho_salvamento)
+        except OperacaoCancelada:
+            for caminho in gravadas:
+                caminho.unlink(missing_ok=True)
+            raise
+    return gravadas
 
@@ -2,18 +2,52 @@
 PROJETO DE CRIAÇÃO DO EXECUTÁVEL DE MANIPULADOR DE PDF PARA O DOSSIE DA SINTECH.
 """
 
+import multiprocessing
 import os
 from pathlib import Path
-import queue
-import threading
 import tkinter as tk
 from tkinter import Toplevel, filedialog, messagebox, ttk
 
-from funcs_pdf import func_converter_imagem_para_pdf, func_converter_pdf_imagem, func_juntar_pdfs, func_comprimir_pdf
+from agendador import despachar_no_tk, obter_agendador
+from operacoes_lote import executar_lote, juntar_arquivos, preparar_tarefas
 from organizador_pdf import ReorganizerWindow
 from pdf_popup import PDFPopup
 
 
+def _trabalho_em_lote(trabalho, operacao, caminhos):
+    """
+    Executa uma operação de operacoes_lote em cada arquivo, no pool de
+    processos do agendador, e devolve as falhas ("arquivo: erro").
+    """
+    agendador = trabalho.agendador
+    tarefas = preparar_tarefas(operacao, caminhos)
+    falhas = []
+    resultados = executar_lote(
+        tarefas,
+        agendador.max_processos,
+        agendador.processos,
+        trabalho.cancelamento_entre_processos(),
+    )
+    for concluidas, resultado in enumerate(resultados, start=1):
+        nome_arquivo = Path(resultado["entradas"][0]).stem
+        if not resultado["ok"]:
+            falhas.append(f"{nome_arquivo}: {resultado['erro']}")
+        trabalho.progresso(
+            concluidas, len(tarefas), f"Processado {concluidas}/{len(tarefas)}: {nome_arquivo}"
+        )
+    return falhas
+
+
+def _trabalho_juntar(trabalho, arquivos, arquivo_saida, remover_duplicadas):
+    return trabalho.agendador.processos.submit(
+        juntar_arquivos,
+        arquivos,
+        arquivo_saida,
+        remover_duplicadas,
+        trabalho.cancelamento_entre_processos(),
+    ).result()
+
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -104,6 +138,12 @@ class App(tk.Tk):
 
         self.progress_bar = ttk.Progressbar(self, mode="indeterminate")
 
+        # Os trabalhos demorados vão para o agendador compartilhado; um único
+        # laço na thread do Tk entrega o andamento de todos eles.
+        self.agendador = obter_agendador()
+        despachar_no_tk(self, self.agendador)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
     # --- Funções de Comando (Callbacks) ---
 
     def selecionar_arquivos(self):
@@ -208,13 +248,6 @@ class App(tk.Tk):
         if len(self.lista_arquivos) <= 1:
             self.selecionar_arquivos()
             return
-        conversao = {}
-        for arquivo in self.lista_arquivos:
-            if os.path.splitext(arquivo)[1] in [".png", ".jpg", ".jpeg"]:
-                conversao[arquivo] = func_converter_imagem_para_pdf(
-                    arquivo, stream=True
-                )
-
         arquivo_saida = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=(("Arquivos PDF", "*.pdf"),),
@@ -223,63 +256,151 @@ class App(tk.Tk):
         if not arquivo_saida:
             return
 
-        mensagem = f"Arquivo {os.path.split(arquivo_saida)[-1]} salvo com sucesso!"
-        if not conversao:
-            func_juntar_pdfs(self.lista_arquivos, arquivo_saida)
-            messagebox.showinfo("Salvamento", mensagem)
-        else:
-            func_juntar_pdfs(self.lista_arquivos, arquivo_saida, conversao)
+        remover_duplicadas = messagebox.askyesno(
+            "Páginas duplicadas",
+            "Remover as páginas que se repetem entre os arquivos?",
+        )
+
+        popup, label_status, _ = self._abrir_popup_progresso("Juntando...")
+
+        def ao_concluir(removidas):
+            popup.destroy()
+            mensagem = f"Arquivo {os.path.split(arquivo_saida)[-1]} salvo com sucesso!"
+            if removidas:
+                mensagem += f"\n{removidas} página(s) duplicada(s) removida(s)."
             messagebox.showinfo("Salvamento", mensagem)
 
+        def ao_falhar(mensagem):
+            popup.destroy()
+            messagebox.showerror("Erro ao juntar", mensagem)
+
+        trabalho = self.agendador.enviar(
+            "juntar",
+            _trabalho_juntar,
+            list(self.lista_arquivos),
+            arquivo_saida,
+            remover_duplicadas,
+            descricao="Juntar arquivos",
+            ao_iniciar=lambda: label_status.config(text="Juntando arquivos..."),
+            ao_concluir=ao_concluir,
+            ao_falhar=ao_falhar,
+            ao_cancelar=popup.destroy,
+        )
+        self._adicionar_controles(popup, label_status, trabalho)
+
     def comprimir_pdf(self):
         if not self.lista_arquivos:
             self.selecionar_arquivos()
             return
         
-        self.popup_progresso = Toplevel(self) # self.master ou a referência da sua janela principal
-        self.popup_progresso.title("Comprimindo...")
-        
-        # --- Configurações do Popup (Modal e Centralizado) ---
-        self.popup_progresso.transient(self)
-        self.popup_progresso.resizable(False, False)
-        
-        # Adiciona os widgets de feedback DENTRO do popup
-        # Usamos 'self.' para que a função _processar_fila possa acessá-los
-        self.label_popup_status = ttk.Label(self.popup_progresso, text="Iniciando...", anchor="w", width=50)
-        self.label_popup_status.pack(pady=(10, 5), padx=10, fill="x")
+        filepaths = [arquivo for arquivo in self.lista_arquivos if Path(arquivo).suffix == ".pdf"]
+        if not filepaths:
+            return
+        self._executar_em_lote(
+            "comprimir",
+            "comprimir",
+            filepaths,
+            "Comprimindo...",
+            "Todos os arquivos foram comprimidos!",
+            "Erro de Compressão",
+        )
 
-        self.barra_popup_progresso = ttk.Progressbar(self.popup_progresso, orient='horizontal', length=300, mode='determinate')
-        self.barra_popup_progresso.pack(pady=(0, 15), padx=10)
-        self.barra_popup_progresso['maximum'] = len(self.lista_arquivos)
+    def _abrir_popup_progresso(self, titulo, maximo=None):
+        """
+        Popup com um rótulo de status e uma barra de progresso (que só indica
+        atividade quando não há `maximo`). Não é modal: outras operações podem
+        ser iniciadas enquanto esta roda.
+        """
+        popup = Toplevel(self)
+        popup.title(titulo)
+        popup.transient(self)
+        popup.resizable(False, False)
+
+        label_status = ttk.Label(popup, text="Aguardando...", anchor="w", width=50)
+        label_status.pack(pady=(10, 5), padx=10, fill="x")
+
+        modo = "determinate" if maximo else "indeterminate"
+        barra = ttk.Progressbar(popup, orient='horizontal', length=300, mode=modo)
+        barra.pack(pady=(0, 15), padx=10)
+        if maximo:
+            barra['maximum'] = maximo
+        else:
+            barra.start()
 
         # Centraliza o popup
-        self.popup_progresso.update_idletasks()
-        # ... (cálculo de geometria para centralizar) ...
+        popup.update_idletasks()
         main_x = self.winfo_x()
         main_y = self.winfo_y()
         main_width = self.winfo_width()
         main_height = self.winfo_height()
-        popup_width = self.popup_progresso.winfo_width()
-        popup_height = self.popup_progresso.winfo_height()
+        popup_width = popup.winfo_width()
+        popup_height = popup.winfo_height()
         pos_x = main_x + (main_width // 2) - (popup_width // 2)
         pos_y = main_y + (main_height // 2) - (popup_height // 2)
-        self.popup_progresso.geometry(f"+{pos_x}+{pos_y}")
+        popup.geometry(f"+{pos_x}+{pos_y}")
+        return popup, label_status, barra
 
-        self.popup_progresso.focus_set()
-        self.popup_progresso.grab_set()
-
-        # 3. CRIAR FILA E INICIAR THREAD (igual a antes)
-        self.fila_feedback = queue.Queue()
-        thread_conversor = threading.Thread(
-            target=self._worker_compressao,
-            args=(self.lista_arquivos, self.fila_feedback)
+    def _adicionar_controles(self, popup, label_status, trabalho):
+        """
+        Botões de pausar/retomar e cancelar o trabalho mostrado no popup.
+        Fechar o popup também cancela; ele some quando o trabalho parar.
+        """
+        botoes = ttk.Frame(popup)
+        botoes.pack(pady=(0, 10))
+
+        def alternar_pausa():
+            if trabalho.cancelamento.pausado:
+                trabalho.retomar()
+                botao_pausa.config(text="Pausar")
+            else:
+                trabalho.pausar()
+                botao_pausa.config(text="Retomar")
+                label_status.config(text="Pausado.")
+
+        def cancelar():
+            trabalho.cancelar()
+            label_status.config(text="Cancelando...")
+            botao_pausa.config(state="disabled")
+            botao_cancelar.config(state="disabled")
+
+        botao_pausa = ttk.Button(botoes, text="Pausar", command=alternar_pausa)
+        botao_pausa.pack(side=tk.LEFT, padx=5)
+        botao_cancelar = ttk.Button(botoes, text="Cancelar", command=cancelar)
+        botao_cancelar.pack(side=tk.LEFT, padx=5)
+        popup.protocol("WM_DELETE_WINDOW", cancelar)
+
+    def _executar_em_lote(self, tipo, operacao, filepaths, titulo, mensagem_sucesso, titulo_erro):
+        """Envia uma operação sobre vários arquivos ao agendador, com um popup de progresso."""
+        popup, label_status, barra = self._abrir_popup_progresso(titulo, len(filepaths))
+
+        def ao_progresso(atual, total, texto):
+            barra['value'] = atual
+            label_status.config(text=texto)
+
+        def ao_concluir(falhas):
+            popup.destroy()
+            if falhas:
+                messagebox.showerror(titulo_erro, "\n".join(falhas))
+            else:
+                messagebox.showinfo("Sucesso", mensagem_sucesso)
+
+        def ao_falhar(mensagem):
+            popup.destroy()
+            messagebox.showerror(titulo_erro, mensagem)
+
+        trabalho = self.agendador.enviar(
+            tipo,
+            _trabalho_em_lote,
+            operacao,
+            filepaths,
+            descricao=titulo,
+            ao_iniciar=lambda: label_status.config(text="Iniciando..."),
+            ao_progresso=ao_progresso,
+            ao_concluir=ao_concluir,
+            ao_falhar=ao_falhar,
+            ao_cancelar=popup.destroy,
         )
-        thread_conversor.daemon = True
-        thread_conversor.start()
-
-        # 4. INICIAR O VERIFICADOR (igual a antes)
-        self.after(100, self._processar_fila)
-
+        self._adicionar_controles(popup, label_status, trabalho)
 
     def abrir_pdf(self):
         """Abre a caixa de diálogo e cria a janela de pop-up para visualização."""
@@ -378,164 +499,21 @@ class App(tk.Tk):
         if not filepaths:
             return
         
-        # 2. CRIAR O POPUP DE PROGRESSO
-        self.popup_progresso = Toplevel(self) # self.master ou a referência da sua janela principal
-        self.popup_progresso.title("Convertendo...")
-        
-        # --- Configurações do Popup (Modal e Centralizado) ---
-        self.popup_progresso.transient(self)
-        self.popup_progresso.resizable(False, False)
-        
-        # Adiciona os widgets de feedback DENTRO do popup
-        # Usamos 'self.' para que a função _processar_fila possa acessá-los
-        self.label_popup_status = ttk.Label(self.popup_progresso, text="Iniciando...", anchor="w", width=50)
-        # self.label_popup_status = ttk.Label(self.popup_progresso, text=f"Processando {1}/{len(filepaths)}: {Path(self.lista_arquivos[0]).stem}", anchor="w", width=50)
-        self.label_popup_status.pack(pady=(10, 5), padx=10, fill="x")
-
-        self.barra_popup_progresso = ttk.Progressbar(self.popup_progresso, orient='horizontal', length=300, mode='determinate')
-        self.barra_popup_progresso.pack(pady=(0, 15), padx=10)
-        self.barra_popup_progresso['maximum'] = len(filepaths)
-
-        # Centraliza o popup
-        self.popup_progresso.update_idletasks()
-        # ... (cálculo de geometria para centralizar) ...
-        main_x = self.winfo_x()
-        main_y = self.winfo_y()
-        main_width = self.winfo_width()
-        main_height = self.winfo_height()
-        popup_width = self.popup_progresso.winfo_width()
-        popup_height = self.popup_progresso.winfo_height()
-        pos_x = main_x + (main_width // 2) - (popup_width // 2)
-        pos_y = main_y + (main_height // 2) - (popup_height // 2)
-        self.popup_progresso.geometry(f"+{pos_x}+{pos_y}")
-
-        self.popup_progresso.focus_set()
-        self.popup_progresso.grab_set()
-
-        # 3. CRIAR FILA E INICIAR THREAD (igual a antes)
-        self.fila_feedback = queue.Queue()
-        thread_conversor = threading.Thread(
-            target=self._worker_conversao,
-            args=(filepaths, self.fila_feedback)
+        filepaths = [arquivo for arquivo in filepaths if Path(arquivo).suffix == ".pdf"]
+        if not filepaths:
+            return
+        self._executar_em_lote(
+            "converter",
+            "pdf-para-imagens",
+            filepaths,
+            "Convertendo...",
+            "Todos os arquivos foram convertidos!",
+            "Erro de Conversão",
         )
-        thread_conversor.daemon = True
-        thread_conversor.start()
-
-        # 4. INICIAR O VERIFICADOR (igual a antes)
-        self.after(100, self._processar_fila)
 
-    def _worker_conversao(self, filepaths, fila):
-        """
-        Função "Trabalhadora": NENHUMA MUDANÇA NECESSÁRIA.
-        Ela apenas envia relatórios para a fila, sem saber onde serão exibidos.
-        """
-        try:
-            total_arquivos = len(filepaths)
-            for i, caminho in enumerate(filepaths):
-                nome_arquivo = Path(caminho).stem
-
-                # --- MENSAGEM 1: AVISANDO QUE VAI COMEÇAR ---
-                # Esta mensagem é apenas para atualizar o texto do label.
-                aviso_inicio = {
-                    "tipo": "iniciando_arquivo",
-                    "total": total_arquivos,
-                    "atual": i + 1,
-                    "arquivo": nome_arquivo
-                }
-                fila.put(aviso_inicio)
-
-                # --- EXECUTA A TAREFA PESADA ---
-                # (A sua função de conversão real)
-                func_converter_pdf_imagem(caminho)
-
-                # --- MENSAGEM 2: AVISANDO QUE TERMINOU ---
-                # Esta mensagem é para avançar a barra de progresso.
-                progresso = {
-                    "tipo": "progresso",
-                    "atual": i + 1,
-                }
-                fila.put(progresso)
-
-            # Ao final de tudo, envia a mensagem de sucesso
-            fila.put({"tipo": "sucesso"})
-
-        except Exception as e:
-            # Se der erro em qualquer ponto, envia a mensagem de erro
-            fila.put({"tipo": "erro", "mensagem": str(e)})
-
-    def _worker_compressao(self, filepaths, fila):
-        """
-        Função "Trabalhadora": NENHUMA MUDANÇA NECESSÁRIA.
-        Ela apenas envia relatórios para a fila, sem saber onde serão exibidos.
-        """
-        try:
-            total_arquivos = len(filepaths)
-            for i, caminho in enumerate(filepaths):
-                nome_arquivo = Path(caminho).stem
-                ext = Path(caminho).suffix
-
-                if ext == ".pdf":
-                    aviso_inicio = {
-                        "tipo": "iniciando_arquivo",
-                        "total": total_arquivos,
-                        "atual": i + 1,
-                        "arquivo": nome_arquivo
-                    }
-                    fila.put(aviso_inicio)
-                    
-                    # --- EXECUTA A TAREFA PESADA ---
-                    novo_nome = f"{Path(caminho).with_suffix('')}_compressed.pdf"
-                    func_comprimir_pdf(caminho, novo_nome)
-
-                    # --- MENSAGEM 2: AVISANDO QUE TERMINOU ---
-                    # Esta mensagem é para atualizar a BARRA DE PROGRESSO.
-                    progresso = {
-                        "tipo": "progresso",
-                        "atual": i + 1,
-                    }
-                    fila.put(progresso)
-            
-            fila.put({"tipo": "sucesso"})
-        except Exception as e:
-            fila.put({"tipo": "erro", "mensagem": str(e)})
-
-    def _processar_fila(self):
-        """
-        Função "Verificadora" (VERSÃO CORRIGIDA E ROBUSTA):
-        Lê a fila e atualiza os widgets do POPUP de forma segura.
-        """
-        finalizar_loop = False
-        try:
-            while not self.fila_feedback.empty():
-                mensagem = self.fila_feedback.get_nowait()
-
-                if mensagem["tipo"] == "iniciando_arquivo":
-                    # Se a mensagem é de início, APENAS atualize o texto do label.
-                    status_text = f"Processando {mensagem['atual']}/{mensagem['total']}: {mensagem['arquivo']}"
-                    self.label_popup_status.config(text=status_text)
-                
-                elif mensagem["tipo"] == "progresso":
-                    # Se a mensagem é de progresso, APENAS atualize a barra.
-                    self.barra_popup_progresso['value'] = mensagem['atual']
-
-                elif mensagem["tipo"] == "sucesso":
-                    self.label_popup_status.config(text="Compressão concluída com sucesso!")
-                    self.barra_popup_progresso['value'] = self.barra_popup_progresso['maximum']
-                    messagebox.showinfo("Sucesso", "Todos os arquivos foram comprimidos!")
-                    finalizar_loop = True
-
-                elif mensagem["tipo"] == "erro":
-                    self.label_popup_status.config(text="Erro na compressão!")
-                    messagebox.showerror("Erro de Compressão", mensagem["mensagem"])
-                    finalizar_loop = True
-
-        except queue.Empty:
-            pass
-
-        if finalizar_loop:
-            self.popup_progresso.destroy()
-        else:
-            self.after(100, self._processar_fila)
+    def on_close(self):
+        self.agendador.encerrar()
+        self.destroy()
 
     def on_treeview_click(self, event):
         """
@@ -554,5 +532,6 @@ class App(tk.Tk):
 
 # --- Execução da Aplicação ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = App()
     app.mainloop()
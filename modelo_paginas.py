@@ -0,0 +1,370 @@
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, chain, compress
+
+# --- Constantes do modelo ---
+TAMANHO_BLOCO = 512  # Páginas por bloco da sequência
+HISTORICO_MAXIMO = 1000  # Comandos guardados para desfazer
+_INVERTER_BITS = bytes([1, 0]) + bytes(254)  # Tabela para bytearray.translate
+
+
+class SequenciaPaginas:
+    """
+    Ordem das páginas (índices originais) guardada em blocos de até
+    TAMANHO_BLOCO itens.
+
+    Remover ou inserir páginas só reconstrói os blocos afetados, em vez de
+    deslocar a lista inteira a cada `pop`/`insert`; o acesso por posição é
+    uma busca binária sobre o início de cada bloco.
+    """
+
+    def __init__(self, paginas=()):
+        self._definir(list(paginas))
+
+    def _definir(self, paginas: list[int]):
+        self._blocos = [
+            paginas[i : i + TAMANHO_BLOCO]
+            for i in range(0, len(paginas), TAMANHO_BLOCO)
+        ]
+        self._tamanho = len(paginas)
+        self._inicios = None
+
+    def __len__(self):
+        return self._tamanho
+
+    def __iter__(self):
+        return chain.from_iterable(self._blocos)
+
+    def __eq__(self, outra):
+        if isinstance(outra, SequenciaPaginas):
+            return len(self) == len(outra) and all(a == b for a, b in zip(self, outra))
+        return NotImplemented
+
+    def __getitem__(self, posicao: int) -> int:
+        if posicao < 0:
+            posicao += self._tamanho
+        if not 0 <= posicao < self._tamanho:
+            raise IndexError("posição fora da sequência")
+        bloco, deslocamento = self._localizar(posicao)
+        return self._blocos[bloco][deslocamento]
+
+    def paginas(self) -> list[int]:
+        return list(self)
+
+    def copy(self) -> "SequenciaPaginas":
+        return SequenciaPaginas(self)
+
+    def substituir(self, paginas):
+        """Troca todo o conteúdo, mantendo o mesmo objeto."""
+        self._definir(list(paginas))
+
+    def _indices_inicio(self) -> list[int]:
+        if self._inicios is None:
+            self._inicios = list(accumulate((len(b) for b in self._blocos), initial=0))
+        return self._inicios
+
+    def _localizar(self, posicao: int) -> tuple[int, int]:
+        """Bloco que contém a posição e o deslocamento dentro dele."""
+        inicios = self._indices_inicio()
+        bloco = bisect_right(inicios, posicao) - 1
+        return bloco, posicao - inicios[bloco]
+
+    def extrair(self, posicoes: list[int]) -> list[int]:
+        """Remove as páginas das posições (em ordem crescente) e as devolve."""
+        if not posicoes:
+            return []
+        inicios = self._indices_inicio()
+        extraidas = []
+        por_bloco: dict[int, set[int]] = {}
+        for posicao in posicoes:
+            bloco = bisect_right(inicios, posicao) - 1
+            deslocamento = posicao - inicios[bloco]
+            por_bloco.setdefault(bloco, set()).add(deslocamento)
+            extraidas.append(self._blocos[bloco][deslocamento])
+        for bloco, deslocamentos in por_bloco.items():
+            self._blocos[bloco] = [
+                pagina
+                for i, pagina in enumerate(self._blocos[bloco])
+                if i not in deslocamentos
+            ]
+        self._blocos = [bloco for bloco in self._blocos if bloco]
+        self._tamanho -= len(extraidas)
+        self._inicios = None
+        # Muitas remoções espalhadas deixam blocos pequenos; reagrupa de vez em quando.
+        if len(self._blocos) > 2 * (self._tamanho // TAMANHO_BLOCO + 1) + 8:
+            self._definir(list(self))
+        return extraidas
+
+    def inserir(self, posicao: int, paginas: list[int]):
+        """Insere as páginas, em sequência, a partir da posição indicada."""
+        if not paginas:
+            return
+        if not self._blocos:
+            self._definir(list(paginas))
+            return
+        if posicao >= self._tamanho:
+            bloco, deslocamento = len(self._blocos) - 1, len(self._blocos[-1])
+        else:
+            bloco, deslocamento = self._localizar(posicao)
+        atual = self._blocos[bloco]
+        novo = atual[:deslocamento] + list(paginas) + atual[deslocamento:]
+        self._blocos[bloco : bloco + 1] = [
+            novo[i : i + TAMANHO_BLOCO] for i in range(0, len(novo), TAMANHO_BLOCO)
+        ]
+        self._tamanho += len(paginas)
+        self._inicios = None
+
+    def mover(self, posicoes: list[int], posicao_insercao: int) -> int:
+        """
+        Move as páginas das posições (em ordem crescente) para que fiquem juntas
+        a partir de `posicao_insercao`, contada depois da remoção.
+        """
+        self.inserir(posicao_insercao, self.extrair(posicoes))
+        return posicao_insercao
+
+
+class SelecaoPosicoes:
+    """
+    Conjunto de posições selecionadas guardado como um bitset (um byte por
+    posição). Pertinência, marcação e contagem são O(1); intervalos e
+    filtragens usam operações em C do bytearray, sem laços em Python.
+    """
+
+    def __init__(self, total: int):
+        self._bits = bytearray(total)
+        self._quantidade = 0
+
+    def __contains__(self, posicao: int) -> bool:
+        return 0 <= posicao < len(self._bits) and self._bits[posicao] == 1
+
+    def __len__(self):
+        return self._quantidade
+
+    def __bool__(self):
+        return self._quantidade > 0
+
+    def __iter__(self):
+        """Posições selecionadas em ordem crescente."""
+        return compress(range(len(self._bits)), self._bits)
+
+    def ordenadas(self) -> list[int]:
+        return list(self)
+
+    def primeira(self) -> int:
+        return self._bits.find(1)
+
+    def ultima(self) -> int:
+        return self._bits.rfind(1)
+
+    def antes_de(self, posicao: int) -> int:
+        """Quantas posições selecionadas há antes de `posicao`."""
+        return self._bits.count(1, 0, max(0, posicao))
+
+    def limpar(self):
+        if self._quantidade:
+            self._bits = bytearray(len(self._bits))
+            self._quantidade = 0
+
+    def definir(self, posicoes):
+        """Troca a seleção pelas posições informadas."""
+        self.limpar()
+        for posicao in posicoes:
+            self._bits[posicao] = 1
+        self._quantidade = self._bits.count(1)
+
+    def definir_corridas(self, corridas: list[tuple[int, int]]):
+        """Troca a seleção pelas corridas (início, quantidade) informadas."""
+        self.limpar()
+        for inicio, n in corridas:
+            self._bits[inicio : inicio + n] = b"\x01" * n
+        self._quantidade = sum(n for _, n in corridas)
+
+    def definir_intervalo(self, inicio: int, fim: int):
+        """Troca a seleção pelo intervalo fechado [inicio, fim]."""
+        self.limpar()
+        self._bits[inicio : fim + 1] = b"\x01" * (fim - inicio + 1)
+        self._quantidade = fim - inicio + 1
+
+    def alternar(self, posicao: int):
+        self._bits[posicao] ^= 1
+        self._quantidade += 1 if self._bits[posicao] else -1
+
+    def filtrar(self, itens):
+        """Itens (alinhados às posições) que estão selecionados."""
+        return compress(itens, self._bits)
+
+    def filtrar_fora(self, itens):
+        """Itens (alinhados às posições) que não estão selecionados."""
+        return compress(itens, self._bits.translate(_INVERTER_BITS))
+
+
+def compactar_intervalos(valores) -> list[tuple[int, int]]:
+    """
+    Resume uma sequência de inteiros em corridas (primeiro, quantidade) de
+    valores consecutivos: [3, 4, 5, 9] vira [(3, 3), (9, 1)].
+    """
+    corridas = []
+    for valor in valores:
+        if corridas and corridas[-1][0] + corridas[-1][1] == valor:
+            corridas[-1] = (corridas[-1][0], corridas[-1][1] + 1)
+        else:
+            corridas.append((valor, 1))
+    return corridas
+
+
+def expandir_intervalos(corridas: list[tuple[int, int]]) -> list[int]:
+    return [valor for inicio, n in corridas for valor in range(inicio, inicio + n)]
+
+
+class ComandoMover:
+    """
+    Movimento de páginas guardado de forma compacta: as posições de origem em
+    corridas e o ponto de inserção. Aplicar e desfazer custam O(páginas movidas)
+    mais os blocos tocados, sem copiar a ordem inteira.
+    """
+
+    __slots__ = ("destino", "origem", "quantidade")
+
+    def __init__(self, posicoes: list[int], destino: int):
+        self.origem = compactar_intervalos(posicoes)
+        self.destino = destino
+        self.quantidade = len(posicoes)
+
+    def aplicar(self, ordem: SequenciaPaginas) -> list[tuple[int, int]]:
+        """Executa o movimento e devolve as posições que as páginas passaram a ocupar."""
+        ordem.mover(expandir_intervalos(self.origem), self.destino)
+        return [(self.destino, self.quantidade)]
+
+    def desfazer(self, ordem: SequenciaPaginas) -> list[tuple[int, int]]:
+        """Devolve as páginas às posições de origem e as retorna em corridas."""
+        paginas = ordem.extrair(
+            list(range(self.destino, self.destino + self.quantidade))
+        )
+        usadas = 0
+        # Em ordem crescente, cada corrida volta exatamente para onde estava.
+        for inicio, n in self.origem:
+            ordem.inserir(inicio, paginas[usadas : usadas + n])
+            usadas += n
+        return self.origem
+
+
+class ComandoRestaurar:
+    """Troca a ordem inteira (ex.: voltar à original), guardando a anterior em corridas."""
+
+    __slots__ = ("anterior", "nova")
+
+    def __init__(self, atual: SequenciaPaginas, nova: SequenciaPaginas):
+        self.anterior = compactar_intervalos(atual)
+        self.nova = compactar_intervalos(nova)
+
+    def aplicar(self, ordem: SequenciaPaginas) -> list[tuple[int, int]]:
+        ordem.substituir(expandir_intervalos(self.nova))
+        return []
+
+    def desfazer(self, ordem: SequenciaPaginas) -> list[tuple[int, int]]:
+        ordem.substituir(expandir_intervalos(self.anterior))
+        return []
+
+
+class HistoricoEdicoes:
+    """
+    Pilhas de desfazer/refazer de comandos aplicados a uma SequenciaPaginas.
+
+    Só os HISTORICO_MAXIMO comandos mais recentes são mantidos, então a memória
+    não cresce com o número de edições.
+    """
+
+    def __init__(self, limite: int = HISTORICO_MAXIMO):
+        self._desfazer: deque = deque(maxlen=limite)
+        self._refazer: deque = deque(maxlen=limite)
+
+    @property
+    def pode_desfazer(self) -> bool:
+        return bool(self._desfazer)
+
+    @property
+    def pode_refazer(self) -> bool:
+        return bool(self._refazer)
+
+    def executar(self, comando, ordem: SequenciaPaginas) -> list[tuple[int, int]]:
+        posicoes = comando.aplicar(ordem)
+        self._desfazer.append(comando)
+        self._refazer.clear()
+        return posicoes
+
+    def desfazer(self, ordem: SequenciaPaginas) -> list[tuple[int, int]] | None:
+        """Desfaz o último comando; devolve as posições afetadas em corridas."""
+        if not self._desfazer:
+            return None
+        comando = self._desfazer.pop()
+        self._refazer.append(comando)
+        return comando.desfazer(ordem)
+
+    def refazer(self, ordem: SequenciaPaginas) -> list[tuple[int, int]] | None:
+        if not self._refazer:
+            return None
+        comando = self._refazer.pop()
+        self._desfazer.append(comando)
+        return comando.aplicar(ordem)
+
+
+# --- Regras para dividir a ordem atual em vários documentos ---
+
+
+def dividir_a_cada(ordem, tamanho: int) -> list[list[int]]:
+    """Grupos de `tamanho` páginas seguidas (o último pode ser menor)."""
+    if tamanho < 1:
+        raise ValueError("O tamanho de cada parte deve ser pelo menos 1.")
+    paginas = list(ordem)
+    return [paginas[i : i + tamanho] for i in range(0, len(paginas), tamanho)]
+
+
+def grupos_da_selecao(ordem, selecao: SelecaoPosicoes) -> list[list[int]]:
+    """Um grupo para cada trecho contínuo de posições selecionadas."""
+    return [
+        [ordem[posicao] for posicao in range(inicio, inicio + n)]
+        for inicio, n in compactar_intervalos(selecao)
+    ]
+
+
+def dividir_nos_separadores(ordem, selecao: SelecaoPosicoes) -> list[list[int]]:
+    """
+    Grupos entre as posições selecionadas, que funcionam como folhas
+    separadoras e ficam fora de todos os grupos.
+    """
+    grupos = [[]]
+    for posicao, pagina in enumerate(ordem):
+        if posicao in selecao:
+            grupos.append([])
+        else:
+            grupos[-1].append(pagina)
+    return [grupo for grupo in grupos if grupo]
+
+
+def interpretar_intervalos(texto: str, total: int) -> list[list[int]]:
+    """
+    Converte um texto como "1-3, 4-10, 12" em listas de posições (base 0).
+    Os números são posições de 1 a `total`; um intervalo decrescente ("5-2")
+    mantém a ordem invertida.
+
+    Raises:
+        ValueError: Se algum trecho não for um número ou intervalo válido.
+    """
+    grupos = []
+    for trecho in texto.replace(";", ",").split(","):
+        trecho = trecho.strip()
+        if not trecho:
+            continue
+        inicio_texto, _, fim_texto = trecho.partition("-")
+        try:
+            inicio = int(inicio_texto)
+            fim = int(fim_texto) if fim_texto.strip() else inicio
+        except ValueError:
+            raise ValueError(f"Intervalo inválido: '{trecho}'") from None
+        if not (1 <= inicio <= total and 1 <= fim <= total):
+            raise ValueError(f"Intervalo fora do documento (1 a {total}): '{trecho}'")
+        passo = 1 if fim >= inicio else -1
+        grupos.append(list(range(inicio - 1, fim - 1 + passo, passo)))
+    if not grupos:
+        raise ValueError("Nenhum intervalo informado.")
+    return grupos
@@ -0,0 +1,422 @@
+"""
+Operações em lote sobre arquivos, sem interface gráfica.
+
+Uma tarefa é um dicionário simples, serializável em JSON (pode vir de um
+manifesto e atravessa processos sem esforço):
+
+    {"operacao": "comprimir", "entradas": ["a.pdf"], "saida": "saida/a.pdf"}
+
+`preparar_tarefas` monta as tarefas de uma operação a partir de uma lista de
+arquivos, `ler_manifesto` as lê de um arquivo JSON Lines e `executar_lote` as
+executa em um pool de processos, devolvendo um resultado por tarefa.
+"""
+
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import pymupdf
+
+from cancelamento import OperacaoCancelada, TokenCancelamento
+from funcs_pdf import (
+    func_comprimir_pdf,
+    func_converter_imagem_para_pdf,
+    func_converter_pdf_imagem,
+    func_exportar_paginas,
+    func_juntar_pdfs,
+    func_rodar_pdf,
+)
+from modelo_paginas import interpretar_intervalos
+
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg")
+TAREFAS_EM_VOO_POR_PROCESSO = 4  # Mantém os processos ocupados sem enfileirar tudo
+TAREFAS_POR_PROCESSO = 200  # Recicla os processos para devolver a memória do MuPDF
+
+
+def _comprimir(tarefa: dict, cancelamento: TokenCancelamento | None) -> list[str]:
+    (entrada,) = tarefa["entradas"]
+    saida = tarefa["saida"]
+    # func_comprimir_pdf só imprime os erros; gravar em um arquivo temporário
+    # garante que uma falha não deixe para trás uma saída antiga ou parcial.
+    temporario = saida + ".tmp"
+    try:
+        func_comprimir_pdf(
+            entrada,
+            temporario,
+            qualidade_imagem=tarefa.get("qualidade", 40),
+            cancelamento=cancelamento,
+        )
+        if not os.path.exists(temporario):
+            raise RuntimeError("A compressão não gerou o arquivo de saída.")
+        os.replace(temporario, saida)
+    except BaseException:
+        # Falha, cancelamento ou erro no replace: o temporário não fica para trás.
+        if os.path.isfile(temporario):
+            os.remove(temporario)
+        raise
+    return [saida]
+
+
+def juntar_arquivos(
+    entradas: list[str],
+    saida: str,
+    remover_duplicadas: bool = False,
+    cancelamento: TokenCancelamento | None = None,
+) -> int:
+    """
+    Junta PDFs e imagens (convertidas para PDF antes) em `saida`. Devolve
+    quantas páginas duplicadas foram removidas.
+    """
+    conversoes = {}
+    for entrada in entradas:
+        if Path(entrada).suffix.lower() in EXTENSOES_IMAGEM:
+            if cancelamento:
+                cancelamento.verificar()
+            conversoes[entrada] = func_converter_imagem_para_pdf(entrada, stream=True)
+    return func_juntar_pdfs(
+        entradas,
+        saida,
+        conversoes or None,
+        remover_duplicadas=remover_duplicadas,
+        cancelamento=cancelamento,
+    )
+
+
+def _juntar(tarefa: dict, cancelamento: TokenCancelamento | None) -> list[str]:
+    juntar_arquivos(
+        tarefa["entradas"],
+        tarefa["saida"],
+        tarefa.get("remover_duplicadas", False),
+        cancelamento,
+    )
+    return [tarefa["saida"]]
+
+
+def _imagem_para_pdf(tarefa: dict, cancelamento: TokenCancelamento | None) -> list[str]:
+    (entrada,) = tarefa["entradas"]
+    func_converter_imagem_para_pdf(entrada, tarefa["saida"])
+    return [tarefa["saida"]]
+
+
+def _pdf_para_imagens(
+    tarefa: dict, cancelamento: TokenCancelamento | None
+) -> list[str]:
+    (entrada,) = tarefa["entradas"]
+    Path(tarefa["saida"]).mkdir(parents=True, exist_ok=True)
+    gravadas = func_converter_pdf_imagem(entrada, tarefa["saida"], cancelamento)
+    with pymupdf.open(entrada) as doc:
+        faltando = doc.page_count - len(gravadas)
+    if faltando:
+        raise RuntimeError(
+            f"{faltando} página(s) não couberam nos limites de tamanho de imagem."
+        )
+    return [str(caminho) for caminho in gravadas]
+
+
+def _rodar(tarefa: dict, cancelamento: TokenCancelamento | None) -> list[str]:
+    (entrada,) = tarefa["entradas"]
+    func_rodar_pdf(entrada, tarefa["saida"], tarefa["angulo"])
+    return [tarefa["saida"]]
+
+
+def _selecionar(tarefa: dict, cancelamento: TokenCancelamento | None) -> list[str]:
+    (entrada,) = tarefa["entradas"]
+    with pymupdf.open(entrada) as doc:
+        grupos = interpretar_intervalos(tarefa["paginas"], doc.page_count)
+        paginas = [pagina for grupo in grupos for pagina in grupo]
+        func_exportar_paginas(doc, paginas, tarefa["saida"])
+    return [tarefa["saida"]]
+
+
+# Cada operação recebe a tarefa e o token de cancelamento (ou None); as
+# rápidas só o verificam antes de começar, em executar_tarefa.
+OPERACOES: dict[str, Callable[[dict, TokenCancelamento | None], list[str]]] = {
+    "comprimir": _comprimir,
+    "juntar": _juntar,
+    "imagens-para-pdf": _imagem_para_pdf,
+    "pdf-para-imagens": _pdf_para_imagens,
+    "rodar": _rodar,
+    "selecionar": _selecionar,
+}
+
+# Nome da saída padrão de cada arquivo de entrada: {nome}{sufixo}. As imagens
+# de pdf-para-imagens vão para uma pasta e juntar não tem saída padrão, pois
+# reúne várias entradas.
+SUFIXOS_SAIDA = {
+    "comprimir": "_compressed.pdf",
+    "imagens-para-pdf": ".pdf",
+    "rodar": "_rodado.pdf",
+    "selecionar": "_paginas.pdf",
+}
+
+# Parâmetros obrigatórios de cada operação, além das entradas.
+PARAMETROS_OBRIGATORIOS = {"rodar": ("angulo",), "selecionar": ("paginas",)}
+
+
+def expandir_entradas(padroes: list[str]) -> list[str]:
+    """
+    Expande os padrões (glob, com ** recursivo) em arquivos, sem repetições e
+    na ordem dada. "@lista.txt" lê um caminho ou padrão por linha do arquivo.
+
+    Raises:
+        ValueError: Se algum padrão não corresponder a nenhum arquivo.
+    """
+    arquivos = {}
+    for padrao in padroes:
+        if padrao.startswith("@"):
+            linhas = Path(padrao[1:]).read_text(encoding="utf-8").splitlines()
+            sublista = [linha.strip() for linha in linhas]
+            arquivos.update(
+                dict.fromkeys(expandir_entradas([p for p in sublista if p]))
+            )
+            continue
+        encontrados = sorted(
+            caminho
+            for caminho in glob.glob(padrao, recursive=True)
+            if os.path.isfile(caminho)
+        )
+        if not encontrados:
+            raise ValueError(f"Nenhum arquivo corresponde a '{padrao}'.")
+        arquivos.update(dict.fromkeys(encontrados))
+    return list(arquivos)
+
+
+def saida_padrao(operacao: str, entrada: str, pasta_saida: str | None = None) -> str:
+    """Caminho de saída de uma entrada: ao lado dela ou dentro de `pasta_saida`."""
+    caminho = Path(entrada)
+    pasta = Path(pasta_saida) if pasta_saida else caminho.parent
+    if operacao == "pdf-para-imagens":
+        return str(pasta)
+    return str(pasta / f"{caminho.stem}{SUFIXOS_SAIDA[operacao]}")
+
+
+def normalizar_tarefa(tarefa: dict, pasta_saida: str | None = None) -> dict:
+    """
+    Valida uma tarefa e completa a saída padrão. Aceita "entrada" (um arquivo)
+    como atalho para "entradas".
+
+    Raises:
+        ValueError: Se a operação for desconhecida ou faltar algum campo.
+    """
+    tarefa = dict(tarefa)
+    operacao = tarefa.get("operacao")
+    if operacao not in OPERACOES:
+        raise ValueError(f"Operação desconhecida: {operacao!r}")
+    if "entrada" in tarefa:
+        tarefa["entradas"] = [tarefa.pop("entrada")]
+    entradas = tarefa.get("entradas")
+    if not entradas or not isinstance(entradas, list):
+        raise ValueError("A tarefa não tem entradas.")
+    if operacao != "juntar" and len(entradas) != 1:
+        raise ValueError(f"'{operacao}' recebe um arquivo por tarefa.")
+    for parametro in PARAMETROS_OBRIGATORIOS.get(operacao, ()):
+        if parametro not in tarefa:
+            raise ValueError(f"'{operacao}' exige o parâmetro '{parametro}'.")
+    if not tarefa.get("saida"):
+        if operacao == "juntar":
+            raise ValueError("'juntar' exige o arquivo de saída.")
+        tarefa["saida"] = saida_padrao(operacao, entradas[0], pasta_saida)
+    return tarefa
+
+
+def preparar_tarefas(
+    operacao: str,
+    entradas: list[str],
+    saida: str | None = None,
+    **parametros,
+) -> list[dict]:
+    """
+    Uma tarefa por arquivo (ou uma só, com todos eles, para juntar). Para
+    juntar, `saida` é o arquivo resultante; para as demais, a pasta de saída.
+
+    Raises:
+        ValueError: Se a tarefa for inválida ou duas entradas forem gravar
+        no mesmo arquivo de saída.
+    """
+    if operacao == "juntar":
+        grupos, pasta_saida = [entradas], None
+        parametros["saida"] = saida
+    else:
+        grupos, pasta_saida = [[entrada] for entrada in entradas], saida
+    tarefas = [
+        normalizar_tarefa(
+            {"operacao": operacao, "entradas": grupo, **parametros}, pasta_saida
+        )
+        for grupo in grupos
+    ]
+    _verificar_saidas_distintas(tarefas)
+    return tarefas
+
+
+def ler_manifesto(caminho: str, pasta_saida: str | None = None) -> list[dict]:
+    """
+    Lê as tarefas de um arquivo JSON Lines (uma tarefa por linha; linhas em
+    branco e iniciadas por # são ignoradas). Os caminhos relativos das
+    entradas e saídas são resolvidos a partir da pasta do manifesto.
+
+    Raises:
+        ValueError: Se alguma linha não for uma tarefa válida.
+    """
+    base = Path(caminho).parent
+    tarefas = []
+    with open(caminho, encoding="utf-8") as arquivo:
+        for numero, linha in enumerate(arquivo, start=1):
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            try:
+                tarefa = json.loads(linha)
+                if not isinstance(tarefa, dict):
+                    raise TypeError("a linha não é um objeto JSON.")
+                if "entrada" in tarefa:
+                    tarefa["entradas"] = [tarefa.pop("entrada")]
+                if isinstance(tarefa.get("entradas"), list):
+                    tarefa["entradas"] = [
+                        str(base / entrada) for entrada in tarefa["entradas"]
+                    ]
+                if tarefa.get("saida"):
+                    tarefa["saida"] = str(base / tarefa["saida"])
+                tarefas.append(normalizar_tarefa(tarefa, pasta_saida))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"{caminho}, linha {numero}: {e}") from None
+    _verificar_saidas_distintas(tarefas)
+    return tarefas
+
+
+def _verificar_saidas_distintas(tarefas: list[dict]):
+    vistas = set()
+    for tarefa in tarefas:
+        saida = os.path.abspath(tarefa["saida"])
+        if saida in vistas and tarefa["operacao"] != "pdf-para-imagens":
+            raise ValueError(f"Mais de uma tarefa grava em '{tarefa['saida']}'.")
+        vistas.add(saida)
+
+
+def executar_tarefa(
+    indice: int, tarefa: dict, cancelamento: TokenCancelamento | None = None
+) -> dict:
+    """
+    Executa uma tarefa e descreve o resultado; nunca levanta exceção. O que
+    as funções de funcs_pdf imprimem é capturado, para não se misturar à
+    saída de quem chamou, e a última linha acompanha a mensagem de erro.
+    Se a tarefa falhar ou for cancelada ("cancelada": True), o arquivo de
+    saída que ela criou é apagado.
+    """
+    inicio = time.perf_counter()
+    impresso = io.StringIO()
+    resultado = {
+        "indice": indice,
+        "operacao": tarefa["operacao"],
+        "entradas": tarefa["entradas"],
+    }
+    saida_existia = os.path.exists(tarefa["saida"])
+    try:
+        funcao = OPERACOES[tarefa["operacao"]]
+        if cancelamento:
+            cancelamento.verificar()
+        with contextlib.redirect_stdout(impresso):
+            resultado["saidas"] = funcao(tarefa, cancelamento)
+        resultado["ok"] = True
+    except OperacaoCancelada as e:
+        if not saida_existia and os.path.isfile(tarefa["saida"]):
+            os.remove(tarefa["saida"])
+        resultado.update(ok=False, erro=str(e), cancelada=True)
+    except Exception as e:
+        erro = f"{type(e).__name__}: {e}"
+        ultima_linha = impresso.getvalue().strip().splitlines()[-1:]
+        if ultima_linha:
+            erro += f" ({ultima_linha[0]})"
+        if not saida_existia and os.path.isfile(tarefa["saida"]):
+            os.remove(tarefa["saida"])
+        resultado.update(ok=False, erro=erro)
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+def executar_lote(
+    tarefas: list[dict],
+    workers: int | None = None,
+    executor: Executor | None = None,
+    cancelamento: TokenCancelamento | None = None,
+) -> Iterator[dict]:
+    """
+    Executa as tarefas em um pool de processos e produz os resultados (ver
+    `executar_tarefa`) na ordem em que terminam.
+
+    Só algumas tarefas por processo são enviadas de cada vez, então lotes de
+    dezenas de milhares de arquivos não ficam todos na fila do pool, e os
+    processos são trocados de tempos em tempos para devolver a memória.
+
+    Args:
+        tarefas (list[dict]): As tarefas, já normalizadas.
+        workers (int): Número de processos; por padrão, um por núcleo.
+        executor (Executor): Um pool já existente (e compartilhado) a usar no
+            lugar de um próprio; `workers` deve ser o tamanho dele.
+        cancelamento (TokenCancelamento): Enviado às tarefas (crie-o com
+            `TokenCancelamento.entre_processos`). Depois de cancelado, as
+            tarefas que ainda não começaram são descartadas e as em andamento
+            param no próximo ponto de verificação.
+
+    Raises:
+        OperacaoCancelada: Depois de entregar os resultados das tarefas que
+        estavam em andamento quando o token foi cancelado.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tarefas)))
+
+    if workers == 1 and executor is None:
+        for indice, tarefa in enumerate(tarefas):
+            if cancelamento:
+                cancelamento.verificar()
+            yield executar_tarefa(indice, tarefa, cancelamento)
+        return
+
+    pendentes = enumerate(tarefas)
+    with contextlib.ExitStack() as pilha:
+        if executor is None:
+            executor = pilha.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=workers, max_tasks_per_child=TAREFAS_POR_PROCESSO
+                )
+            )
+        em_voo = {}
+
+        def enviar(quantidade: int):
+            for indice, tarefa in itertools.islice(pendentes, quantidade):
+                futuro = executor.submit(executar_tarefa, indice, tarefa, cancelamento)
+                em_voo[futuro] = (indice, tarefa)
+
+        enviar(workers * TAREFAS_EM_VOO_POR_PROCESSO)
+        while em_voo:
+            prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                indice, tarefa = em_voo.pop(futuro)
+                try:
+                    yield futuro.result()
+                except Exception as e:
+                    # Só chega aqui se o processo morreu (falta de memória, por
+                    # exemplo); executar_tarefa trata os erros das operações.
+                    yield {
+                        "indice": indice,
+                        "operacao": tarefa["operacao"],
+                        "entradas": tarefa["entradas"],
+                        "ok": False,
+                        "erro": f"{type(e).__name__}: {e}",
+                        "segundos": 0.0,
+                    }
+            if cancelamento and cancelamento.cancelado:
+                for futuro in list(em_voo):
+                    if futuro.cancel():
+                        del em_voo[futuro]
+            else:
+                enviar(len(prontos))
+        if cancelamento:
+            cancelamento.verificar()
@@ -0,0 +1,477 @@
+"""
+Monitor de pastas ("hot folders"): processa sozinho os arquivos que os
+scanners deixam em pastas compartilhadas, sem ninguém precisar abri-los na
+interface.
+
+Cada pasta monitorada tem uma regra, que é uma operação de operacoes_lote
+(comprimir, juntar...) com os seus parâmetros, e três pastas de destino:
+"saida" para os resultados, "erros" para as entradas que falharam (cada uma
+com um .erro.txt explicando o motivo) e "originais" para as entradas já
+processadas. Por padrão, as três são subpastas da pasta monitorada.
+
+A detecção é por varredura periódica (os.scandir + stat), que funciona em
+qualquer sistema e em compartilhamentos de rede: um arquivo só é aceito
+depois que o tamanho e a data de modificação param de mudar por
+`estabilidade` segundos. Nas pastas de juntar, os arquivos aceitos formam um
+lote, fechado quando a pasta fica `espera_lote` segundos sem novidades.
+
+O estado fica no próprio disco: ao ser aceito, cada trabalho é movido para
+uma subpasta de .processando, e só sai de lá depois que o resultado chega ao
+destino. Se o monitor for interrompido, ao voltar ele refaz os trabalhos que
+encontrar em .processando, na ordem em que foram aceitos.
+
+Uso:
+    python pasta_monitorada.py pastas.json [-j 8]
+
+Exemplo de pastas.json (caminhos relativos partem da pasta do arquivo):
+    {
+        "intervalo": 2,
+        "estabilidade": 5,
+        "pastas": [
+            {"entrada": "//servidor/scanner1", "operacao": "comprimir"},
+            {"entrada": "//servidor/contratos", "operacao": "juntar",
+             "espera_lote": 30, "remover_duplicadas": true,
+             "saida": "//servidor/contratos_prontos"}
+        ]
+    }
+
+Os eventos saem em stdout, um objeto JSON por linha, como em cli.py.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from cli import emitir
+from operacoes_lote import (
+    EXTENSOES_IMAGEM,
+    TAREFAS_EM_VOO_POR_PROCESSO,
+    TAREFAS_POR_PROCESSO,
+    executar_tarefa,
+    normalizar_tarefa,
+    saida_padrao,
+)
+
+INTERVALO_VARREDURA = 2.0  # Segundos entre uma varredura das pastas e a próxima
+ESTABILIDADE = 5.0  # Segundos sem mudar de tamanho até o arquivo ser aceito
+ESPERA_LOTE = 30.0  # Juntar: segundos sem arquivo novo até fechar o lote
+TENTATIVAS_POR_TRABALHO = 3  # Quedas de processo antes de mandar para erros
+PASTA_TRABALHOS = ".processando"
+
+# Arquivos que cada operação aceita; os demais ficam na pasta, intocados.
+EXTENSOES_ENTRADA = {
+    "comprimir": (".pdf",),
+    "juntar": (".pdf", *EXTENSOES_IMAGEM),
+    "imagens-para-pdf": EXTENSOES_IMAGEM,
+    "pdf-para-imagens": (".pdf",),
+    "rodar": (".pdf",),
+    "selecionar": (".pdf",),
+}
+
+# Arquivos temporários de quem ainda está gravando ou copiando.
+PREFIXOS_IGNORADOS = (".", "~")
+SUFIXOS_IGNORADOS = (".tmp", ".part", ".crdownload")
+
+
+class RegraPasta:
+    """
+    O que fazer com os arquivos que chegam em `entrada`. Os `parametros` vão
+    para a tarefa (por exemplo, qualidade, angulo ou remover_duplicadas).
+
+    Raises:
+        ValueError: Se a operação for desconhecida, faltar algum parâmetro ou
+        algum destino for a própria pasta monitorada.
+    """
+
+    def __init__(
+        self,
+        entrada: str | Path,
+        operacao: str,
+        saida: str | Path | None = None,
+        erros: str | Path | None = None,
+        originais: str | Path | None = None,
+        espera_lote: float = ESPERA_LOTE,
+        **parametros,
+    ):
+        if operacao not in EXTENSOES_ENTRADA:
+            raise ValueError(f"Operação desconhecida: {operacao!r}")
+        normalizar_tarefa(
+            {"operacao": operacao, "entradas": ["-"], "saida": "-", **parametros}
+        )
+        self.entrada = Path(entrada)
+        self.operacao = operacao
+        self.saida = Path(saida) if saida else self.entrada / "saida"
+        self.erros = Path(erros) if erros else self.entrada / "erros"
+        self.originais = Path(originais) if originais else self.entrada / "originais"
+        self.trabalhos = self.entrada / PASTA_TRABALHOS
+        self.espera_lote = float(espera_lote)
+        self.parametros = parametros
+        for destino in (self.saida, self.erros, self.originais):
+            if os.path.abspath(destino) == os.path.abspath(self.entrada):
+                raise ValueError(
+                    f"'{destino}' não pode ser a própria pasta monitorada."
+                )
+
+    def aceita(self, nome: str) -> bool:
+        nome_minusculo = nome.lower()
+        return (
+            nome_minusculo.endswith(EXTENSOES_ENTRADA[self.operacao])
+            and not nome_minusculo.startswith(PREFIXOS_IGNORADOS)
+            and not nome_minusculo.endswith(SUFIXOS_IGNORADOS)
+        )
+
+    def criar_pastas(self):
+        for pasta in (self.saida, self.erros, self.originais, self.trabalhos):
+            pasta.mkdir(parents=True, exist_ok=True)
+
+    def montar_tarefa(self, pasta_trabalho: Path) -> dict:
+        """A tarefa de um trabalho: as entradas, por nome, e a saída nele."""
+        entradas = sorted(str(p) for p in pasta_trabalho.iterdir() if p.is_file())
+        pasta_saida = pasta_trabalho / "saida"
+        pasta_saida.mkdir(exist_ok=True)
+        if self.operacao == "juntar":
+            saida = str(pasta_saida / f"{Path(entradas[0]).stem}_juntado.pdf")
+        else:
+            saida = saida_padrao(self.operacao, entradas[0], str(pasta_saida))
+        return normalizar_tarefa(
+            {
+                "operacao": self.operacao,
+                "entradas": entradas,
+                "saida": saida,
+                **self.parametros,
+            }
+        )
+
+
+def ler_configuracao(caminho: str) -> tuple[list[RegraPasta], dict]:
+    """
+    Lê as regras e as opções do monitor (intervalo, estabilidade) de um
+    arquivo JSON. Os caminhos relativos partem da pasta do arquivo.
+
+    Raises:
+        ValueError: Se o arquivo ou alguma regra for inválida.
+    """
+    base = Path(caminho).parent
+    with open(caminho, encoding="utf-8") as arquivo:
+        try:
+            configuracao = json.load(arquivo)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{caminho}: {e}") from None
+    pastas = configuracao.get("pastas") if isinstance(configuracao, dict) else None
+    if not pastas:
+        raise ValueError(f"{caminho}: falta a lista 'pastas'.")
+
+    regras = []
+    for numero, pasta in enumerate(pastas, start=1):
+        try:
+            if not isinstance(pasta, dict):
+                raise TypeError("a pasta não é um objeto JSON.")
+            pasta = dict(pasta)
+            for chave in ("entrada", "saida", "erros", "originais"):
+                if pasta.get(chave):
+                    pasta[chave] = base / pasta[chave]
+            regras.append(RegraPasta(**pasta))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{caminho}, pasta {numero}: {e}") from None
+
+    monitoradas = [os.path.abspath(regra.entrada) for regra in regras]
+    if len(set(monitoradas)) != len(monitoradas):
+        raise ValueError(f"{caminho}: a mesma pasta aparece em mais de uma regra.")
+    opcoes = {
+        chave: float(configuracao[chave])
+        for chave in ("intervalo", "estabilidade")
+        if chave in configuracao
+    }
+    return regras, opcoes
+
+
+def _mover_sem_sobrescrever(origem: str | Path, pasta: Path) -> Path:
+    """Move `origem` para `pasta`, trocando o nome para "nome (2)" se preciso."""
+    origem = Path(origem)
+    destino = pasta / origem.name
+    for numero in itertools.count(2):
+        if not destino.exists():
+            break
+        destino = pasta / f"{origem.stem} ({numero}){origem.suffix}"
+    return Path(shutil.move(origem, destino))
+
+
+class MonitorPastas:
+    """
+    Varre as pastas das `regras` a cada `intervalo` segundos e executa os
+    trabalhos em um pool de `workers` processos (um por núcleo, por padrão).
+    `executar` bloqueia até `parar` ser chamado.
+    """
+
+    def __init__(
+        self,
+        regras: list[RegraPasta],
+        workers: int | None = None,
+        intervalo: float = INTERVALO_VARREDURA,
+        estabilidade: float = ESTABILIDADE,
+    ):
+        self.regras = regras
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        # caminho -> ((tamanho, mtime_ns), instante da última mudança)
+        self._observados: dict[Path, tuple[tuple[int, int], float]] = {}
+        # Juntar: instante da última mudança em cada pasta.
+        self._ultima_mudanca: dict[Path, float] = {}
+        self._inacessiveis: set[Path] = set()
+        self._fila: deque[tuple[RegraPasta, Path]] = deque()
+        self._em_voo: dict[Future, tuple[RegraPasta, Path]] = {}
+        self._quedas: dict[Path, int] = {}
+        self._sequencia = itertools.count()
+        self._indices = itertools.count()
+        self._parar = threading.Event()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def parar(self):
+        """Para de aceitar arquivos; os trabalhos em andamento terminam."""
+        self._parar.set()
+
+    def executar(self):
+        for regra in self.regras:
+            regra.criar_pastas()
+        self._recuperar()
+        emitir(
+            "inicio",
+            pastas=[str(regra.entrada) for regra in self.regras],
+            workers=self.workers,
+            recuperados=len(self._fila),
+        )
+        self._pool = self._novo_pool()
+        proxima_varredura = 0.0
+        try:
+            while not self._parar.is_set():
+                agora = time.monotonic()
+                if agora >= proxima_varredura:
+                    self._varrer(agora)
+                    proxima_varredura = agora + self.intervalo
+                self._enviar()
+                self._coletar(max(0.0, proxima_varredura - time.monotonic()))
+            # Parada pedida: os que não começaram ficam em .processando para a
+            # próxima execução; os que estão rodando são concluídos.
+            for futuro in list(self._em_voo):
+                if futuro.cancel():
+                    del self._em_voo[futuro]
+            while self._em_voo:
+                self._coletar(None)
+        finally:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        emitir("fim")
+
+    def _novo_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, max_tasks_per_child=TAREFAS_POR_PROCESSO
+        )
+
+    def _recuperar(self):
+        """Enfileira os trabalhos que uma execução anterior deixou pela metade."""
+        for regra in self.regras:
+            for pasta in sorted(p for p in regra.trabalhos.iterdir() if p.is_dir()):
+                # Uma saída parcial é refeita do zero.
+                shutil.rmtree(pasta / "saida", ignore_errors=True)
+                if any(p.is_file() for p in pasta.iterdir()):
+                    self._fila.append((regra, pasta))
+                else:
+                    shutil.rmtree(pasta, ignore_errors=True)
+
+    def _varrer(self, agora: float):
+        """Aceita os arquivos que pararam de mudar, criando os trabalhos."""
+        vistos = set()
+        for regra in self.regras:
+            try:
+                itens = [
+                    (Path(item.path), item.stat())
+                    for item in os.scandir(regra.entrada)
+                    if item.is_file() and regra.aceita(item.name)
+                ]
+            except OSError as e:
+                # Um compartilhamento fora do ar volta a ser lido na próxima vez.
+                if regra.entrada not in self._inacessiveis:
+                    self._inacessiveis.add(regra.entrada)
+                    emitir("erro", pasta=str(regra.entrada), erro=str(e))
+                continue
+            self._inacessiveis.discard(regra.entrada)
+
+            estaveis = []
+            mudando = False
+            for caminho, info in itens:
+                vistos.add(caminho)
+                assinatura = (info.st_size, info.st_mtime_ns)
+                anterior = self._observados.get(caminho)
+                if anterior is None or anterior[0] != assinatura:
+                    self._observados[caminho] = (assinatura, agora)
+                    self._ultima_mudanca[regra.entrada] = agora
+                    mudando = True
+                elif agora - anterior[1] < self.estabilidade:
+                    mudando = True
+                elif info.st_size:  # Um arquivo vazio não vai a lugar algum
+                    estaveis.append(caminho)
+
+            if regra.operacao != "juntar":
+                for caminho in estaveis:
+                    self._criar_trabalho(regra, [caminho])
+            elif (
+                estaveis
+                and not mudando
+                and agora - self._ultima_mudanca.get(regra.entrada, 0.0)
+                >= regra.espera_lote
+            ):
+                self._criar_trabalho(regra, estaveis)
+
+        for caminho in self._observados.keys() - vistos:
+            del self._observados[caminho]
+
+    def _criar_trabalho(self, regra: RegraPasta, arquivos: list[Path]):
+        """Move os arquivos para uma pasta de trabalho nova e a enfileira."""
+        # O nome ordena os trabalhos pela ordem de chegada, também na retomada.
+        data = time.strftime("%Y%m%d-%H%M%S")
+        pasta = regra.trabalhos / f"{data}-{os.getpid()}-{next(self._sequencia):06d}"
+        try:
+            pasta.mkdir()
+        except OSError as e:
+            emitir("erro", pasta=str(regra.entrada), erro=str(e))
+            return
+        for arquivo in arquivos:
+            try:
+                os.replace(arquivo, pasta / arquivo.name)
+            except OSError:
+                # Ainda aberto por quem o grava (Windows): fica para a próxima.
+                continue
+            self._observados.pop(arquivo, None)
+        if any(pasta.iterdir()):
+            self._fila.append((regra, pasta))
+        else:
+            pasta.rmdir()
+
+    def _enviar(self):
+        while self._fila and len(self._em_voo) < (
+            self.workers * TAREFAS_EM_VOO_POR_PROCESSO
+        ):
+            regra, pasta = self._fila.popleft()
+            tarefa = regra.montar_tarefa(pasta)
+            try:
+                futuro = self._pool.submit(executar_tarefa, next(self._indices), tarefa)
+            except BrokenProcessPool:
+                self._fila.appendleft((regra, pasta))
+                self._pool = self._novo_pool()
+                continue
+            self._em_voo[futuro] = (regra, pasta)
+
+    def _coletar(self, timeout: float | None):
+        """Espera até `timeout` segundos por trabalhos concluídos e os entrega."""
+        if not self._em_voo:
+            self._parar.wait(timeout)
+            return
+        prontos, _ = wait(self._em_voo, timeout=timeout, return_when=FIRST_COMPLETED)
+        quebrou = any(
+            not futuro.cancelled() and isinstance(futuro.exception(), BrokenProcessPool)
+            for futuro in prontos
+        )
+        if quebrou:
+            # A queda de um processo derruba o pool todo: recolhe todos os
+            # trabalhos dele antes de trocá-lo por um novo.
+            prontos, _ = wait(self._em_voo)
+        for futuro in prontos:
+            regra, pasta = self._em_voo.pop(futuro)
+            try:
+                resultado = futuro.result()
+            except BrokenProcessPool as e:
+                # Algum processo morreu (falta de memória, por exemplo). Não
+                # há como saber qual trabalho o derrubou, então todos voltam
+                # para a fila, até o limite de tentativas.
+                self._quedas[pasta] = self._quedas.get(pasta, 0) + 1
+                if self._quedas[pasta] < TENTATIVAS_POR_TRABALHO:
+                    self._fila.appendleft((regra, pasta))
+                    continue
+                resultado = {
+                    "entradas": regra.montar_tarefa(pasta)["entradas"],
+                    "ok": False,
+                    "erro": f"{type(e).__name__}: {e}",
+                    "segundos": 0.0,
+                }
+            self._quedas.pop(pasta, None)
+            self._concluir(regra, pasta, resultado)
+        if quebrou:
+            self._pool.shutdown(wait=False)
+            self._pool = self._novo_pool()
+
+    def _concluir(self, regra: RegraPasta, pasta: Path, resultado: dict):
+        """Leva os resultados para a saída e as entradas para originais ou erros."""
+        try:
+            saidas = [
+                str(_mover_sem_sobrescrever(saida, regra.saida))
+                for saida in resultado.get("saidas", [])
+            ]
+            destino = regra.originais if resultado["ok"] else regra.erros
+            for entrada in resultado["entradas"]:
+                movida = _mover_sem_sobrescrever(entrada, destino)
+                if not resultado["ok"]:
+                    movida.with_name(movida.name + ".erro.txt").write_text(
+                        resultado["erro"] + "\n", encoding="utf-8"
+                    )
+            shutil.rmtree(pasta)
+        except OSError as e:
+            # O trabalho fica em .processando e é refeito na próxima execução.
+            emitir("erro", pasta=str(regra.entrada), trabalho=pasta.name, erro=str(e))
+            return
+        emitir(
+            "trabalho",
+            pasta=str(regra.entrada),
+            operacao=regra.operacao,
+            entradas=[Path(entrada).name for entrada in resultado["entradas"]],
+            ok=resultado["ok"],
+            saidas=saidas,
+            erro=resultado.get("erro"),
+            segundos=resultado["segundos"],
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="pasta_monitorada.py",
+        description="Processa automaticamente os arquivos que chegam nas pastas.",
+    )
+    parser.add_argument("configuracao", help="arquivo JSON com as pastas e regras")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processos em paralelo (padrão: um por núcleo)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        regras, opcoes = ler_configuracao(args.configuracao)
+        for regra in regras:
+            regra.criar_pastas()
+    except (OSError, ValueError) as e:
+        emitir("erro", erro=str(e))
+        return 2
+
+    monitor = MonitorPastas(regras, args.workers, **opcoes)
+    signal.signal(signal.SIGTERM, lambda *_: monitor.parar())
+    try:
+        monitor.executar()
+    except KeyboardInterrupt:
+        pass  # O que estava rodando é refeito a partir de .processando.
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
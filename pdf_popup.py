@@ -1,4 +1,3 @@
-import io
 import math
 import os
 import tkinter as tk
@@ -8,7 +7,27 @@ from tkinter import filedialog, messagebox
 import pymupdf
 from PIL import Image, ImageTk
 
-from funcs_pdf import func_converter_imagem_para_pdf
+from funcs_pdf import func_salvar_no_arquivo
+from renderizacao import (
+    CacheLRU,
+    RenderizadorAntecipado,
+    renderizar_area,
+    renderizar_na_caixa,
+)
+
+# --- Constantes da exibição ---
+RESIZE_DEBOUNCE_MS = 80  # Espera o redimensionamento parar antes de redesenhar
+DISPLAY_CACHE_SIZE = 8  # Imagens já no tamanho do canvas mantidas em memória
+DISPLAY_CACHE_BYTES = 128 * 1024**2  # ... desde que somem no máximo 128 MB
+PREFETCH_DISTANCE = 2  # Páginas renderizadas antes, para cada lado da atual
+
+# --- Constantes do zoom por ladrilhos ---
+ZOOM_STEP = 1.25  # Cada nível de zoom multiplica a escala por este fator
+MAX_ZOOM_LEVEL = 16  # 1,25 ** 16 ≈ 35x a página inteira na janela
+TILE_SIZE = 256  # Lado, em pixels, de cada ladrilho renderizado
+TILE_CACHE_SIZE = 96  # Ladrilhos mantidos em memória
+TILE_CACHE_BYTES = 24 * 1024**2  # ... desde que somem no máximo 24 MB
+TILE_PREFETCH_MARGIN = 1  # Faixa de ladrilhos renderizada além da área visível
 
 
 class PDFPopup(tk.Toplevel):
@@ -32,15 +51,33 @@ class PDFPopup(tk.Toplevel):
         self.file_type = "pdf" if filepath.lower().endswith(".pdf") else "image"
         self.current_page_index = 0
         self.rotations = {}
-        self.pdf_page_crop: dict[int, Image.Image] = {}
+        # Páginas cujo estado (rotação original) já foi lido do documento.
+        self.loaded_pages: set[int] = set()
+        # Cortes pendentes: retângulos em coordenadas da página sem rotação.
+        self.pdf_page_crop: dict[int, pymupdf.Rect] = {}
         self.image_has_changed = False  # Flag para rastrear alterações na imagem
         self.image_rotations: dict[int, list] = {}
         self.image_coord_crop: dict[int, list] = {}
 
         # Variáveis para manipulação de imagem
         self.current_pil_image = None
-        self.original_pil_image = None
         self.tk_photo_image = None
+        # Imagens prontas para o canvas, por página e tamanho (ver display_image).
+        # As edições pendentes de PDFs são só geometria (rotações e retângulos
+        # de corte); o que ocupa memória são estes caches, limitados em bytes.
+        self.display_cache = CacheLRU(DISPLAY_CACHE_SIZE, DISPLAY_CACHE_BYTES)
+        self.displayed_image = None
+        self.resize_after_id = None
+
+        # Zoom: nível 0 mostra a página inteira; acima disso, só os ladrilhos
+        # visíveis são renderizados, e (view_x, view_y) é o canto da janela na
+        # página ampliada.
+        self.zoom_level = 0
+        self.view_x = 0
+        self.view_y = 0
+        self.pan_start = None
+        self.tile_cache = CacheLRU(TILE_CACHE_SIZE, TILE_CACHE_BYTES)
+        self.tile_photos = {}
 
         # Variáveis de corte
         self.is_cropping = False
@@ -55,14 +92,14 @@ class PDFPopup(tk.Toplevel):
         if self.file_type == "pdf":
             self.doc = pymupdf.open(self.filepath)
             self.total_pages = len(self.doc)
-            for i in range(self.total_pages):
-                page = self.doc[i]
-                if page.rotation != 0:
-                    self.rotations[i] = page.rotation
+            # Renderiza as vizinhas da página atual numa thread, com outro handle.
+            self.prefetcher = RenderizadorAntecipado(self.filepath, self.display_cache)
+            self.tile_prefetcher = RenderizadorAntecipado(
+                self.filepath, self.tile_cache
+            )
         else:
             self.doc = None
-            self.original_pil_image = Image.open(self.filepath)
-            self.current_pil_image = self.original_pil_image.copy()
+            self.current_pil_image = self.load_original_image()
             self.total_pages = 1
 
         self.rotacoes_iniciais = deepcopy(self.rotations)
@@ -98,6 +135,14 @@ class PDFPopup(tk.Toplevel):
             edit_frame, text="Girar ↻", command=self.rotate_clockwise
         )
         self.rotate_cw_button.pack(side="left", padx=5)
+        self.zoom_out_button = tk.Button(
+            edit_frame, text="Zoom −", command=lambda: self.zoom_by(-1)
+        )
+        self.zoom_out_button.pack(side="left", padx=(15, 5))
+        self.zoom_in_button = tk.Button(
+            edit_frame, text="Zoom +", command=lambda: self.zoom_by(1)
+        )
+        self.zoom_in_button.pack(side="left", padx=5)
 
         nav_frame = tk.Frame(control_frame)
         nav_frame.pack(pady=(5, 0))
@@ -117,24 +162,23 @@ class PDFPopup(tk.Toplevel):
         self.image_canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.image_canvas.bind("<ButtonRelease-1>", self.on_mouse_release)
         # Evento para redesenhar a imagem quando a janela é redimensionada
-        self.image_canvas.bind("<Configure>", self.redraw_canvas)
+        self.image_canvas.bind("<Configure>", self.on_canvas_configure)
+        # Zoom (Ctrl + roda ou +/-) e deslocamento (arrastar ou roda)
+        self.image_canvas.bind("<Control-MouseWheel>", self.on_zoom_wheel)
+        self.image_canvas.bind("<MouseWheel>", self.on_pan_wheel)
+        self.bind("<plus>", lambda e: self.zoom_by(1))
+        self.bind("<KP_Add>", lambda e: self.zoom_by(1))
+        self.bind("<minus>", lambda e: self.zoom_by(-1))
+        self.bind("<KP_Subtract>", lambda e: self.zoom_by(-1))
 
     def update_page_display(self):
         """Carrega os dados da página/imagem atual e solicita o redesenho."""
+        self.zoom_level = 0
         if self.file_type == "pdf":
             page = self.doc[self.current_page_index]
+            self.load_page_state(page)
             rotation = self.rotations.get(self.current_page_index, 0)
             page.set_rotation(rotation)
-            # Renderiza o PDF para uma imagem PIL
-            self.pix = page.get_pixmap()
-            croped_pages = list(self.pdf_page_crop.keys())
-            if self.current_page_index not in croped_pages:
-                # if not self.pdf_page_crop:
-                self.current_pil_image = Image.frombytes(
-                    "RGB", [self.pix.width, self.pix.height], self.pix.samples
-                )
-            else:
-                self.current_pil_image = self.pdf_page_crop[self.current_page_index]
         # Para imagens, self.current_pil_image já está atualizado.
 
         self.redraw_canvas()  # Chama a função que desenha na tela
@@ -143,9 +187,117 @@ class PDFPopup(tk.Toplevel):
         )
         self.update_button_states()
 
+    def load_original_image(self):
+        """
+        Lê a imagem do disco. O original não fica decodificado em memória ao
+        lado da cópia editada: "Resetar" o lê de novo.
+        """
+        with Image.open(self.filepath) as image:
+            return image.copy()
+
+    def load_page_state(self, page):
+        """
+        Lê a rotação original da página na primeira visita. Só páginas visitadas
+        podem ser editadas, então as demais ficam de fora de `rotations` e de
+        `rotacoes_iniciais` sem alterar a comparação feita em on_close.
+        """
+        if page.number in self.loaded_pages:
+            return
+        self.loaded_pages.add(page.number)
+        if page.rotation != 0:
+            self.rotations[page.number] = page.rotation
+            self.rotacoes_iniciais[page.number] = page.rotation
+
+    def visible_rect(self, page):
+        """Área exibida da página (inteira ou o corte), em coordenadas já giradas."""
+        crop = self.pdf_page_crop.get(page.number)
+        return page.rect if crop is None else crop * page.rotation_matrix
+
+    def render_request(self, index, width, height):
+        """
+        Chave de cache e função de renderização da página `index`, no estado
+        de edição atual, para caber em width x height. A função recebe o
+        documento em que renderizar, então serve tanto para self.doc quanto
+        para o handle próprio do renderizador antecipado.
+        """
+        self.load_page_state(self.doc[index])
+        rotation = self.rotations.get(index, 0)
+        crop = self.pdf_page_crop.get(index)
+        variant = f"rot{rotation}"
+        if crop is not None:
+            variant += f"|corte{tuple(round(c, 2) for c in crop)}"
+
+        # Só o cache em memória (display_cache) guarda o resultado: cada tamanho
+        # de janela gera outra chave, e gravar essas imagens grandes no cache em
+        # disco travaria a UI a cada redimensionamento e despejaria as miniaturas
+        # do organizador.
+        def render(doc):
+            page = doc[index]
+            page.set_rotation(rotation)
+            clip = page.rect if crop is None else crop * page.rotation_matrix
+            return renderizar_na_caixa(page, width, height, clip)
+
+        return ("pdf", index, variant, width, height), render
+
+    def prefetch_neighbours(self, width, height):
+        """Pede ao renderizador antecipado as páginas em volta da atual."""
+        requests = []
+        for distance in range(1, PREFETCH_DISTANCE + 1):
+            for index in (
+                self.current_page_index + distance,
+                self.current_page_index - distance,
+            ):
+                if 0 <= index < self.total_pages:
+                    requests.append(self.render_request(index, width, height))
+        self.prefetcher.pedir(requests)
+
+    def invalidate_page(self, index):
+        """Descarta o que já foi renderizado da página após girá-la ou cortá-la."""
+        self.prefetcher.cancelar()
+        self.tile_prefetcher.cancelar()
+        self.display_cache.descartar_se(lambda key: key[:2] == ("pdf", index))
+        self.tile_cache.descartar_se(lambda key: key[1] == index)
+
+    def on_canvas_configure(self, event):
+        """Redesenha só quando o redimensionamento para por RESIZE_DEBOUNCE_MS."""
+        if self.resize_after_id is not None:
+            self.after_cancel(self.resize_after_id)
+        self.resize_after_id = self.after(RESIZE_DEBOUNCE_MS, self.redraw_canvas)
+
+    def display_image(self, canvas_w, canvas_h):
+        """
+        Imagem a exibir, já no tamanho do canvas, vinda do cache quando possível.
+
+        Páginas de PDF são renderizadas pelo pymupdf direto nessa resolução,
+        já com o corte; imagens são reduzidas a partir de current_pil_image.
+        """
+        if self.file_type == "pdf":
+            key, render = self.render_request(
+                self.current_page_index, canvas_w, canvas_h
+            )
+            image = self.display_cache.obter(key)
+            if image is None:
+                image = render(self.doc)
+                self.display_cache.guardar(key, image)
+            self.prefetch_neighbours(canvas_w, canvas_h)
+            return image
+
+        # Toda edição gera uma nova current_pil_image; a entrada guarda a imagem
+        # de origem para que um id reaproveitado não traga uma redução antiga.
+        source = self.current_pil_image
+        key = ("pil", id(source), canvas_w, canvas_h)
+        cached = self.display_cache.obter(key)
+        if cached is None or cached[0] is not source:
+            image = source.copy()
+            image.thumbnail((canvas_w, canvas_h), Image.Resampling.LANCZOS)
+            cached = (source, image)
+            self.display_cache.guardar(key, cached)
+        return cached[1]
+
     def redraw_canvas(self, event=None):
         """Redesenha a imagem atual no canvas, garantindo a centralização e proporção."""
-        if not self.current_pil_image:
+        self.resize_after_id = None
+        if self.file_type == "image" and not self.current_pil_image:
             return
 
         canvas_w = self.image_canvas.winfo_width()
@@ -154,20 +306,26 @@ class PDFPopup(tk.Toplevel):
         if canvas_w <= 1 or canvas_h <= 1:
             return
 
-        # Cria uma cópia para redimensionar, preservando a original
-        image_to_display = self.current_pil_image.copy()
-        original_w, original_h = image_to_display.size
+        if self.zoom_level > 0:
+            self.draw_tiles(canvas_w, canvas_h)
+            return
 
-        # Redimensiona mantendo a proporção (thumbnail)
-        image_to_display.thumbnail((canvas_w, canvas_h), Image.Resampling.LANCZOS)
+        image_to_display = self.display_image(canvas_w, canvas_h)
         displayed_w, displayed_h = image_to_display.size
 
         # Calcula o fator de escala para o corte
         if displayed_w > 0:
-            self.display_scale_factor = original_w / displayed_w
+            if self.file_type == "pdf":
+                # Em PDFs, o corte é medido em pontos da página.
+                visible = self.visible_rect(self.doc[self.current_page_index])
+                self.display_scale_factor = visible.width / displayed_w
+            else:
+                self.display_scale_factor = self.current_pil_image.width / displayed_w
 
-        # Converte para formato Tkinter
-        self.tk_photo_image = ImageTk.PhotoImage(image_to_display)
+        # Converte para formato Tkinter (só se a imagem exibida mudou)
+        if image_to_display is not self.displayed_image:
+            self.tk_photo_image = ImageTk.PhotoImage(image_to_display)
+            self.displayed_image = image_to_display
 
         # Limpa o canvas e desenha a nova imagem centralizada
         self.image_canvas.delete("all")
@@ -178,6 +336,134 @@ class PDFPopup(tk.Toplevel):
             canvas_w / 2, canvas_h / 2, anchor="center", image=self.tk_photo_image
         )
 
+    def zoom_geometry(self, canvas_w, canvas_h):
+        """Área visível da página, escala (pixels por ponto) e tamanho ampliado."""
+        visible = self.visible_rect(self.doc[self.current_page_index])
+        fit_scale = min(canvas_w / visible.width, canvas_h / visible.height)
+        scale = round(fit_scale * ZOOM_STEP**self.zoom_level, 4)
+        return visible, scale, visible.width * scale, visible.height * scale
+
+    def zoom_by(self, steps, anchor_x=None, anchor_y=None):
+        """
+        Muda o nível de zoom mantendo parado o ponto sob (anchor_x, anchor_y),
+        por padrão o centro do canvas. Só PDFs têm zoom.
+        """
+        if self.file_type != "pdf" or self.is_cropping:
+            return
+        level = min(max(self.zoom_level + steps, 0), MAX_ZOOM_LEVEL)
+        if level == self.zoom_level:
+            return
+        canvas_w = self.image_canvas.winfo_width()
+        canvas_h = self.image_canvas.winfo_height()
+        if anchor_x is None:
+            anchor_x, anchor_y = canvas_w / 2, canvas_h / 2
+
+        _, old_scale, old_w, old_h = self.zoom_geometry(canvas_w, canvas_h)
+        if self.zoom_level == 0:
+            # Vindo da página inteira: a imagem está centralizada.
+            self.view_x = -(canvas_w - old_w) / 2
+            self.view_y = -(canvas_h - old_h) / 2
+        point_x = (self.view_x + anchor_x) / old_scale
+        point_y = (self.view_y + anchor_y) / old_scale
+
+        self.zoom_level = level
+        _, new_scale, _, _ = self.zoom_geometry(canvas_w, canvas_h)
+        self.view_x = point_x * new_scale - anchor_x
+        self.view_y = point_y * new_scale - anchor_y
+        self.redraw_canvas()
+
+    def on_zoom_wheel(self, event):
+        self.zoom_by(1 if event.delta > 0 else -1, event.x, event.y)
+
+    def on_pan_wheel(self, event):
+        if self.zoom_level > 0:
+            self.view_y -= TILE_SIZE / 2 if event.delta > 0 else -TILE_SIZE / 2
+            self.redraw_canvas()
+
+    def tile_request(self, index, scale, column, row):
+        """Chave e função de renderização de um ladrilho da página ampliada."""
+        rotation = self.rotations.get(index, 0)
+        crop = self.pdf_page_crop.get(index)
+        variant = (rotation, None if crop is None else tuple(crop))
+
+        def render(doc):
+            page = doc[index]
+            page.set_rotation(rotation)
+            visible = page.rect if crop is None else crop * page.rotation_matrix
+            size = TILE_SIZE / scale
+            x0 = visible.x0 + column * size
+            y0 = visible.y0 + row * size
+            area = pymupdf.Rect(x0, y0, x0 + size, y0 + size) & visible
+            return renderizar_area(page, area, scale)
+
+        return ("tile", index, variant, scale, column, row), render
+
+    def draw_tiles(self, canvas_w, canvas_h):
+        """
+        Desenha só os ladrilhos da página ampliada que aparecem no canvas,
+        renderizados com retângulos de recorte, e pede os vizinhos em segundo
+        plano. A página inteira nunca é renderizada nessa escala.
+        """
+        index = self.current_page_index
+        _, scale, total_w, total_h = self.zoom_geometry(canvas_w, canvas_h)
+        columns = math.ceil(total_w / TILE_SIZE)
+        rows = math.ceil(total_h / TILE_SIZE)
+
+        # Limita o deslocamento à página; se ela couber, fica centralizada.
+        if total_w <= canvas_w:
+            self.view_x = -(canvas_w - total_w) / 2
+        else:
+            self.view_x = min(max(self.view_x, 0), total_w - canvas_w)
+        if total_h <= canvas_h:
+            self.view_y = -(canvas_h - total_h) / 2
+        else:
+            self.view_y = min(max(self.view_y, 0), total_h - canvas_h)
+
+        first_column = max(0, int(self.view_x // TILE_SIZE))
+        last_column = min(columns - 1, int((self.view_x + canvas_w) // TILE_SIZE))
+        first_row = max(0, int(self.view_y // TILE_SIZE))
+        last_row = min(rows - 1, int((self.view_y + canvas_h) // TILE_SIZE))
+
+        self.image_canvas.delete("all")
+        photos = {}
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                key, render = self.tile_request(index, scale, column, row)
+                photo = self.tile_photos.get(key)
+                if photo is None:
+                    image = self.tile_cache.obter(key)
+                    if image is None:
+                        image = render(self.doc)
+                        self.tile_cache.guardar(key, image)
+                    photo = ImageTk.PhotoImage(image)
+                photos[key] = photo
+                self.image_canvas.create_image(
+                    column * TILE_SIZE - self.view_x,
+                    row * TILE_SIZE - self.view_y,
+                    anchor="nw",
+                    image=photo,
+                )
+        self.tile_photos = photos
+
+        # A faixa em volta da área visível fica pronta para o próximo arraste.
+        margin = TILE_PREFETCH_MARGIN
+        self.tile_prefetcher.pedir(
+            [
+                self.tile_request(index, scale, column, row)
+                for row in range(
+                    max(0, first_row - margin), min(rows, last_row + margin + 1)
+                )
+                for column in range(
+                    max(0, first_column - margin),
+                    min(columns, last_column + margin + 1),
+                )
+                if not (
+                    first_row <= row <= last_row
+                    and first_column <= column <= last_column
+                )
+            ]
+        )
+
     def rotate(self, angle):
         """Função auxiliar para rotação."""
         if self.file_type == "image":
@@ -185,21 +471,18 @@ class PDFPopup(tk.Toplevel):
             self.image_has_changed = True
             self.redraw_canvas()
         else:
-            if self.current_page_index in self.pdf_page_crop:
-                self.current_pil_image = self.current_pil_image.rotate(
-                    angle, expand=True
-                )
-                self.pdf_page_crop[self.current_page_index] = self.current_pil_image
+            # O corte fica em coordenadas sem rotação, então girar uma página
+            # cortada é só mudar a rotação dela.
+            current_rotation = self.rotations.get(self.current_page_index, 0)
+            new_rotation = (current_rotation - angle + 360) % 360
+            if (
+                new_rotation == 0
+                and self.current_page_index not in self.rotacoes_iniciais
+            ):
+                self.rotations.pop(self.current_page_index, None)
             else:
-                current_rotation = self.rotations.get(self.current_page_index, 0)
-                new_rotation = (current_rotation - angle + 360) % 360
-                if (
-                    new_rotation == 0
-                    and self.current_page_index not in self.rotacoes_iniciais
-                ):
-                    self.rotations.pop(self.current_page_index, None)
-                else:
-                    self.rotations[self.current_page_index] = new_rotation
+                self.rotations[self.current_page_index] = new_rotation
+            self.invalidate_page(self.current_page_index)
 
             self.update_page_display()
 
@@ -210,6 +493,10 @@ class PDFPopup(tk.Toplevel):
         self.rotate(90)
 
     def toggle_cropping(self):
+        if self.zoom_level > 0:
+            # O corte é feito sobre a página inteira.
+            self.zoom_level = 0
+            self.redraw_canvas()
         self.is_cropping = not self.is_cropping
         cursor = "cross" if self.is_cropping else ""
         relief = "sunken" if self.is_cropping else "raised"
@@ -220,6 +507,9 @@ class PDFPopup(tk.Toplevel):
             self.image_canvas.delete(self.crop_rectangle_id)
 
     def on_mouse_press(self, event):
+        if not self.is_cropping and self.zoom_level > 0:
+            self.pan_start = (event.x, event.y, self.view_x, self.view_y)
+            return
         if self.is_cropping:
             self.crop_start_x = self.image_canvas.canvasx(event.x)
             self.crop_start_y = self.image_canvas.canvasy(event.y)
@@ -234,6 +524,12 @@ class PDFPopup(tk.Toplevel):
             )
 
     def on_mouse_drag(self, event):
+        if self.pan_start is not None:
+            start_x, start_y, view_x, view_y = self.pan_start
+            self.view_x = view_x - (event.x - start_x)
+            self.view_y = view_y - (event.y - start_y)
+            self.redraw_canvas()
+            return
         if self.is_cropping and self.crop_rectangle_id:
             cur_x, cur_y = (
                 self.image_canvas.canvasx(event.x),
@@ -248,6 +544,7 @@ class PDFPopup(tk.Toplevel):
             )
 
     def on_mouse_release(self, event):
+        self.pan_start = None
         if self.is_cropping:
             end_x, end_y = (
                 self.image_canvas.canvasx(event.x),
@@ -269,6 +566,10 @@ class PDFPopup(tk.Toplevel):
                 box_on_canvas[3] - self.image_offset_y,
             )
 
+            if self.file_type == "pdf":
+                self.crop_pdf_page(box_on_image)
+                return
+
             final_box = tuple(
                 int(coord * self.display_scale_factor) for coord in box_on_image
             )
@@ -277,14 +578,31 @@ class PDFPopup(tk.Toplevel):
                 self.current_pil_image = self.current_pil_image.crop(final_box)
                 self.image_has_changed = True
                 self.redraw_canvas()
-            if self.file_type == "pdf":
-                self.pdf_page_crop[self.current_page_index] = self.current_pil_image
-                # self.image_has_changed = True
-                self.update_page_display()
+
+    def crop_pdf_page(self, box_on_image):
+        """
+        Registra o corte da página atual como um retângulo em coordenadas da
+        página sem rotação; ao salvar, ele vira o cropbox da página, sem
+        rasterizar nada.
+        """
+        page = self.doc[self.current_page_index]
+        visible = self.visible_rect(page)
+        x0, y0, x1, y1 = (coord * self.display_scale_factor for coord in box_on_image)
+        area = (
+            pymupdf.Rect(
+                visible.x0 + x0, visible.y0 + y0, visible.x0 + x1, visible.y0 + y1
+            )
+            & visible
+        )
+        if area.is_empty:
+            return
+        self.pdf_page_crop[self.current_page_index] = area * page.derotation_matrix
+        self.invalidate_page(self.current_page_index)
+        self.update_page_display()
 
     def reset_image_state(self):
-        if self.file_type == "image" and self.original_pil_image:
-            self.current_pil_image = self.original_pil_image.copy()
+        if self.file_type == "image":
+            self.current_pil_image = self.load_original_image()
             self.image_has_changed = False
 
         if self.file_type == "pdf":
@@ -293,6 +611,7 @@ class PDFPopup(tk.Toplevel):
                 self.image_has_changed = False
             if self.rotations.get(self.current_page_index, None):
                 self.rotations.pop(self.current_page_index)
+            self.invalidate_page(self.current_page_index)
 
         self.update_page_display()
 
@@ -313,36 +632,26 @@ class PDFPopup(tk.Toplevel):
             if answer:
                 try:
                     if self.file_type == "pdf":
-                        if self.pdf_page_crop:
-                            for pagina, croped_page in self.pdf_page_crop.items():
-                                buffer = io.BytesIO()
-                                croped_page.save(buffer, format="png")
-                                buffer.seek(0)
-                                bytes_imagem = buffer.getvalue()
-                                bytes_pagina = func_converter_imagem_para_pdf(
-                                    bytes_imagem, stream=True
-                                )
-                                with pymupdf.open(
-                                    stream=bytes_pagina, filetype="pdf"
-                                ) as new_page:
-                                    self.doc.delete_page(pagina)
-                                    self.doc.insert_pdf(
-                                        new_page,
-                                        from_page=0,
-                                        to_page=0,
-                                        start_at=pagina,
-                                    )
+                        # O handle do renderizador precisa estar fechado antes de
+                        # substituir o arquivo.
+                        self.prefetcher.parar()
+                        self.tile_prefetcher.parar()
+                        # Os cortes viram o cropbox de cada página.
+                        for page_index, crop in self.pdf_page_crop.items():
+                            page = self.doc[page_index]
+                            origin = page.cropbox.tl
+                            page.set_cropbox(
+                                (crop + (origin.x, origin.y, origin.x, origin.y))
+                                & page.mediabox
+                            )
 
                         # Lógica de salvamento do PDF
                         for page_index, rotation_angle in self.rotations.items():
                             self.doc[page_index].set_rotation(rotation_angle)
 
-                        temp_filepath = self.filepath + ".tmp"
-                        self.doc.save(temp_filepath, garbage=4, deflate=True)
-                        self.doc.close()
-                        self.doc.is_closed = True
-                        os.remove(self.filepath)
-                        os.rename(temp_filepath, self.filepath)
+                        # Rotações e cortes só mudam o dicionário das páginas:
+                        # a gravação incremental acrescenta apenas essas páginas.
+                        func_salvar_no_arquivo(self.doc)
                     else:  # Salvar imagem
                         self.current_pil_image.save(
                             self.filepath, quality=95, subsampling=0
@@ -354,8 +663,11 @@ class PDFPopup(tk.Toplevel):
                         parent=self,
                     )
                     return
-        if self.file_type == "pdf" and not self.doc.is_closed:
-            self.doc.close()
+        if self.file_type == "pdf":
+            self.prefetcher.parar()
+            self.tile_prefetcher.parar()
+            if not self.doc.is_closed:
+                self.doc.close()
         self.destroy()
 
     def next_page(self):
@@ -379,6 +691,8 @@ class PDFPopup(tk.Toplevel):
             if is_pdf and self.current_page_index < self.total_pages - 1
             else "disabled"
         )
+        self.zoom_out_button.config(state="normal" if is_pdf else "disabled")
+        self.zoom_in_button.config(state="normal" if is_pdf else "disabled")
         # self.crop_button.config(state='normal' if is_image else 'disabled')
         # self.reset_button.config(state='normal' if is_image else 'disabled')
 
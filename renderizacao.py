@@ -0,0 +1,455 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf
+from PIL import Image
+
+from cache_miniaturas import CacheMiniaturas, chave_documento
+from cancelamento import OperacaoCancelada, TokenCancelamento
+
+# --- Constantes do motor de miniaturas ---
+PAGINAS_POR_TAREFA = 4  # Páginas renderizadas por ida e volta ao processo worker
+TAREFAS_POR_WORKER = 2  # Tarefas em voo por worker; mantém a prioridade responsiva
+LIMITE_PAGINAS_SERIAL = 16  # Abaixo disso não compensa subir processos
+LOTE_GRAVACAO_CACHE = 32  # Miniaturas acumuladas antes de gravar no cache
+
+
+def matriz_para_caber(rect: pymupdf.Rect, largura: int, altura: int) -> pymupdf.Matrix:
+    """Matriz que faz o retângulo da página caber em largura x altura pixels."""
+    escala = min(largura / rect.width, altura / rect.height)
+    return pymupdf.Matrix(escala, escala)
+
+
+def pixmap_para_pil(pix: pymupdf.Pixmap) -> Image.Image:
+    """
+    Embrulha as amostras do pixmap numa imagem PIL sem copiá-las.
+
+    A imagem aponta para a memória do pixmap, então o pixmap precisa continuar
+    vivo enquanto ela for usada (copie ou cole a imagem antes de descartá-lo).
+    """
+    modo = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    return Image.frombuffer(
+        modo, (pix.width, pix.height), pix.samples_mv, "raw", modo, pix.stride, 1
+    )
+
+
+def renderizar_miniatura(
+    pagina: pymupdf.Page, largura: int, altura: int, cor_fundo: str
+) -> Image.Image:
+    """
+    Renderiza a página já no tamanho da miniatura e a centraliza numa moldura
+    largura x altura preenchida com cor_fundo.
+    """
+    pix = pagina.get_pixmap(
+        matrix=matriz_para_caber(pagina.rect, largura, altura), alpha=False
+    )
+    imagem = pixmap_para_pil(pix)
+    # O arredondamento do MuPDF pode produzir um pixel a mais em uma das dimensões.
+    if imagem.width > largura or imagem.height > altura:
+        imagem = imagem.crop(
+            (0, 0, min(imagem.width, largura), min(imagem.height, altura))
+        )
+    moldura = Image.new("RGB", (largura, altura), cor_fundo)
+    moldura.paste(
+        imagem, ((largura - imagem.width) // 2, (altura - imagem.height) // 2)
+    )
+    return moldura
+
+
+def renderizar_na_caixa(
+    pagina: pymupdf.Page,
+    largura: int,
+    altura: int,
+    recorte: pymupdf.Rect | None = None,
+) -> Image.Image:
+    """
+    Renderiza a página (ou só a área `recorte`, em coordenadas da página já
+    girada) no maior tamanho que cabe em largura x altura pixels.
+    """
+    area = pagina.rect if recorte is None else recorte
+    pix = pagina.get_pixmap(
+        matrix=matriz_para_caber(area, largura, altura), clip=recorte, alpha=False
+    )
+    # Cópia: a imagem sobrevive ao pixmap, pois vai para um cache.
+    return pixmap_para_pil(pix).copy()
+
+
+def renderizar_area(
+    pagina: pymupdf.Page, area: pymupdf.Rect, escala: float
+) -> Image.Image:
+    """
+    Renderiza só a `area` da página (em coordenadas da página girada) na
+    `escala` dada, sem alocar o pixmap da página inteira.
+    """
+    pix = pagina.get_pixmap(
+        matrix=pymupdf.Matrix(escala, escala), clip=area, alpha=False
+    )
+    return pixmap_para_pil(pix).copy()
+
+
+def _miniatura_da_pagina(
+    doc: pymupdf.Document, indice: int, largura: int, altura: int, cor_fundo: str
+) -> Image.Image:
+    """Como renderizar_miniatura, mas devolve a moldura vazia se a página falhar."""
+    try:
+        return renderizar_miniatura(doc.load_page(indice), largura, altura, cor_fundo)
+    except Exception as e:
+        print(f"Não foi possível renderizar a página {indice + 1}: {e}")
+        return Image.new("RGB", (largura, altura), cor_fundo)
+
+
+# --- Funções executadas nos processos worker ---
+_documento_worker: pymupdf.Document | None = None
+
+
+def _inicializar_worker(caminho_pdf: str):
+    """Abre uma vez, em cada processo, o documento que ele vai renderizar."""
+    global _documento_worker
+    _documento_worker = pymupdf.open(caminho_pdf)
+
+
+def _renderizar_lote(
+    paginas: list[int], largura: int, altura: int, cor_fundo: str
+) -> list[tuple[int, bytes]]:
+    return [
+        (
+            indice,
+            _miniatura_da_pagina(
+                _documento_worker, indice, largura, altura, cor_fundo
+            ).tobytes(),
+        )
+        for indice in paginas
+    ]
+
+
+class MotorMiniaturas:
+    """
+    Gera as miniaturas de um PDF em um pool de processos, cada um com seu próprio
+    handle do documento, e entrega os resultados pela fila `resultados` como
+    tuplas (indice_pagina, imagem_pil).
+
+    As páginas passadas a `priorizar` são renderizadas antes das demais; o
+    restante segue a ordem do documento. Com um `cache`, as miniaturas já
+    guardadas para esta versão do arquivo são entregues de imediato e só as
+    que faltam são renderizadas (e depois gravadas nele).
+
+    `pausar` deixa de enviar páginas novas até `retomar`; `parar` encerra.
+    """
+
+    def __init__(
+        self,
+        caminho_pdf: str,
+        total_paginas: int,
+        largura: int,
+        altura: int,
+        cor_fundo: str,
+        workers: int | None = None,
+        cache: CacheMiniaturas | None = None,
+    ):
+        self.caminho_pdf = caminho_pdf
+        self.total_paginas = total_paginas
+        self.largura = largura
+        self.altura = altura
+        self.cor_fundo = cor_fundo
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        if total_paginas <= LIMITE_PAGINAS_SERIAL:
+            workers = 0
+        self.workers = min(workers, -(-total_paginas // PAGINAS_POR_TAREFA))
+
+        self.resultados: queue.Queue[tuple[int, Image.Image]] = queue.Queue()
+        self._trava = threading.Lock()
+        self._prioridade: list[int] = []
+        self._pendentes = bytearray(b"\x01") * total_paginas
+        self._cursor = 0
+        self._cancelamento = TokenCancelamento()
+        self.cache = cache
+        self._chave_cache = None
+        self._para_gravar: list[tuple[int, Image.Image]] = []
+
+    def iniciar(self):
+        threading.Thread(target=self._coordenar, daemon=True).start()
+
+    def parar(self):
+        self._cancelamento.cancelar()
+
+    def pausar(self):
+        self._cancelamento.pausar()
+
+    def retomar(self):
+        self._cancelamento.retomar()
+
+    def priorizar(self, paginas: list[int]):
+        """Define as páginas (em ordem de preferência) a renderizar primeiro."""
+        with self._trava:
+            # O lote é montado retirando do fim da lista.
+            self._prioridade = list(reversed(paginas))
+
+    def _proximo_lote(self) -> list[int]:
+        lote = []
+        with self._trava:
+            while self._prioridade and len(lote) < PAGINAS_POR_TAREFA:
+                indice = self._prioridade.pop()
+                if self._pendentes[indice]:
+                    self._pendentes[indice] = 0
+                    lote.append(indice)
+            while self._cursor < self.total_paginas and len(lote) < PAGINAS_POR_TAREFA:
+                if self._pendentes[self._cursor]:
+                    self._pendentes[self._cursor] = 0
+                    lote.append(self._cursor)
+                self._cursor += 1
+        return lote
+
+    def _devolver_lote(self, lote: list[int]):
+        with self._trava:
+            for indice in lote:
+                self._pendentes[indice] = 1
+            self._cursor = min([self._cursor, *lote])
+
+    def _entregar(self, indice: int, imagem: Image.Image):
+        self.resultados.put((indice, imagem))
+        if self._chave_cache is not None:
+            self._para_gravar.append((indice, imagem))
+            if len(self._para_gravar) >= LOTE_GRAVACAO_CACHE:
+                self._gravar_no_cache()
+
+    def _gravar_no_cache(self):
+        self.cache.guardar_varios(
+            self._chave_cache,
+            self.largura,
+            self.altura,
+            self._para_gravar,
+            variante=self.cor_fundo,
+        )
+        self._para_gravar = []
+
+    def _carregar_do_cache(self):
+        try:
+            self._chave_cache = chave_documento(self.caminho_pdf)
+        except OSError:
+            return
+        guardadas = self.cache.obter_documento(
+            self._chave_cache, self.largura, self.altura, variante=self.cor_fundo
+        )
+        with self._trava:
+            for indice in guardadas:
+                if indice < self.total_paginas:
+                    self._pendentes[indice] = 0
+        for indice, imagem in guardadas.items():
+            if indice < self.total_paginas:
+                self.resultados.put((indice, imagem))
+
+    def _coordenar(self):
+        if self.cache is not None:
+            self._carregar_do_cache()
+        try:
+            if self.workers > 0 and 1 in self._pendentes:
+                try:
+                    self._renderizar_em_processos()
+                except BrokenProcessPool:
+                    pass  # O que faltou é renderizado abaixo, nesta thread.
+            self._renderizar_serial()
+        except OperacaoCancelada:
+            pass
+        finally:
+            if self._para_gravar:
+                self._gravar_no_cache()
+
+    def _renderizar_em_processos(self):
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_inicializar_worker,
+            initargs=(self.caminho_pdf,),
+        )
+        em_voo = {}
+        try:
+            while True:
+                self._cancelamento.verificar()
+                while len(em_voo) < self.workers * TAREFAS_POR_WORKER:
+                    lote = self._proximo_lote()
+                    if not lote:
+                        break
+                    try:
+                        futuro = executor.submit(
+                            _renderizar_lote,
+                            lote,
+                            self.largura,
+                            self.altura,
+                            self.cor_fundo,
+                        )
+                    except BrokenProcessPool:
+                        for lote_perdido in [lote, *em_voo.values()]:
+                            self._devolver_lote(lote_perdido)
+                        raise
+                    em_voo[futuro] = lote
+                if not em_voo:
+                    break
+                concluidos, _ = wait(em_voo, timeout=0.5, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    lote = em_voo.pop(futuro)
+                    try:
+                        renderizadas = futuro.result()
+                    except BrokenProcessPool:
+                        for lote_perdido in [lote, *em_voo.values()]:
+                            self._devolver_lote(lote_perdido)
+                        raise
+                    for indice, dados in renderizadas:
+                        self._entregar(
+                            indice,
+                            Image.frombytes("RGB", (self.largura, self.altura), dados),
+                        )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _renderizar_serial(self):
+        """Renderiza o que estiver pendente nesta thread, com um handle próprio."""
+        self._cancelamento.verificar()
+        lote = self._proximo_lote()
+        if not lote:
+            return
+        with pymupdf.open(self.caminho_pdf) as doc:
+            while lote:
+                for indice in lote:
+                    self._cancelamento.verificar()
+                    imagem = _miniatura_da_pagina(
+                        doc, indice, self.largura, self.altura, self.cor_fundo
+                    )
+                    self._entregar(indice, imagem)
+                lote = self._proximo_lote()
+
+
+def bytes_em_memoria(valor) -> int:
+    """Memória aproximada das imagens PIL em `valor` (uma imagem ou uma tupla)."""
+    if isinstance(valor, Image.Image):
+        return valor.width * valor.height * len(valor.getbands())
+    if isinstance(valor, tuple):
+        return sum(bytes_em_memoria(item) for item in valor)
+    return 0
+
+
+class CacheLRU:
+    """
+    Dicionário limitado a `capacidade` itens e, opcionalmente, a `limite_bytes`
+    de imagens decodificadas: ao passar de qualquer um dos limites, descarta
+    os itens usados há mais tempo (o último guardado sempre fica). Pode ser
+    usado por várias threads.
+    """
+
+    def __init__(self, capacidade: int, limite_bytes: int | None = None):
+        self.capacidade = capacidade
+        self.limite_bytes = limite_bytes
+        self._itens: OrderedDict = OrderedDict()
+        self._bytes: dict[Hashable, int] = {}
+        self._total_bytes = 0
+        self._trava = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __contains__(self, chave) -> bool:
+        with self._trava:
+            return chave in self._itens
+
+    def obter(self, chave):
+        with self._trava:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor):
+        tamanho = bytes_em_memoria(valor)
+        with self._trava:
+            self._remover(chave)
+            self._itens[chave] = valor
+            self._bytes[chave] = tamanho
+            self._total_bytes += tamanho
+            while len(self._itens) > 1 and (
+                len(self._itens) > self.capacidade
+                or (
+                    self.limite_bytes is not None
+                    and self._total_bytes > self.limite_bytes
+                )
+            ):
+                self._remover(next(iter(self._itens)))
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes.clear()
+            self._total_bytes = 0
+
+    def descartar_se(self, condicao: Callable[[Hashable], bool]):
+        """Remove as entradas cuja chave satisfaz `condicao`."""
+        with self._trava:
+            for chave in [c for c in self._itens if condicao(c)]:
+                self._remover(chave)
+
+    def _remover(self, chave):
+        if chave in self._itens:
+            del self._itens[chave]
+            self._total_bytes -= self._bytes.pop(chave)
+
+
+class RenderizadorAntecipado:
+    """
+    Thread com um handle próprio do documento que renderiza com antecedência
+    as páginas que o usuário provavelmente vai ver em seguida, guardando o
+    resultado num CacheLRU.
+
+    Cada pedido é uma tupla (chave, funcao): `funcao(doc)` devolve a imagem a
+    guardar sob `chave`. Um novo `pedir` substitui os pedidos ainda não
+    atendidos, então só o entorno da página atual é renderizado.
+    """
+
+    def __init__(self, caminho_pdf: str, cache: CacheLRU):
+        self.caminho_pdf = caminho_pdf
+        self.cache = cache
+        self._pedidos: list[tuple[Hashable, Callable]] = []
+        self._condicao = threading.Condition()
+        self._parar = False
+        self._thread = None
+
+    def pedir(self, pedidos: list[tuple[Hashable, Callable]]):
+        with self._condicao:
+            self._pedidos = [p for p in pedidos if p[0] not in self.cache]
+            if self._thread is None and self._pedidos:
+                self._thread = threading.Thread(target=self._executar, daemon=True)
+                self._thread.start()
+            self._condicao.notify()
+
+    def cancelar(self):
+        """Descarta os pedidos pendentes (por exemplo, após editar a página)."""
+        with self._condicao:
+            self._pedidos = []
+
+    def parar(self):
+        """Encerra a thread e espera ela fechar o handle do documento."""
+        with self._condicao:
+            self._parar = True
+            self._pedidos = []
+            self._condicao.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _executar(self):
+        with pymupdf.open(self.caminho_pdf) as doc:
+            while True:
+                with self._condicao:
+                    while not self._pedidos and not self._parar:
+                        self._condicao.wait()
+                    if self._parar:
+                        return
+                    chave, funcao = self._pedidos.pop(0)
+                if chave in self.cache:
+                    continue
+                try:
+                    self.cache.guardar(chave, funcao(doc))
+                except Exception as e:
+                    print(f"Não foi possível renderizar antecipadamente: {e}")
@@ -0,0 +1,534 @@
+"""
+Serviço HTTP local com as operações de operacoes_lote, para que outras
+ferramentas comprimam, juntem, convertam e recortem PDFs sem importar
+funcs_pdf no próprio processo. Usa apenas a biblioteca padrão.
+
+Endpoints (POST, com os arquivos no corpo):
+    /comprimir   um PDF; parâmetro opcional qualidade (1-100)
+    /juntar      PDFs e imagens, na ordem enviada; remover_duplicadas=1
+    /converter   um PDF (devolve um ZIP com um PNG por página) ou uma imagem
+                 (devolve um PDF)
+    /selecionar  um PDF; parâmetro paginas, como "1-3, 5"
+    GET /saude   estado do serviço, em JSON
+
+O corpo pode ser o próprio arquivo (Content-Type application/pdf, image/png
+ou image/jpeg) ou multipart/form-data, com um ou mais arquivos; os parâmetros
+vão na query string ou como campos do formulário:
+
+    curl --data-binary @a.pdf -H "Content-Type: application/pdf" \\
+        "http://127.0.0.1:8080/comprimir?qualidade=50" -o a_compressed.pdf
+    curl -F arquivo=@capa.pdf -F arquivo=@anexo.jpg -F remover_duplicadas=1 \\
+        http://127.0.0.1:8080/juntar -o juntado.pdf
+
+O corpo é gravado em disco, em blocos, à medida que chega (nunca fica
+inteiro na memória), e o trabalho vai para um pool de processos. Só
+`workers + fila` requisições são aceitas ao mesmo tempo: as demais recebem
+503 com Retry-After, sem que o corpo seja gravado. O resultado volta em blocos,
+direto do arquivo; os erros voltam como JSON ({"erro": "..."}).
+"""
+
+import argparse
+import email.parser
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from operacoes_lote import (
+    EXTENSOES_IMAGEM,
+    TAREFAS_POR_PROCESSO,
+    executar_tarefa,
+    normalizar_tarefa,
+)
+
+TAMANHO_BLOCO = 64 * 1024  # Leitura e escrita dos corpos, em bytes
+TAMANHO_MAXIMO_CORPO = 1024**3  # 1 GB por requisição
+TAMANHO_MAXIMO_CAMPO = 64 * 1024  # Cabeçalhos de parte e campos de formulário
+TEMPO_LIMITE_CONEXAO = 60  # Segundos de espera por dados do cliente
+ESPERA_SUGERIDA = 5  # Retry-After das respostas 503, em segundos
+TAMANHO_MAXIMO_DESCARTE = 32 * 1024**2  # Corpo lido e descartado antes de um 503
+FILA_POR_PROCESSO = 2  # Requisições em espera por processo antes do 503
+
+EXTENSOES_POR_TIPO = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+}
+TIPOS_POR_EXTENSAO = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".zip": "application/zip",
+}
+EXTENSOES_ACEITAS = (".pdf", *EXTENSOES_IMAGEM)
+
+# Rota -> operação de operacoes_lote; /converter escolhe pela entrada.
+ROTAS = {
+    "/comprimir": "comprimir",
+    "/juntar": "juntar",
+    "/converter": None,
+    "/selecionar": "selecionar",
+}
+
+
+class ErroRequisicao(Exception):
+    """Requisição inválida; vira uma resposta com `status` e a mensagem."""
+
+    def __init__(self, status: HTTPStatus, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class _LeitorCorpo:
+    """Lê o corpo da requisição em blocos, sem passar do Content-Length."""
+
+    def __init__(self, arquivo, tamanho: int):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def ler(self) -> bytes:
+        if not self.restante:
+            return b""
+        bloco = self.arquivo.read(min(TAMANHO_BLOCO, self.restante))
+        if not bloco:
+            raise ErroRequisicao(
+                HTTPStatus.BAD_REQUEST, "A conexão fechou antes do fim do corpo."
+            )
+        self.restante -= len(bloco)
+        return bloco
+
+    def descartar(self):
+        while self.ler():
+            pass
+
+
+def _copiar_ate(
+    leitor: _LeitorCorpo,
+    buffer: bytes,
+    marcador: bytes,
+    destino=None,
+    limite: int | None = None,
+) -> bytes:
+    """
+    Copia para `destino` (ou descarta) o que vier antes de `marcador` e
+    devolve o que sobrou depois dele. Só as últimas len(marcador) - 1 bytes
+    ficam no buffer entre um bloco e outro.
+    """
+    copiados = 0
+    while True:
+        posicao = buffer.find(marcador)
+        if posicao >= 0:
+            if destino is not None:
+                destino.write(buffer[:posicao])
+            return buffer[posicao + len(marcador) :]
+        corte = len(buffer) - (len(marcador) - 1)
+        if corte > 0:
+            copiados += corte
+            if limite is not None and copiados > limite:
+                raise ErroRequisicao(
+                    HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Campo grande demais."
+                )
+            if destino is not None:
+                destino.write(buffer[:corte])
+            buffer = buffer[corte:]
+        bloco = leitor.ler()
+        if not bloco:
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Corpo multipart incompleto.")
+        buffer += bloco
+
+
+def _nome_seguro(nome: str | None, extensao_padrao: str = "") -> str:
+    """O nome de arquivo enviado, sem pastas; "documento" se vier vazio."""
+    nome = Path((nome or "").replace("\\", "/")).name.strip()
+    if not nome or nome.startswith("."):
+        nome = "documento" + extensao_padrao
+    if Path(nome).suffix.lower() not in EXTENSOES_ACEITAS:
+        raise ErroRequisicao(
+            HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            f"Tipo de arquivo não suportado: '{nome}'.",
+        )
+    return nome
+
+
+def _gravar_multipart(
+    leitor: _LeitorCorpo, fronteira: bytes, pasta: Path
+) -> tuple[list[Path], dict[str, str]]:
+    """
+    Grava cada arquivo de um corpo multipart/form-data em uma subpasta de
+    `pasta`, à medida que chega, e devolve os arquivos (na ordem enviada) e
+    os campos de texto.
+    """
+    separador = b"\r\n--" + fronteira
+    # O primeiro delimitador não tem o \r\n antes; o prefixo o iguala aos demais.
+    buffer = _copiar_ate(leitor, b"\r\n", separador)
+    arquivos, campos = [], {}
+    while True:
+        while len(buffer) < 2:
+            bloco = leitor.ler()
+            if not bloco:
+                raise ErroRequisicao(
+                    HTTPStatus.BAD_REQUEST, "Corpo multipart incompleto."
+                )
+            buffer += bloco
+        if buffer.startswith(b"--"):  # Delimitador final
+            leitor.descartar()
+            return arquivos, campos
+
+        bruto = io.BytesIO()
+        buffer = _copiar_ate(
+            leitor, buffer, b"\r\n\r\n", bruto, limite=TAMANHO_MAXIMO_CAMPO
+        )
+        cabecalhos = email.parser.BytesHeaderParser().parsebytes(
+            bruto.getvalue().lstrip(b" \t\r\n")
+        )
+        nome_campo = cabecalhos.get_param("name", header="content-disposition")
+        nome_arquivo = cabecalhos.get_param("filename", header="content-disposition")
+        if nome_arquivo is None:
+            valor = io.BytesIO()
+            buffer = _copiar_ate(
+                leitor, buffer, separador, valor, limite=TAMANHO_MAXIMO_CAMPO
+            )
+            if nome_campo:
+                campos[str(nome_campo)] = valor.getvalue().decode("utf-8", "replace")
+            continue
+
+        extensao = EXTENSOES_POR_TIPO.get(cabecalhos.get_content_type(), "")
+        destino = pasta / str(len(arquivos)) / _nome_seguro(nome_arquivo, extensao)
+        destino.parent.mkdir()
+        with open(destino, "wb") as arquivo:
+            buffer = _copiar_ate(leitor, buffer, separador, arquivo)
+        arquivos.append(destino)
+
+
+def _parametros(operacao: str, valores: dict[str, str]) -> dict:
+    """Converte os parâmetros de texto da requisição para os da tarefa."""
+    try:
+        if operacao == "comprimir" and "qualidade" in valores:
+            qualidade = int(valores["qualidade"])
+            if not 1 <= qualidade <= 100:
+                raise ValueError("qualidade deve estar entre 1 e 100.")
+            return {"qualidade": qualidade}
+    except ValueError as e:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, str(e)) from None
+    if operacao == "juntar":
+        valor = valores.get("remover_duplicadas", "").lower()
+        return {"remover_duplicadas": valor in ("1", "true", "sim")}
+    if operacao == "selecionar":
+        if not valores.get("paginas"):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Informe as paginas.")
+        return {"paginas": valores["paginas"]}
+    return {}
+
+
+class ServidorPDF(ThreadingHTTPServer):
+    """
+    Servidor HTTP com um pool de `workers` processos. Aceita até
+    `workers + fila` requisições de uma vez; as demais recebem 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco: tuple[str, int], workers: int, fila: int):
+        super().__init__(endereco, ManipuladorRequisicao)
+        self.workers = workers
+        self.capacidade = workers + fila
+        self.em_andamento = 0
+        self._vagas = threading.BoundedSemaphore(self.capacidade)
+        self._trava = threading.Lock()
+        self._pool = self._novo_pool()
+
+    def _novo_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, max_tasks_per_child=TAREFAS_POR_PROCESSO
+        )
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def reservar_vaga(self) -> bool:
+        if not self._vagas.acquire(blocking=False):
+            return False
+        with self._trava:
+            self.em_andamento += 1
+        return True
+
+    def liberar_vaga(self):
+        with self._trava:
+            self.em_andamento -= 1
+        self._vagas.release()
+
+    def executar(self, tarefa: dict) -> dict:
+        """Executa a tarefa no pool (ver `executar_tarefa`) e espera o resultado."""
+        pool = self._pool
+        try:
+            return pool.submit(executar_tarefa, 0, tarefa).result()
+        except BrokenProcessPool:
+            # Um processo morreu (falta de memória, por exemplo) e levou o
+            # pool junto; a primeira requisição que perceber o substitui.
+            with self._trava:
+                if self._pool is pool:
+                    self._pool = self._novo_pool()
+            raise ErroRequisicao(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                "O processo de trabalho foi interrompido; tente novamente.",
+            ) from None
+
+
+class ManipuladorRequisicao(BaseHTTPRequestHandler):
+    server: ServidorPDF
+    server_version = "ManipuladorPDF"
+    protocol_version = "HTTP/1.1"
+    timeout = TEMPO_LIMITE_CONEXAO
+    _vaga_reservada = False
+
+    def handle_expect_100(self):
+        # Com "Expect: 100-continue" (o curl o envia para corpos grandes), a
+        # recusa por lotação sai antes de o cliente começar a mandar o corpo.
+        if self.command == "POST" and urlsplit(self.path).path in ROTAS:
+            if not self.server.reservar_vaga():
+                self._responder_ocupado()
+                return False
+            self._vaga_reservada = True
+        return super().handle_expect_100()
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/saude":
+            self._responder_erro(HTTPStatus.NOT_FOUND, "Rota desconhecida.")
+            return
+        self._responder_json(
+            HTTPStatus.OK,
+            {
+                "workers": self.server.workers,
+                "capacidade": self.server.capacidade,
+                "em_andamento": self.server.em_andamento,
+            },
+        )
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ROTAS:
+            self._responder_erro(HTTPStatus.NOT_FOUND, "Rota desconhecida.")
+            return
+        # A vaga é reservada antes de gravar o corpo, então um serviço cheio
+        # não acumula uploads. Sem o Expect, o cliente já está enviando o
+        # corpo, e só vê o 503 se o corpo for lido: os pequenos são
+        # descartados; nos enormes, a conexão simplesmente fecha.
+        if not self._vaga_reservada and not self.server.reservar_vaga():
+            try:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                if tamanho <= TAMANHO_MAXIMO_DESCARTE:
+                    _LeitorCorpo(self.rfile, tamanho).descartar()
+            except (ValueError, ErroRequisicao, ConnectionError, TimeoutError):
+                pass
+            self._responder_ocupado()
+            return
+        self._vaga_reservada = False
+        try:
+            with tempfile.TemporaryDirectory(prefix="manipulador_pdf_") as pasta:
+                try:
+                    resultado = self._processar(url.path, url.query, Path(pasta))
+                finally:
+                    # Devolver o resultado não ocupa o pool.
+                    self.server.liberar_vaga()
+                self._responder_arquivo(resultado)
+        except ErroRequisicao as e:
+            self._responder_erro(e.status, str(e))
+        except (ConnectionError, TimeoutError):
+            self.close_connection = True  # O cliente desistiu ou parou de enviar
+
+    def _processar(self, rota: str, query: str, pasta: Path) -> Path:
+        """Recebe os arquivos, executa a operação e devolve o arquivo a enviar."""
+        valores = dict(parse_qsl(query))
+        arquivos, campos = self._receber(pasta / "entradas", valores.get("nome"))
+        valores.update(campos)
+
+        operacao = ROTAS[rota]
+        eh_pdf = arquivos[0].suffix.lower() == ".pdf"
+        if operacao is None:
+            operacao = "pdf-para-imagens" if eh_pdf else "imagens-para-pdf"
+        if operacao != "juntar":
+            if len(arquivos) != 1:
+                raise ErroRequisicao(
+                    HTTPStatus.BAD_REQUEST, f"'{rota}' recebe um arquivo por vez."
+                )
+            if operacao != "imagens-para-pdf" and not eh_pdf:
+                raise ErroRequisicao(
+                    HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"'{rota}' recebe um PDF."
+                )
+
+        pasta_saida = pasta / "saida"
+        pasta_saida.mkdir()
+        tarefa = {
+            "operacao": operacao,
+            "entradas": [str(arquivo) for arquivo in arquivos],
+            **_parametros(operacao, valores),
+        }
+        if operacao == "juntar":
+            tarefa["saida"] = str(pasta_saida / f"{arquivos[0].stem}_juntado.pdf")
+        resultado = self.server.executar(normalizar_tarefa(tarefa, str(pasta_saida)))
+        if not resultado["ok"]:
+            raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, resultado["erro"])
+
+        saidas = [Path(saida) for saida in resultado["saidas"]]
+        if operacao != "pdf-para-imagens":
+            return saidas[0]
+        # Os PNGs já são comprimidos: o ZIP só os reúne.
+        caminho_zip = pasta / f"{arquivos[0].stem}_paginas.zip"
+        with zipfile.ZipFile(caminho_zip, "w", zipfile.ZIP_STORED) as arquivo_zip:
+            for saida in saidas:
+                arquivo_zip.write(saida, saida.name)
+        return caminho_zip
+
+    def _receber(
+        self, pasta: Path, nome: str | None
+    ) -> tuple[list[Path], dict[str, str]]:
+        """
+        Grava em `pasta` os arquivos do corpo (o próprio arquivo, chamado
+        `nome`, ou um multipart/form-data) e devolve-os com os campos de texto.
+        """
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            raise ErroRequisicao(HTTPStatus.LENGTH_REQUIRED, "Envie o Content-Length.")
+        try:
+            tamanho = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            raise ErroRequisicao(
+                HTTPStatus.LENGTH_REQUIRED, "Envie o Content-Length."
+            ) from None
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ErroRequisicao(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"O limite é de {TAMANHO_MAXIMO_CORPO // 1024**2} MB por requisição.",
+            )
+
+        leitor = _LeitorCorpo(self.rfile, tamanho)
+        pasta.mkdir()
+        tipo = self.headers.get_content_type()
+        if tipo == "multipart/form-data":
+            fronteira = self.headers.get_param("boundary")
+            if not fronteira:
+                raise ErroRequisicao(
+                    HTTPStatus.BAD_REQUEST, "Falta o boundary do multipart."
+                )
+            arquivos, campos = _gravar_multipart(
+                leitor, str(fronteira).encode("latin-1"), pasta
+            )
+        else:
+            destino = pasta / "0" / _nome_seguro(nome, EXTENSOES_POR_TIPO.get(tipo, ""))
+            destino.parent.mkdir()
+            with open(destino, "wb") as arquivo:
+                while bloco := leitor.ler():
+                    arquivo.write(bloco)
+            arquivos, campos = [destino], {}
+        if not arquivos:
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "Nenhum arquivo enviado.")
+        return arquivos, campos
+
+    def _responder_arquivo(self, caminho: Path):
+        self.send_response(HTTPStatus.OK)
+        self.send_header(
+            "Content-Type",
+            TIPOS_POR_EXTENSAO.get(caminho.suffix.lower(), "application/octet-stream"),
+        )
+        self.send_header("Content-Length", str(caminho.stat().st_size))
+        self.send_header(
+            "Content-Disposition", f"attachment; filename*=UTF-8''{quote(caminho.name)}"
+        )
+        self.end_headers()
+        with open(caminho, "rb") as arquivo:
+            shutil.copyfileobj(arquivo, self.wfile, TAMANHO_BLOCO)
+
+    def _responder_json(
+        self, status: HTTPStatus, dados: dict, cabecalhos: dict | None = None
+    ):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_ocupado(self):
+        self._responder_erro(
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            "O serviço está ocupado; tente novamente.",
+            {"Retry-After": str(ESPERA_SUGERIDA)},
+        )
+
+    def _responder_erro(
+        self, status: HTTPStatus, mensagem: str, cabecalhos: dict | None = None
+    ):
+        # O corpo da requisição pode não ter sido lido até o fim, então a
+        # conexão não pode ser reaproveitada.
+        self.close_connection = True
+        self._responder_json(
+            status, {"erro": mensagem}, {"Connection": "close", **(cabecalhos or {})}
+        )
+
+
+def criar_servidor(
+    host: str = "127.0.0.1",
+    porta: int = 8080,
+    workers: int | None = None,
+    fila: int | None = None,
+) -> ServidorPDF:
+    """
+    Cria o servidor (porta 0 escolhe uma livre, útil em testes). Por padrão,
+    um processo por núcleo e FILA_POR_PROCESSO requisições em espera por
+    processo.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    if fila is None:
+        fila = workers * FILA_POR_PROCESSO
+    return ServidorPDF((host, porta), workers, fila)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="servico_http.py",
+        description="Serviço HTTP local para comprimir, juntar e converter PDFs.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="padrão: 127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080, help="padrão: 8080")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processos em paralelo (padrão: um por núcleo)",
+    )
+    parser.add_argument(
+        "--fila",
+        type=int,
+        help="requisições em espera além das em execução, antes do 503",
+    )
+    args = parser.parse_args(argv)
+    servidor = criar_servidor(args.host, args.porta, args.workers, args.fila)
+    host, porta = servidor.server_address[:2]
+    print(f"Servindo em http://{host}:{porta}", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import threading
+import time
+
+import pytest
+
+from agendador import (
+    LIMITES_POR_TIPO,
+    PRIORIDADE_ALTA,
+    PRIORIDADE_BAIXA,
+    Agendador,
+)
+from cancelamento import OperacaoCancelada
+
+ESPERA = 5  # Segundos; só estoura se o agendador travar
+
+
+@pytest.fixture
+def criar_agendador():
+    criados = []
+
+    def criar(**opcoes):
+        agendador = Agendador(**opcoes)
+        criados.append(agendador)
+        return agendador
+
+    yield criar
+    for agendador in criados:
+        agendador.encerrar()
+
+
+def bloquear(agendador, tipo="bloqueio"):
+    """Ocupa uma thread do agendador até o evento devolvido ser sinalizado."""
+    iniciado, liberar = threading.Event(), threading.Event()
+
+    def segurar(trabalho):
+        iniciado.set()
+        assert liberar.wait(ESPERA)
+
+    trabalho = agendador.enviar(tipo, segurar)
+    assert iniciado.wait(ESPERA)
+    return trabalho, liberar
+
+
+def test_ordem_por_prioridade_e_envio(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    _, liberar = bloquear(agendador)
+    ordem = []
+    trabalhos = [
+        agendador.enviar("a", lambda t, n: ordem.append(n), nome, prioridade=p)
+        for nome, p in [
+            ("baixa", PRIORIDADE_BAIXA),
+            ("normal 1", 1),
+            ("alta", PRIORIDADE_ALTA),
+            ("normal 2", 1),
+        ]
+    ]
+    liberar.set()
+    for trabalho in trabalhos:
+        trabalho.futuro.result(ESPERA)
+    assert ordem == ["alta", "normal 1", "normal 2", "baixa"]
+
+
+def test_limite_por_tipo_adia_ate_liberar_vaga(criar_agendador):
+    agendador = criar_agendador(workers=3, limites=LIMITES_POR_TIPO)
+    assert LIMITES_POR_TIPO["comprimir"] == 1
+    primeiro, liberar = bloquear(agendador, "comprimir")
+
+    segundo_comecou = threading.Event()
+    segundo = agendador.enviar("comprimir", lambda t: segundo_comecou.set())
+    # Outro tipo não espera pelo limite de "comprimir".
+    agendador.enviar("exportar", lambda t: "ok").futuro.result(ESPERA)
+    assert not segundo_comecou.wait(0.2)
+
+    liberar.set()
+    primeiro.futuro.result(ESPERA)
+    segundo.futuro.result(ESPERA)
+    assert segundo_comecou.is_set()
+
+
+def test_cancelar_pendente_nao_executa(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    _, liberar = bloquear(agendador)
+    executou, canceladas = [], []
+    pendente = agendador.enviar(
+        "a", lambda t: executou.append(t), ao_cancelar=lambda: canceladas.append(1)
+    )
+    pendente.cancelar()
+    liberar.set()
+    agendador.enviar("a", lambda t: None).futuro.result(ESPERA)
+
+    assert pendente.futuro.cancelled()
+    assert executou == []
+    agendador.processar_eventos()
+    assert canceladas == [1]
+
+
+def test_cancelar_em_execucao_para_no_ponto_de_verificacao(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    iniciado = threading.Event()
+
+    def repetir(trabalho):
+        iniciado.set()
+        while True:
+            trabalho.cancelamento.verificar()
+            time.sleep(0.01)
+
+    canceladas = []
+    trabalho = agendador.enviar("a", repetir, ao_cancelar=lambda: canceladas.append(1))
+    assert iniciado.wait(ESPERA)
+    trabalho.cancelar()
+    with pytest.raises(OperacaoCancelada):
+        trabalho.futuro.result(ESPERA)
+    agendador.processar_eventos()
+    assert canceladas == [1]
+
+
+def test_processar_eventos_entrega_so_o_ultimo_progresso(criar_agendador):
+    agendador = criar_agendador(workers=1)
+
+    def avisar(trabalho):
+        for atual in range(1, 6):
+            trabalho.progresso(atual, 5, f"{atual} de 5")
+        return "pronto"
+
+    eventos = []
+    trabalho = agendador.enviar(
+        "a",
+        avisar,
+        ao_iniciar=lambda: eventos.append("iniciado"),
+        ao_progresso=lambda atual, total, texto: eventos.append(texto),
+        ao_concluir=lambda resultado: eventos.append(resultado),
+    )
+    trabalho.futuro.result(ESPERA)
+    assert eventos == []  # Os callbacks só rodam em processar_eventos.
+    agendador.processar_eventos()
+    assert eventos == ["iniciado", "5 de 5", "pronto"]
+
+
+def test_callback_com_erro_nao_para_o_despacho(criar_agendador, capsys):
+    agendador = criar_agendador(workers=1)
+    concluidos = []
+
+    def quebrar(resultado):
+        raise RuntimeError("janela fechada")
+
+    agendador.enviar("a", lambda t: 1, ao_concluir=quebrar).futuro.result(ESPERA)
+    agendador.enviar("a", lambda t: 2, ao_concluir=concluidos.append).futuro.result(
+        ESPERA
+    )
+    agendador.processar_eventos()
+    assert concluidos == [2]
+    assert "janela fechada" in capsys.readouterr().err
+
+
+def test_falha_chega_ao_callback_de_erro(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    erros = []
+
+    def falhar(trabalho):
+        raise ValueError("arquivo inválido")
+
+    trabalho = agendador.enviar("a", falhar, ao_falhar=erros.append)
+    with pytest.raises(ValueError):
+        trabalho.futuro.result(ESPERA)
+    agendador.processar_eventos()
+    assert erros == ["arquivo inválido"]
+
+
+def test_encerrar_descarta_pendentes_e_cancela_os_em_execucao(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    iniciado = threading.Event()
+
+    def esperar_cancelamento(trabalho):
+        iniciado.set()
+        while True:
+            trabalho.cancelamento.verificar()
+            time.sleep(0.01)
+
+    rodando = agendador.enviar("a", esperar_cancelamento)
+    assert iniciado.wait(ESPERA)
+    pendente = agendador.enviar("a", lambda t: None)
+
+    agendador.encerrar()
+    assert pendente.futuro.cancelled()
+    with pytest.raises(OperacaoCancelada):
+        rodando.futuro.result(ESPERA)
+    with pytest.raises(RuntimeError):
+        agendador.enviar("a", lambda t: None)
+
+
+def test_token_entre_processos_so_quando_pedido(criar_agendador):
+    agendador = criar_agendador(workers=1)
+    trabalho = agendador.enviar("a", lambda t: t.cancelamento.cancelado)
+    assert trabalho.futuro.result(ESPERA) is False
+    assert agendador._gerenciador is None
+
+    trabalho.cancelar()  # Já terminou: só marca os tokens.
+    token = trabalho.cancelamento_entre_processos()
+    assert token.cancelado
+    assert trabalho.cancelamento_entre_processos() is token
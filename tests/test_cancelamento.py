@@ -0,0 +1,116 @@
+import multiprocessing
+import threading
+
+import pymupdf
+import pytest
+
+from cancelamento import OperacaoCancelada, TokenCancelamento
+from operacoes_lote import executar_tarefa, normalizar_tarefa
+
+
+class TokenQueCancelaDepois(TokenCancelamento):
+    """Cancela a si mesmo na n-ésima verificação, no meio da operação."""
+
+    def __init__(self, verificacoes):
+        super().__init__()
+        self.restantes = verificacoes
+
+    def verificar(self):
+        self.restantes -= 1
+        if self.restantes <= 0:
+            self.cancelar()
+        super().verificar()
+
+
+def test_token_novo_nao_interrompe():
+    token = TokenCancelamento()
+    assert not token.cancelado
+    assert not token.pausado
+    token.verificar()
+
+
+def test_cancelar():
+    token = TokenCancelamento()
+    token.cancelar()
+    assert token.cancelado
+    with pytest.raises(OperacaoCancelada):
+        token.verificar()
+
+
+def test_pausa_espera_ate_retomar():
+    token = TokenCancelamento()
+    token.pausar()
+    assert token.pausado
+    passou = threading.Event()
+    trabalho = threading.Thread(target=lambda: (token.verificar(), passou.set()))
+    trabalho.start()
+    assert not passou.wait(0.1)
+    token.retomar()
+    assert passou.wait(5)
+    trabalho.join()
+
+
+def test_cancelar_acorda_quem_esta_pausado():
+    token = TokenCancelamento()
+    token.pausar()
+    erros = []
+
+    def esperar():
+        try:
+            token.verificar()
+        except OperacaoCancelada as e:
+            erros.append(e)
+
+    trabalho = threading.Thread(target=esperar)
+    trabalho.start()
+    token.cancelar()
+    trabalho.join(5)
+    assert not trabalho.is_alive()
+    assert len(erros) == 1
+    # Depois de cancelado, pausar não tem efeito.
+    token.pausar()
+    assert not token.pausado
+
+
+def test_token_entre_processos():
+    with multiprocessing.Manager() as gerenciador:
+        token = TokenCancelamento.entre_processos(gerenciador)
+        token.verificar()
+        token.cancelar()
+        with pytest.raises(OperacaoCancelada):
+            token.verificar()
+
+
+def criar_pdf(caminho, paginas):
+    with pymupdf.open() as doc:
+        for numero in range(paginas):
+            doc.new_page().insert_text((72, 72), f"Página {numero + 1}")
+        doc.save(caminho)
+    return str(caminho)
+
+
+def test_tarefa_cancelada_antes_de_comecar(tmp_path):
+    tarefa = normalizar_tarefa(
+        {"operacao": "comprimir", "entrada": criar_pdf(tmp_path / "a.pdf", 2)}
+    )
+    token = TokenCancelamento()
+    token.cancelar()
+    resultado = executar_tarefa(0, tarefa, token)
+    assert resultado["ok"] is False
+    assert resultado["cancelada"] is True
+    assert not (tmp_path / "a_compressed.pdf").exists()
+
+
+@pytest.mark.parametrize("operacao, copias", [("comprimir", 1), ("juntar", 2)])
+def test_tarefa_cancelada_no_meio_nao_deixa_arquivos(tmp_path, operacao, copias):
+    entrada = criar_pdf(tmp_path / "a.pdf", 6)
+    tarefa = normalizar_tarefa(
+        {
+            "operacao": operacao,
+            "entradas": [entrada] * copias,
+            "saida": str(tmp_path / "saida.pdf"),
+        }
+    )
+    resultado = executar_tarefa(0, tarefa, TokenQueCancelaDepois(3))
+    assert resultado["cancelada"] is True
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf"]
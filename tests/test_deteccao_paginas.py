@@ -0,0 +1,98 @@
+import pymupdf
+import pytest
+
+from deteccao_paginas import (
+    BRANCA,
+    SEPARADOR,
+    ImpressoesPaginas,
+    classificar_paginas,
+)
+from renderizacao import renderizar_miniatura
+
+COR_FUNDO = "#2b2b2b"
+
+
+def documento_com_textos(*textos):
+    doc = pymupdf.open()
+    for texto in textos:
+        pagina = doc.new_page()
+        pagina.insert_text((72, 72), texto, fontsize=20)
+    return doc
+
+
+def test_show_pdf_page_distintas_nao_sao_repetidas():
+    # show_pdf_page deixa todas as páginas com o mesmo "q /fzFrm0 Do Q"; o
+    # conteúdo de verdade está no Form XObject referenciado.
+    fontes = documento_com_textos(
+        "Contrato de locacao numero 1", "Procuracao assinada em cartorio"
+    )
+    doc = pymupdf.open()
+    for indice in (0, 1):
+        pagina = doc.new_page()
+        pagina.show_pdf_page(pagina.rect, fontes, indice)
+    assert doc[0].read_contents() == doc[1].read_contents()
+
+    impressoes = ImpressoesPaginas(doc)
+    assert impressoes.exatos[0] != impressoes.exatos[1]
+    assert impressoes.repetidas(exigir_texto=True) == []
+    assert impressoes.repetidas() == []
+
+
+def test_show_pdf_page_repetida_e_encontrada():
+    fontes = documento_com_textos(
+        "Contrato de locacao numero 1", "Procuracao assinada em cartorio"
+    )
+    doc = pymupdf.open()
+    for indice in (0, 1, 0):
+        pagina = doc.new_page()
+        pagina.show_pdf_page(pagina.rect, fontes, indice)
+    assert ImpressoesPaginas(doc).repetidas(exigir_texto=True) == [2]
+
+
+def test_insert_pdf_repetida_e_encontrada():
+    fontes = documento_com_textos("Primeira via", "Segunda via")
+    doc = pymupdf.open()
+    doc.insert_pdf(fontes)
+    doc.insert_pdf(fontes, from_page=0, to_page=0)
+    impressoes = ImpressoesPaginas(doc)
+    assert impressoes.agrupar() == [[0, 2]]
+    assert impressoes.repetidas() == [2]
+
+
+def test_texto_diferente_impede_quase_duplicada():
+    doc = documento_com_textos("Valor: 1000 reais", "Valor: 1001 reais")
+    assert ImpressoesPaginas(doc).repetidas() == []
+
+
+def test_muitas_paginas_iguais_continuam_agrupadas():
+    # Mais páginas que MAXIMO_POR_FAIXA: as faixas lotadas saem do índice,
+    # mas o hash exato ainda une as páginas.
+    doc = pymupdf.open()
+    for _ in range(150):
+        doc.new_page()
+    assert ImpressoesPaginas(doc).repetidas() == list(range(1, 150))
+
+
+@pytest.fixture
+def miniaturas():
+    doc = pymupdf.open()
+    doc.new_page()
+
+    texto = doc.new_page()
+    texto.insert_textbox(
+        texto.rect + (50, 50, -50, -50), "Texto corrido de uma página comum. " * 120
+    )
+
+    separador = doc.new_page()
+    for barra in range(40):
+        x = 150 + barra * 8
+        separador.draw_rect(
+            pymupdf.Rect(x, 380, x + 4, 460), color=None, fill=(0, 0, 0)
+        )
+
+    return [renderizar_miniatura(pagina, 150, 200, COR_FUNDO) for pagina in doc]
+
+
+def test_classificar_paginas(miniaturas):
+    assert classificar_paginas(miniaturas, COR_FUNDO) == [BRANCA, None, SEPARADOR]
+    assert classificar_paginas([], COR_FUNDO) == []
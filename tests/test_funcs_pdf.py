@@ -0,0 +1,73 @@
+import pymupdf
+import pytest
+
+from funcs_pdf import func_exportar_paginas
+
+
+@pytest.fixture
+def pdf_com_sumario(tmp_path):
+    caminho = str(tmp_path / "origem.pdf")
+    with pymupdf.open() as doc:
+        for numero in range(1, 7):
+            doc.new_page().insert_text((72, 72), f"Página {numero}")
+        doc.set_toc(
+            [
+                [1, "Capítulo 1", 1],
+                [2, "Seção 1.1", 2],
+                [1, "Capítulo 2", 4],
+                [2, "Seção 2.1", 5],
+                [1, "Site", -1, {"kind": pymupdf.LINK_URI, "uri": "https://a.b"}],
+            ]
+        )
+        doc.set_metadata({"title": "Meu titulo", "author": "Autor"})
+        doc.save(caminho)
+    return caminho
+
+
+def exportar(origem, paginas, saida):
+    with pymupdf.open(origem) as doc:
+        func_exportar_paginas(doc, paginas, saida)
+    with pymupdf.open(saida) as doc:
+        return (
+            [pagina.get_text().strip() for pagina in doc],
+            doc.get_toc(),
+            doc.metadata,
+        )
+
+
+def test_exportar_reordenado_mantem_sumario_e_metadados(pdf_com_sumario, tmp_path):
+    textos, sumario, metadados = exportar(
+        pdf_com_sumario, [1, 0, 2, 3, 4, 5], str(tmp_path / "saida.pdf")
+    )
+    assert textos[:2] == ["Página 2", "Página 1"]
+    assert sumario == [
+        [1, "Capítulo 1", 2],
+        [2, "Seção 1.1", 1],
+        [1, "Capítulo 2", 4],
+        [2, "Seção 2.1", 5],
+        [1, "Site", -1],
+    ]
+    assert metadados["title"] == "Meu titulo"
+    assert metadados["author"] == "Autor"
+
+
+def test_exportar_com_paginas_descartadas(pdf_com_sumario, tmp_path):
+    # O Capítulo 2 (página 4) sai; a Seção 2.1 sobe para o primeiro nível.
+    textos, sumario, metadados = exportar(
+        pdf_com_sumario, [4, 0, 1], str(tmp_path / "saida.pdf")
+    )
+    assert textos == ["Página 5", "Página 1", "Página 2"]
+    assert sumario == [
+        [1, "Capítulo 1", 2],
+        [2, "Seção 1.1", 3],
+        [1, "Seção 2.1", 1],
+        [1, "Site", -1],
+    ]
+    assert metadados["title"] == "Meu titulo"
+
+
+def test_exportar_sem_mudancas_copia_o_arquivo(pdf_com_sumario, tmp_path):
+    saida = str(tmp_path / "saida.pdf")
+    exportar(pdf_com_sumario, list(range(6)), saida)
+    with open(pdf_com_sumario, "rb") as a, open(saida, "rb") as b:
+        assert a.read() == b.read()
@@ -0,0 +1,158 @@
+import random
+
+import pytest
+
+import modelo_paginas
+from modelo_paginas import (
+    ComandoMover,
+    ComandoRestaurar,
+    HistoricoEdicoes,
+    SelecaoPosicoes,
+    SequenciaPaginas,
+    compactar_intervalos,
+    dividir_a_cada,
+    dividir_nos_separadores,
+    expandir_intervalos,
+    grupos_da_selecao,
+    interpretar_intervalos,
+)
+
+
+@pytest.fixture(autouse=True)
+def blocos_pequenos(monkeypatch):
+    # Com blocos de 4 páginas, poucas páginas já atravessam vários blocos.
+    monkeypatch.setattr(modelo_paginas, "TAMANHO_BLOCO", 4)
+
+
+def mover_na_lista(lista, posicoes, destino):
+    movidas = [lista[p] for p in posicoes]
+    resto = [pagina for p, pagina in enumerate(lista) if p not in set(posicoes)]
+    return resto[:destino] + movidas + resto[destino:]
+
+
+def test_sequencia_indexa_em_todos_os_blocos():
+    ordem = SequenciaPaginas(range(10))
+    assert [ordem[i] for i in range(10)] == list(range(10))
+    assert ordem[-1] == 9
+    with pytest.raises(IndexError):
+        ordem[10]
+
+
+def test_extrair_e_inserir_entre_blocos():
+    ordem = SequenciaPaginas(range(10))
+    assert ordem.extrair([1, 4, 5, 9]) == [1, 4, 5, 9]
+    assert ordem.paginas() == [0, 2, 3, 6, 7, 8]
+    ordem.inserir(2, [40, 50])
+    ordem.inserir(len(ordem), [90])
+    assert ordem.paginas() == [0, 2, 40, 50, 3, 6, 7, 8, 90]
+    assert len(ordem) == 9
+
+
+def test_mover_equivale_a_lista():
+    gerador = random.Random(7)
+    lista = list(range(30))
+    ordem = SequenciaPaginas(lista)
+    for _ in range(200):
+        posicoes = sorted(gerador.sample(range(len(lista)), gerador.randint(1, 5)))
+        destino = gerador.randint(0, len(lista) - len(posicoes))
+        lista = mover_na_lista(lista, posicoes, destino)
+        ordem.mover(posicoes, destino)
+        assert ordem.paginas() == lista
+
+
+def test_selecao_bitset():
+    selecao = SelecaoPosicoes(10)
+    selecao.definir([7, 2, 3])
+    assert list(selecao) == [2, 3, 7]
+    assert len(selecao) == 3
+    assert (selecao.primeira(), selecao.ultima()) == (2, 7)
+    assert selecao.antes_de(7) == 2
+    selecao.alternar(3)
+    selecao.alternar(9)
+    assert selecao.ordenadas() == [2, 7, 9]
+    itens = list("abcdefghij")
+    assert list(selecao.filtrar(itens)) == ["c", "h", "j"]
+    assert list(selecao.filtrar_fora(itens)) == list("abdefgi")
+    selecao.definir_intervalo(4, 6)
+    assert list(selecao) == [4, 5, 6]
+    selecao.definir_corridas([(0, 2), (8, 2)])
+    assert list(selecao) == [0, 1, 8, 9]
+    assert len(selecao) == 4
+    selecao.limpar()
+    assert not selecao
+    assert selecao.primeira() == -1
+
+
+def test_intervalos_compactados():
+    corridas = compactar_intervalos([3, 4, 5, 9, 11, 12])
+    assert corridas == [(3, 3), (9, 1), (11, 2)]
+    assert expandir_intervalos(corridas) == [3, 4, 5, 9, 11, 12]
+
+
+def test_historico_desfaz_e_refaz_movimentos():
+    gerador = random.Random(3)
+    ordem = SequenciaPaginas(range(20))
+    historico = HistoricoEdicoes()
+    estados = [ordem.paginas()]
+    for _ in range(15):
+        posicoes = sorted(gerador.sample(range(20), gerador.randint(1, 6)))
+        destino = gerador.randint(0, 20 - len(posicoes))
+        historico.executar(ComandoMover(posicoes, destino), ordem)
+        estados.append(ordem.paginas())
+
+    for estado in reversed(estados[:-1]):
+        historico.desfazer(ordem)
+        assert ordem.paginas() == estado
+    assert not historico.pode_desfazer
+    assert historico.desfazer(ordem) is None
+
+    for estado in estados[1:]:
+        historico.refazer(ordem)
+        assert ordem.paginas() == estado
+    assert not historico.pode_refazer
+
+
+def test_historico_novo_comando_descarta_refazer():
+    ordem = SequenciaPaginas(range(6))
+    historico = HistoricoEdicoes()
+    historico.executar(ComandoMover([0], 5), ordem)
+    historico.desfazer(ordem)
+    historico.executar(
+        ComandoRestaurar(ordem, SequenciaPaginas([5, 4, 3, 2, 1, 0])), ordem
+    )
+    assert not historico.pode_refazer
+    assert ordem.paginas() == [5, 4, 3, 2, 1, 0]
+    historico.desfazer(ordem)
+    assert ordem.paginas() == list(range(6))
+
+
+def test_historico_limitado():
+    ordem = SequenciaPaginas(range(4))
+    historico = HistoricoEdicoes(limite=2)
+    for _ in range(5):
+        historico.executar(ComandoMover([0], 3), ordem)
+    assert historico.desfazer(ordem) is not None
+    assert historico.desfazer(ordem) is not None
+    assert historico.desfazer(ordem) is None
+
+
+def test_interpretar_intervalos():
+    assert interpretar_intervalos("1-3, 5; 8-6", 10) == [[0, 1, 2], [4], [7, 6, 5]]
+
+
+@pytest.mark.parametrize("texto", ["", " , ", "a-3", "0-2", "3-11", "-3"])
+def test_interpretar_intervalos_invalidos(texto):
+    with pytest.raises(ValueError):
+        interpretar_intervalos(texto, 10)
+
+
+def test_divisoes():
+    ordem = SequenciaPaginas([10, 11, 12, 13, 14, 15, 16])
+    assert dividir_a_cada(ordem, 3) == [[10, 11, 12], [13, 14, 15], [16]]
+    with pytest.raises(ValueError):
+        dividir_a_cada(ordem, 0)
+
+    selecao = SelecaoPosicoes(len(ordem))
+    selecao.definir([0, 3, 4])
+    assert grupos_da_selecao(ordem, selecao) == [[10], [13, 14]]
+    assert dividir_nos_separadores(ordem, selecao) == [[11, 12], [15, 16]]
@@ -0,0 +1,167 @@
+import json
+import os
+
+import pymupdf
+import pytest
+
+from operacoes_lote import (
+    executar_lote,
+    executar_tarefa,
+    expandir_entradas,
+    ler_manifesto,
+    normalizar_tarefa,
+    preparar_tarefas,
+)
+
+
+def criar_pdf(caminho, paginas=3):
+    with pymupdf.open() as doc:
+        for numero in range(1, paginas + 1):
+            doc.new_page().insert_text((72, 72), f"Página {numero}")
+        doc.save(caminho)
+    return str(caminho)
+
+
+def textos(caminho):
+    with pymupdf.open(caminho) as doc:
+        return [pagina.get_text().strip() for pagina in doc]
+
+
+@pytest.mark.parametrize(
+    "tarefa",
+    [
+        {"operacao": "apagar", "entrada": "a.pdf"},
+        {"operacao": "comprimir"},
+        {"operacao": "comprimir", "entradas": "a.pdf"},
+        {"operacao": "comprimir", "entradas": ["a.pdf", "b.pdf"]},
+        {"operacao": "rodar", "entrada": "a.pdf"},
+        {"operacao": "selecionar", "entrada": "a.pdf"},
+        {"operacao": "juntar", "entradas": ["a.pdf", "b.pdf"]},
+    ],
+)
+def test_normalizar_tarefa_invalida(tarefa):
+    with pytest.raises(ValueError):
+        normalizar_tarefa(tarefa)
+
+
+def test_normalizar_tarefa_completa_a_saida(tmp_path):
+    entrada = str(tmp_path / "docs" / "a.pdf")
+    tarefa = normalizar_tarefa({"operacao": "comprimir", "entrada": entrada})
+    assert tarefa["entradas"] == [entrada]
+    assert tarefa["saida"] == str(tmp_path / "docs" / "a_compressed.pdf")
+
+    tarefa = normalizar_tarefa(
+        {"operacao": "rodar", "entradas": [entrada], "angulo": 90},
+        pasta_saida=str(tmp_path / "saida"),
+    )
+    assert tarefa["saida"] == str(tmp_path / "saida" / "a_rodado.pdf")
+
+
+def test_preparar_tarefas(tmp_path):
+    entradas = [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    tarefas = preparar_tarefas("rodar", entradas, str(tmp_path / "saida"), angulo=90)
+    assert [t["entradas"] for t in tarefas] == [[entradas[0]], [entradas[1]]]
+    assert all(t["angulo"] == 90 for t in tarefas)
+
+    (juntar,) = preparar_tarefas("juntar", entradas, str(tmp_path / "todos.pdf"))
+    assert juntar["entradas"] == entradas
+    assert juntar["saida"] == str(tmp_path / "todos.pdf")
+
+
+def test_preparar_tarefas_recusa_saidas_repetidas(tmp_path):
+    entradas = [str(tmp_path / "x" / "a.pdf"), str(tmp_path / "y" / "a.pdf")]
+    with pytest.raises(ValueError, match="Mais de uma tarefa"):
+        preparar_tarefas("comprimir", entradas, str(tmp_path / "saida"))
+
+
+def test_expandir_entradas(tmp_path):
+    criar_pdf(tmp_path / "b.pdf")
+    (tmp_path / "sub").mkdir()
+    criar_pdf(tmp_path / "sub" / "a.pdf")
+    lista = tmp_path / "lista.txt"
+    lista.write_text(f"{tmp_path / 'b.pdf'}\n\n", encoding="utf-8")
+
+    arquivos = expandir_entradas([f"@{lista}", str(tmp_path / "**" / "*.pdf")])
+    assert arquivos == [str(tmp_path / "b.pdf"), str(tmp_path / "sub" / "a.pdf")]
+    with pytest.raises(ValueError):
+        expandir_entradas([str(tmp_path / "*.jpg")])
+
+
+def test_ler_manifesto_resolve_caminhos_relativos(tmp_path):
+    manifesto = tmp_path / "tarefas.jsonl"
+    linhas = [
+        "# comentário",
+        json.dumps({"operacao": "selecionar", "entrada": "a.pdf", "paginas": "1"}),
+        "",
+        json.dumps({"operacao": "juntar", "entradas": ["a.pdf"], "saida": "j.pdf"}),
+    ]
+    manifesto.write_text("\n".join(linhas), encoding="utf-8")
+
+    selecionar, juntar = ler_manifesto(str(manifesto))
+    assert selecionar["entradas"] == [str(tmp_path / "a.pdf")]
+    assert selecionar["saida"] == str(tmp_path / "a_paginas.pdf")
+    assert juntar["saida"] == str(tmp_path / "j.pdf")
+
+
+def test_ler_manifesto_informa_a_linha(tmp_path):
+    manifesto = tmp_path / "tarefas.jsonl"
+    manifesto.write_text('{"operacao": "comprimir", "entrada": "a.pdf"}\n[1]\n')
+    with pytest.raises(ValueError, match="linha 2"):
+        ler_manifesto(str(manifesto))
+
+
+def test_executar_tarefa_selecionar(tmp_path):
+    entrada = criar_pdf(tmp_path / "a.pdf", paginas=5)
+    tarefa = normalizar_tarefa(
+        {"operacao": "selecionar", "entrada": entrada, "paginas": "4-2, 5"}
+    )
+    resultado = executar_tarefa(7, tarefa)
+    assert resultado["ok"], resultado
+    assert resultado["indice"] == 7
+    assert resultado["saidas"] == [tarefa["saida"]]
+    assert textos(tarefa["saida"]) == ["Página 4", "Página 3", "Página 2", "Página 5"]
+
+
+def test_executar_tarefa_juntar(tmp_path):
+    entradas = [criar_pdf(tmp_path / "a.pdf", 2), criar_pdf(tmp_path / "b.pdf", 1)]
+    saida = str(tmp_path / "juntado.pdf")
+    (tarefa,) = preparar_tarefas("juntar", entradas, saida)
+    assert executar_tarefa(0, tarefa)["ok"]
+    assert textos(saida) == ["Página 1", "Página 2", "Página 1"]
+
+
+def test_executar_tarefa_com_falha_nao_deixa_saida(tmp_path):
+    entrada = tmp_path / "quebrado.pdf"
+    entrada.write_bytes(b"isto nao e um pdf")
+    tarefa = normalizar_tarefa(
+        {"operacao": "rodar", "entrada": str(entrada), "angulo": 90}
+    )
+
+    resultado = executar_tarefa(0, tarefa)
+    assert resultado["ok"] is False
+    assert resultado["erro"]
+    assert "cancelada" not in resultado
+    assert not os.path.exists(tarefa["saida"])
+
+
+def test_executar_lote_em_um_processo(tmp_path):
+    entradas = [criar_pdf(tmp_path / f"{nome}.pdf", 2) for nome in "abc"]
+    tarefas = preparar_tarefas("selecionar", entradas, str(tmp_path), paginas="2")
+    resultados = list(executar_lote(tarefas, workers=1))
+    assert [r["indice"] for r in resultados] == [0, 1, 2]
+    assert all(r["ok"] for r in resultados)
+    assert all(textos(t["saida"]) == ["Página 2"] for t in tarefas)
+
+
+def test_comprimir_com_falha_nao_deixa_temporario(tmp_path, monkeypatch):
+    entrada = criar_pdf(tmp_path / "a.pdf")
+    tarefa = normalizar_tarefa({"operacao": "comprimir", "entrada": entrada})
+
+    def replace_quebrado(origem, destino):
+        raise PermissionError("arquivo em uso")
+
+    monkeypatch.setattr(os, "replace", replace_quebrado)
+    resultado = executar_tarefa(0, tarefa)
+    assert resultado["ok"] is False
+    assert "PermissionError" in resultado["erro"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf"]
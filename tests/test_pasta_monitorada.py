@@ -0,0 +1,263 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf
+import pytest
+
+from pasta_monitorada import (
+    PASTA_TRABALHOS,
+    TENTATIVAS_POR_TRABALHO,
+    MonitorPastas,
+    RegraPasta,
+    ler_configuracao,
+)
+
+
+class PoolNoMesmoProcesso:
+    """Executa as tarefas na hora, no processo do teste."""
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class PoolQuebrado(PoolNoMesmoProcesso):
+    """Como se um processo do pool tivesse morrido no meio da tarefa."""
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        futuro.set_exception(BrokenProcessPool("um processo morreu"))
+        return futuro
+
+
+def criar_pdf(caminho, texto="Página"):
+    with pymupdf.open() as doc:
+        doc.new_page().insert_text((72, 72), texto)
+        doc.save(caminho)
+    return caminho
+
+
+def criar_monitor(regra, pool=None, estabilidade=5.0):
+    regra.criar_pastas()
+    monitor = MonitorPastas([regra], workers=1, estabilidade=estabilidade)
+    pool = pool or PoolNoMesmoProcesso()
+    monitor._pool = pool
+    monitor._novo_pool = lambda: pool
+    return monitor
+
+
+def processar(monitor):
+    monitor._enviar()
+    monitor._coletar(0)
+
+
+def nomes(pasta):
+    return sorted(p.name for p in pasta.iterdir() if p.is_file())
+
+
+def test_regra_valida_a_configuracao(tmp_path):
+    with pytest.raises(ValueError):
+        RegraPasta(tmp_path, "apagar")
+    with pytest.raises(ValueError):
+        RegraPasta(tmp_path, "rodar")  # Falta o ângulo
+    with pytest.raises(ValueError):
+        RegraPasta(tmp_path, "comprimir", saida=tmp_path)
+
+    regra = RegraPasta(tmp_path, "comprimir", qualidade=50)
+    assert regra.aceita("Scan 01.PDF")
+    assert not regra.aceita("foto.jpg")
+    assert not regra.aceita("~scan.pdf")
+    assert not regra.aceita("scan.pdf.part")
+    assert regra.saida == tmp_path / "saida"
+
+
+def test_ler_configuracao(tmp_path):
+    arquivo = tmp_path / "pastas.json"
+    arquivo.write_text(
+        json.dumps(
+            {
+                "intervalo": 1,
+                "pastas": [
+                    {"entrada": "scanner", "operacao": "comprimir"},
+                    {"entrada": "contratos", "operacao": "juntar", "saida": "prontos"},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    regras, opcoes = ler_configuracao(str(arquivo))
+    assert opcoes == {"intervalo": 1.0}
+    assert regras[0].entrada == tmp_path / "scanner"
+    assert regras[1].saida == tmp_path / "prontos"
+
+    arquivo.write_text(
+        json.dumps(
+            {
+                "pastas": [
+                    {"entrada": "a", "operacao": "comprimir"},
+                    {"entrada": "a", "operacao": "rodar", "angulo": 90},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="mais de uma regra"):
+        ler_configuracao(str(arquivo))
+
+
+def test_arquivo_so_e_aceito_depois_de_parar_de_mudar(tmp_path):
+    monitor = criar_monitor(RegraPasta(tmp_path, "comprimir"))
+    scan = tmp_path / "scan.pdf"
+    scan.write_bytes(b"%PDF-1.7 parte")
+    (tmp_path / "vazio.pdf").touch()
+
+    monitor._varrer(0.0)
+    monitor._varrer(4.0)
+    assert not monitor._fila
+
+    scan.write_bytes(b"%PDF-1.7 parte e mais um pouco")  # Ainda chegando
+    monitor._varrer(6.0)
+    monitor._varrer(10.0)
+    assert not monitor._fila
+
+    monitor._varrer(11.0)
+    assert len(monitor._fila) == 1
+    _, pasta = monitor._fila[0]
+    assert pasta.parent == tmp_path / PASTA_TRABALHOS
+    assert nomes(pasta) == ["scan.pdf"]
+    # O arquivo vazio nunca é aceito.
+    assert nomes(tmp_path) == ["vazio.pdf"]
+
+
+def test_juntar_espera_o_lote_fechar(tmp_path):
+    monitor = criar_monitor(RegraPasta(tmp_path, "juntar", espera_lote=30))
+    criar_pdf(tmp_path / "a.pdf")
+    criar_pdf(tmp_path / "b.pdf")
+    monitor._varrer(0.0)
+    monitor._varrer(10.0)
+    assert not monitor._fila  # Estáveis, mas o lote ainda pode crescer
+
+    criar_pdf(tmp_path / "c.pdf")
+    monitor._varrer(20.0)
+    monitor._varrer(45.0)
+    assert not monitor._fila  # O arquivo novo reiniciou a espera
+
+    monitor._varrer(50.0)
+    assert len(monitor._fila) == 1
+    _, pasta = monitor._fila[0]
+    assert nomes(pasta) == ["a.pdf", "b.pdf", "c.pdf"]
+
+    processar(monitor)
+    assert nomes(tmp_path / "saida") == ["a_juntado.pdf"]
+    assert nomes(tmp_path / "originais") == ["a.pdf", "b.pdf", "c.pdf"]
+    with pymupdf.open(tmp_path / "saida" / "a_juntado.pdf") as doc:
+        assert doc.page_count == 3
+
+
+def test_falha_vai_para_erros_com_o_motivo(tmp_path):
+    monitor = criar_monitor(RegraPasta(tmp_path, "rodar", angulo=90))
+    (tmp_path / "quebrado.pdf").write_bytes(b"isto nao e um pdf")
+    criar_pdf(tmp_path / "bom.pdf")
+    monitor._varrer(0.0)
+    monitor._varrer(5.0)
+    processar(monitor)
+
+    assert nomes(tmp_path / "erros") == ["quebrado.pdf", "quebrado.pdf.erro.txt"]
+    assert (tmp_path / "erros" / "quebrado.pdf.erro.txt").read_text(encoding="utf-8")
+    assert nomes(tmp_path / "originais") == ["bom.pdf"]
+    assert nomes(tmp_path / "saida") == ["bom_rodado.pdf"]
+    assert list((tmp_path / PASTA_TRABALHOS).iterdir()) == []
+
+
+def test_nome_repetido_no_destino_nao_sobrescreve(tmp_path):
+    monitor = criar_monitor(RegraPasta(tmp_path, "rodar", angulo=90))
+    (tmp_path / "originais").mkdir(exist_ok=True)
+    (tmp_path / "originais" / "a.pdf").write_bytes(b"antigo")
+    criar_pdf(tmp_path / "a.pdf")
+    monitor._varrer(0.0)
+    monitor._varrer(5.0)
+    processar(monitor)
+    assert nomes(tmp_path / "originais") == ["a (2).pdf", "a.pdf"]
+    assert (tmp_path / "originais" / "a.pdf").read_bytes() == b"antigo"
+
+
+def test_retoma_o_que_ficou_em_processando(tmp_path):
+    regra = RegraPasta(tmp_path, "rodar", angulo=90)
+    regra.criar_pastas()
+    # Uma execução anterior caiu com um trabalho pela metade e outro vazio.
+    pela_metade = regra.trabalhos / "20260101-000000-1-000000"
+    (pela_metade / "saida").mkdir(parents=True)
+    (pela_metade / "saida" / "a_rodado.pdf").write_bytes(b"parcial")
+    criar_pdf(pela_metade / "a.pdf")
+    (regra.trabalhos / "20260101-000000-1-000001").mkdir()
+
+    monitor = criar_monitor(regra)
+    monitor._recuperar()
+    assert [pasta for _, pasta in monitor._fila] == [pela_metade]
+    assert not (pela_metade / "saida").exists()
+    assert list(regra.trabalhos.iterdir()) == [pela_metade]
+
+    processar(monitor)
+    assert nomes(tmp_path / "saida") == ["a_rodado.pdf"]
+    with pymupdf.open(tmp_path / "saida" / "a_rodado.pdf") as doc:
+        assert doc[0].rotation == 90
+    assert list(regra.trabalhos.iterdir()) == []
+
+
+def test_queda_do_pool_tenta_de_novo_e_depois_desiste(tmp_path):
+    monitor = criar_monitor(RegraPasta(tmp_path, "comprimir"), pool=PoolQuebrado())
+    criar_pdf(tmp_path / "a.pdf")
+    monitor._varrer(0.0)
+    monitor._varrer(5.0)
+
+    for _ in range(TENTATIVAS_POR_TRABALHO - 1):
+        processar(monitor)
+        assert len(monitor._fila) == 1  # Volta para a fila
+        assert not (tmp_path / "erros" / "a.pdf").exists()
+
+    processar(monitor)
+    assert not monitor._fila
+    assert nomes(tmp_path / "erros") == ["a.pdf", "a.pdf.erro.txt"]
+    erro = (tmp_path / "erros" / "a.pdf.erro.txt").read_text(encoding="utf-8")
+    assert "BrokenProcessPool" in erro
+
+
+def test_queda_do_pool_seguida_de_sucesso(tmp_path):
+    quebrado = PoolQuebrado()
+    monitor = criar_monitor(RegraPasta(tmp_path, "rodar", angulo=90), pool=quebrado)
+    monitor._novo_pool = PoolNoMesmoProcesso  # O pool novo funciona
+    criar_pdf(tmp_path / "a.pdf")
+    monitor._varrer(0.0)
+    monitor._varrer(5.0)
+
+    processar(monitor)
+    assert len(monitor._fila) == 1
+    assert monitor._pool is not quebrado
+    processar(monitor)
+    assert nomes(tmp_path / "saida") == ["a_rodado.pdf"]
+    assert monitor._quedas == {}
+
+
+def test_executar_de_ponta_a_ponta(tmp_path):
+    regra = RegraPasta(tmp_path, "rodar", angulo=180)
+    monitor = MonitorPastas([regra], workers=1, intervalo=0.05, estabilidade=0.1)
+    criar_pdf(tmp_path / "a.pdf")
+    thread = threading.Thread(target=monitor.executar)
+    thread.start()
+    try:
+        saida = tmp_path / "saida" / "a_rodado.pdf"
+        limite = time.monotonic() + 60
+        while not saida.exists() and time.monotonic() < limite:
+            time.sleep(0.05)
+    finally:
+        monitor.parar()
+        thread.join(60)
+    assert saida.exists()
+    assert nomes(tmp_path / "originais") == ["a.pdf"]
@@ -0,0 +1,133 @@
+import io
+import json
+import threading
+import urllib.request
+from http import HTTPStatus
+
+import pymupdf
+import pytest
+
+import servico_http
+from servico_http import (
+    ErroRequisicao,
+    _gravar_multipart,
+    _LeitorCorpo,
+    _nome_seguro,
+    criar_servidor,
+)
+
+FRONTEIRA = b"----fronteira7MA4YWxk"
+
+
+def corpo_multipart(partes):
+    corpo = b""
+    for cabecalho, conteudo in partes:
+        corpo += b"--" + FRONTEIRA + b"\r\n" + cabecalho + b"\r\n\r\n" + conteudo
+        corpo += b"\r\n"
+    return corpo + b"--" + FRONTEIRA + b"--\r\n"
+
+
+def ler_multipart(corpo, pasta):
+    leitor = _LeitorCorpo(io.BytesIO(corpo), len(corpo))
+    return _gravar_multipart(leitor, FRONTEIRA, pasta)
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 5, 64 * 1024])
+def test_multipart_em_blocos_de_qualquer_tamanho(tmp_path, monkeypatch, tamanho_bloco):
+    # Blocos pequenos fazem os delimitadores cair entre uma leitura e outra.
+    monkeypatch.setattr(servico_http, "TAMANHO_BLOCO", tamanho_bloco)
+    pdf = b"%PDF-1.7\r\n--" + FRONTEIRA[:-1] + b"\r\n\r\nfim"
+    corpo = corpo_multipart(
+        [
+            (b'Content-Disposition: form-data; name="paginas"', b"1-3"),
+            (
+                (
+                    b'Content-Disposition: form-data; name="arquivo"; filename="a.pdf"'
+                    b"\r\nContent-Type: application/pdf"
+                ),
+                pdf,
+            ),
+            (
+                b'Content-Disposition: form-data; name="arquivo"; filename="C:\\x\\b.jpg"',
+                b"\xff\xd8jpeg",
+            ),
+        ]
+    )
+    arquivos, campos = ler_multipart(corpo, tmp_path)
+    assert campos == {"paginas": "1-3"}
+    assert arquivos == [tmp_path / "0" / "a.pdf", tmp_path / "1" / "b.jpg"]
+    assert arquivos[0].read_bytes() == pdf
+    assert arquivos[1].read_bytes() == b"\xff\xd8jpeg"
+
+
+def test_multipart_incompleto(tmp_path):
+    corpo = corpo_multipart(
+        [(b'Content-Disposition: form-data; name="a"; filename="a.pdf"', b"%PDF")]
+    )
+    with pytest.raises(ErroRequisicao) as erro:
+        ler_multipart(corpo[:-20], tmp_path)
+    assert erro.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_multipart_campo_grande_demais(tmp_path, monkeypatch):
+    # O limite é verificado a cada bloco lido, então os blocos também diminuem.
+    monkeypatch.setattr(servico_http, "TAMANHO_MAXIMO_CAMPO", 100)
+    monkeypatch.setattr(servico_http, "TAMANHO_BLOCO", 64)
+    corpo = corpo_multipart([(b'Content-Disposition: form-data; name="a"', b"x" * 500)])
+    with pytest.raises(ErroRequisicao) as erro:
+        ler_multipart(corpo, tmp_path)
+    assert erro.value.status == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+def test_leitor_nao_passa_do_tamanho():
+    leitor = _LeitorCorpo(io.BytesIO(b"abcdefgh"), 5)
+    assert leitor.ler() == b"abcde"
+    assert leitor.ler() == b""
+    with pytest.raises(ErroRequisicao):
+        _LeitorCorpo(io.BytesIO(b"abc"), 5).descartar()
+
+
+def test_nome_seguro():
+    assert _nome_seguro("../../etc/a.pdf") == "a.pdf"
+    assert _nome_seguro("C:\\Users\\x\\Foto.JPG") == "Foto.JPG"
+    assert _nome_seguro("", ".pdf") == "documento.pdf"
+    assert _nome_seguro(".pdf", ".png") == "documento.png"
+    with pytest.raises(ErroRequisicao) as erro:
+        _nome_seguro("script.sh")
+    assert erro.value.status == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+
+@pytest.fixture
+def servidor():
+    servidor = criar_servidor(porta=0, workers=1)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_servidor_seleciona_paginas(servidor):
+    with pymupdf.open() as doc:
+        for numero in range(1, 4):
+            doc.new_page().insert_text((72, 72), f"Página {numero}")
+        pdf = doc.tobytes()
+    corpo = corpo_multipart(
+        [
+            (b'Content-Disposition: form-data; name="paginas"', b"3,1"),
+            (b'Content-Disposition: form-data; name="a"; filename="a.pdf"', pdf),
+        ]
+    )
+    requisicao = urllib.request.Request(
+        servidor + "/selecionar",
+        data=corpo,
+        headers={"Content-Type": "multipart/form-data; boundary=" + FRONTEIRA.decode()},
+    )
+    with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+        assert resposta.status == 200
+        resultado = resposta.read()
+    with pymupdf.open(stream=resultado) as doc:
+        assert [pagina.get_text().strip() for pagina in doc] == ["Página 3", "Página 1"]
+
+    with urllib.request.urlopen(servidor + "/saude", timeout=10) as resposta:
+        assert json.load(resposta)